@@ -20,9 +20,9 @@
 
 import collections
 
-from coinbase.wallet import client as cclient
-
+from cryptotrade import cache
 from cryptotrade import exchange
+from cryptotrade import scheduler
 
 
 class MissingCoinbaseApiKey(Exception):
@@ -32,6 +32,8 @@ class MissingCoinbaseApiKey(Exception):
 class Coinbase(exchange.Exchange):
 
     CANDLESTICKS = (300, 900, 1800, 7200, 14400, 86400)
+    # coinbase allows 10000 requests per hour
+    RATE_LIMIT = 2.75
 
     def __init__(self, conf):
         super(Coinbase, self).__init__(conf)
@@ -39,12 +41,22 @@ class Coinbase(exchange.Exchange):
         for key in ('api_key', 'api_secret'):
             if key not in coinbase_conf:
                 raise MissingCoinbaseApiKey
+        # client library is imported on first use to keep ct startup fast
+        from coinbase.wallet import client as cclient
         self.client = cclient.Client(
             api_key=coinbase_conf['api_key'].encode('utf-8'),
             api_secret=coinbase_conf['api_secret'].encode('utf-8'))
+        self.ticker_cache = cache.get_snapshot_cache(conf, 'coinbase')
+
+    def _get_exchange_rates(self, currency):
+        return self.ticker_cache.get(
+            'rates-%s' % currency,
+            lambda: self._call(
+                scheduler.MARKET, self.client.get_exchange_rates,
+                currency=currency))
 
     def get_balances(self):
-        accounts = self.client.get_accounts()
+        accounts = self._call(scheduler.ACCOUNT, self.client.get_accounts)
         res = collections.defaultdict(float)
         for acc in accounts['data']:
             balance = acc['balance']
@@ -59,9 +71,17 @@ class Coinbase(exchange.Exchange):
     def get_rate(self, from_, to_):
         if from_ == to_:
             return 1
-        rates = self.client.get_exchange_rates(currency=to_)
+        rates = self._get_exchange_rates(to_)
         return float(rates['rates'][from_])
 
+    def get_rates(self, gold, currencies):
+        # rates are returned as amounts of other currencies per gold
+        rates = self._get_exchange_rates(gold)['rates']
+        return {
+            currency: 1 if currency == gold else 1 / float(rates[currency])
+            for currency in currencies
+        }
+
     def get_candlesticks(self, from_, to_, period, start, end):
         return NotImplemented
 
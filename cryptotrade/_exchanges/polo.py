@@ -19,11 +19,14 @@
 # SOFTWARE.
 
 import collections
+import math
+import time
 
-from cached_property import cached_property_with_ttl
-from poloniex import poloniex as plx
+from concurrent import futures
 
+from cryptotrade import cache
 from cryptotrade import exchange
+from cryptotrade import scheduler
 
 
 class MissingPoloniexSection(Exception):
@@ -37,6 +40,12 @@ class MissingPoloniexApiKey(Exception):
 class Poloniex(exchange.Exchange):
 
     CANDLESTICKS = (300, 900, 1800, 7200, 14400, 86400)
+    RATE_LIMIT = 6
+
+    # long chart data ranges are fetched in chunks of that many candles
+    CHART_CHUNK = 1000
+    CHART_WORKERS = 4
+    CHART_ATTEMPTS = 3
 
     def __init__(self, conf):
         super(Poloniex, self).__init__(conf)
@@ -48,11 +57,21 @@ class Poloniex(exchange.Exchange):
                 raise MissingPoloniexApiKey
         self.api_key = poloniex_conf['api_key'].encode('utf-8')
         self.api_secret = poloniex_conf['api_secret'].encode('utf-8')
+        # client library is imported on first use to keep ct startup fast
+        from poloniex import poloniex as plx
         self.private = plx.Poloniex(
             apikey=self.api_key, secret=self.api_secret)
+        self.ticker_cache = cache.get_snapshot_cache(conf, 'poloniex')
+
+    def _call(self, lane, func, *args, **kwargs):
+        from poloniex import exceptions as plx_exc
+        try:
+            return super(Poloniex, self)._call(lane, func, *args, **kwargs)
+        except plx_exc.PoloniexCommandException as e:
+            raise exchange.CommandError(e)
 
     def get_balances(self):
-        balances = self.private.returnBalances()
+        balances = self._call(scheduler.ACCOUNT, self.private.returnBalances)
         res = collections.defaultdict(float)
         res.update({
             # filter out currencies that we don't own
@@ -61,27 +80,84 @@ class Poloniex(exchange.Exchange):
         return res
 
     def get_fee(self):
-        return float(self.private.returnFeeInfo()['takerFee'])
+        fee_info = self._call(scheduler.ACCOUNT, self.private.returnFeeInfo)
+        return float(fee_info['takerFee'])
 
-    @cached_property_with_ttl(ttl=60)
+    @property
     def _ticker(self):
-        return self.private.returnTicker()
+        return self.ticker_cache.get(
+            'ticker',
+            lambda: self._call(scheduler.MARKET, self.private.returnTicker))
 
-    def get_rate(self, from_, to_):
+    @staticmethod
+    def _get_rate(ticker, from_, to_):
         if from_ == to_:
             return 1
-        ticker = self._ticker
+        if to_ == 'USD':
+            # there are no pairs to USD, invert the one from it
+            return 1 / Poloniex._get_rate(ticker, to_, from_)
         from_ = from_ if from_ != 'USD' else 'USDT'
         pair = '%s_%s' % (from_, to_)
         return ticker[pair]['highestBid']
 
+    def get_rate(self, from_, to_):
+        return self._get_rate(self._ticker, from_, to_)
+
+    def get_rates(self, gold, currencies):
+        ticker = self._ticker
+        if gold == 'USD':
+            # there are no USD pairs for altcoins, convert through BTC
+            usd_rate = self._get_rate(ticker, 'USD', 'BTC')
+            return {
+                currency: self._get_rate(ticker, 'BTC', currency) * usd_rate
+                for currency in currencies
+            }
+        return {
+            currency: self._get_rate(ticker, gold, currency)
+            for currency in currencies
+        }
+
+    def _get_chart_data(self, pair, period, start, end):
+        for attempt in range(self.CHART_ATTEMPTS):
+            if attempt:
+                time.sleep(min(2 ** attempt, 10))
+            try:
+                return self._call(
+                    scheduler.MARKET, self.private.returnChartData,
+                    pair, period, start=start, end=end)
+            except (exchange.CommandError, IOError):
+                if attempt == self.CHART_ATTEMPTS - 1:
+                    raise
+
     def get_candlesticks(self, from_, to_, period, start, end):
         assert from_ == 'BTC', 'poloneix has pairs for BTC only'
-        return self.private.returnChartData(
-            '%s_%s' % (from_, to_), period, start=start, end=end)
+        pair = '%s_%s' % (from_, to_)
+        span = period * self.CHART_CHUNK
+        if end - start < span:
+            return self._get_chart_data(pair, period, start, end)
+
+        # huge responses are slow and get truncated, so split the range in
+        # chunks; a failed chunk is retried on its own
+        first, last = int(start), int(math.ceil(end))
+        chunks = [
+            (start_, min(start_ + span - 1, last))
+            for start_ in range(first, last + 1, span)
+        ]
+        with futures.ThreadPoolExecutor(self.CHART_WORKERS) as executor:
+            results = executor.map(
+                lambda chunk: self._get_chart_data(pair, period, *chunk),
+                chunks)
+            candles = {}
+            for result in results:
+                for candle in result:
+                    # also drops placeholders for ranges with no trades
+                    if start <= candle['date'] <= end:
+                        candles[candle['date']] = candle
+        return [candles[date] for date in sorted(candles)]
 
     def get_orders(self):
-        orders = self.private.returnOpenOrders()
+        orders = self._call(
+            scheduler.ACCOUNT, self.private.returnOpenOrders)
         return {
             k: v
             for k, v in orders.items()
@@ -89,18 +165,21 @@ class Poloniex(exchange.Exchange):
         }
 
     def cancel_order(self, order):
-        self.private.cancelOrder(order['orderNumber'])
+        self._call(
+            scheduler.ORDER, self.private.cancelOrder, order['orderNumber'])
 
     def buy(self, from_, to_, rate, amount):
         # revisit: switch back to .sell api when poloniex library is released
         # with: https://github.com/Aula13/poloniex/pull/1
         currencyPair = '%s_%s' % (from_, to_)
-        return self.private._private(
+        return self._call(
+            scheduler.ORDER, self.private._private,
             'buy', currencyPair=currencyPair, rate=rate, amount=amount)
 
     def sell(self, from_, to_, rate, amount):
         # revisit: switch back to .sell api when poloniex library is released
         # with: https://github.com/Aula13/poloniex/pull/1
         currencyPair = '%s_%s' % (from_, to_)
-        return self.private._private(
+        return self._call(
+            scheduler.ORDER, self.private._private,
             'sell', currencyPair=currencyPair, rate=rate, amount=amount)
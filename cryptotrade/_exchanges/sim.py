@@ -0,0 +1,610 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import collections
+import functools
+import heapq
+import itertools
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from cryptotrade._exchanges import polo
+from cryptotrade import cache
+from cryptotrade import clock
+from cryptotrade import exchange
+from cryptotrade import orders as orders_
+from cryptotrade import rates
+from cryptotrade import recording
+from cryptotrade import scheduler
+
+
+BUY = 'buy'
+SELL = 'sell'
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# order amounts below that are considered filled
+EPSILON = 1e-12
+
+
+class MissingStart(Exception):
+    message = 'Simulation of recorded %(market)s market needs start time.'
+
+    def __init__(self, market):
+        super(MissingStart, self).__init__(self.message % {'market': market})
+
+
+class SyntheticMarket(object):
+    '''Candles of geometric random walks, one per currency.
+
+    The same seed and start produce the same candles, no matter in which
+    order and ranges they are requested.
+    '''
+
+    # number of candles generated at once
+    BLOCK = 1024
+
+    def __init__(self, period, start, volatility=0.002, volume=10.0, seed=0):
+        self.period = period
+        self.anchor = int(start // period) // self.BLOCK
+        self.volatility = volatility
+        self.volume = volume
+        self.seed = seed
+        self._blocks = {}
+
+    @staticmethod
+    def _crc(currency):
+        return zlib.crc32(currency.encode('utf-8')) & 0xffffffff
+
+    def _make_block(self, currency, n):
+        rng = np.random.RandomState(
+            [self.seed, self._crc(currency), n - self.anchor + 2 ** 31])
+        steps = rng.normal(0, self.volatility, self.BLOCK)
+        wicks = np.abs(rng.normal(0, self.volatility, (2, self.BLOCK)))
+        volumes = self.volume * rng.lognormal(0, 0.5, self.BLOCK)
+        if n == self.anchor:
+            # initial prices are spread between 0.0001 and 0.1 of gold
+            prev = np.log(10 ** (-4 + 3 * (self._crc(currency) % 1000) /
+                                 1000.0))
+        elif n > self.anchor:
+            prev = self._blocks[(currency, n - 1)]['levels'][-1]
+        else:
+            prev = self._blocks[(currency, n + 1)]['prev'] - steps.sum()
+        return {
+            'prev': prev,
+            'levels': prev + np.cumsum(steps),
+            'wicks': wicks,
+            'volumes': volumes,
+        }
+
+    def _block(self, currency, n):
+        # each block continues from its neighbour closer to anchor
+        missing = []
+        k = n
+        while (currency, k) not in self._blocks:
+            missing.append(k)
+            if k == self.anchor:
+                break
+            k += 1 if k < self.anchor else -1
+        for k in reversed(missing):
+            self._blocks[(currency, k)] = self._make_block(currency, k)
+        return self._blocks[(currency, n)]
+
+    def get_columns(self, currency, start, end):
+        first = -(-int(start) // self.period)
+        last = int(end) // self.period
+        parts = collections.defaultdict(list)
+        k = first
+        while k <= last:
+            n = k // self.BLOCK
+            block = self._block(currency, n)
+            lo = k - n * self.BLOCK
+            hi = min(last - n * self.BLOCK, self.BLOCK - 1) + 1
+            levels = block['levels']
+            parts['open'].append(np.exp(np.concatenate(
+                ([block['prev']], levels[:-1]))[lo:hi]))
+            parts['close'].append(np.exp(levels[lo:hi]))
+            parts['high'].append(np.maximum(
+                parts['open'][-1], parts['close'][-1]) *
+                np.exp(block['wicks'][0][lo:hi]))
+            parts['low'].append(np.minimum(
+                parts['open'][-1], parts['close'][-1]) /
+                np.exp(block['wicks'][1][lo:hi]))
+            parts['volume'].append(block['volumes'][lo:hi])
+            k = (n + 1) * self.BLOCK
+        res = {
+            field: np.concatenate(parts[field]) if parts[field] else
+            np.empty(0)
+            for field in FIELDS
+        }
+        res['date'] = np.arange(first, last + 1, dtype=np.int64) * self.period
+        return res
+
+
+class RecordedMarket(object):
+    '''Candles recorded in the local cache for another exchange.'''
+
+    def __init__(self, period, conf, exchange_name, gold):
+        self.period = period
+        self.exchange_name = exchange_name
+        self.gold = gold
+        self.candle_cache = cache.get_candle_cache(conf)
+
+    def _fetch(self, from_, to_, period, start, end):
+        raise exchange.CommandError(
+            'No %s candles recorded for %s_%s between %d and %d' %
+            (self.exchange_name, from_, to_, start, end))
+
+    def get_columns(self, currency, start, end):
+        if end < start:
+            res = {field: np.empty(0) for field in FIELDS}
+            res['date'] = np.empty(0, dtype=np.int64)
+            return res
+        if self.candle_cache is None:
+            self._fetch(self.gold, currency, self.period, start, end)
+        columns = self.candle_cache.get_columns(
+            self._fetch, self.exchange_name, self.gold, currency,
+            self.period, start, end, ('date',) + FIELDS)
+        res = {
+            field: np.asarray(columns[field], dtype=np.float64)
+            for field in FIELDS
+        }
+        res['date'] = np.asarray(columns['date'], dtype=np.int64)
+        return res
+
+
+class HistoryMarket(object):
+    '''Candles loaded in memory, mapped by currency to dicts of columns.'''
+
+    def __init__(self, period, gold, columns):
+        self.period = period
+        self.gold = gold
+        self.columns = {
+            currency: {
+                field: np.asarray(
+                    values,
+                    dtype=np.int64 if field == 'date' else np.float64)
+                for field, values in columns_.items()
+            }
+            for currency, columns_ in columns.items()
+        }
+
+    def get_columns(self, currency, start, end):
+        try:
+            columns = self.columns[currency]
+        except KeyError:
+            raise exchange.CommandError(
+                'No market for %s_%s' % (self.gold, currency))
+        first = np.searchsorted(columns['date'], start, side='left')
+        last = np.searchsorted(columns['date'], end, side='right')
+        return {
+            field: values[first:last] for field, values in columns.items()
+        }
+
+
+class Order(object):
+
+    __slots__ = ('number', 'pair', 'type', 'rate', 'amount',
+                 'starting_amount', 'date')
+
+    def __init__(self, number, pair, type_, rate, amount, date):
+        self.number = number
+        self.pair = pair
+        self.type = type_
+        self.rate = rate
+        self.amount = amount
+        self.starting_amount = amount
+        self.date = date
+
+    def as_dict(self):
+        # the same format as poloniex open orders
+        return {
+            'orderNumber': self.number,
+            'type': self.type,
+            'rate': self.rate,
+            'amount': self.amount,
+            'startingAmount': self.starting_amount,
+            'total': self.amount * self.rate,
+            'date': time.strftime(
+                '%Y-%m-%d %H:%M:%S', time.gmtime(self.date)),
+        }
+
+
+class OrderBook(object):
+    '''Resting limit orders matched in price-time priority.
+
+    Better priced orders fill first; among orders of the same price, those
+    placed earlier fill first.
+    '''
+
+    def __init__(self):
+        self.orders = {}
+        self._sides = collections.defaultdict(list)
+        self._numbers = itertools.count(1)
+
+    def next_number(self):
+        return next(self._numbers)
+
+    def add(self, number, pair, type_, rate, amount, date):
+        order = Order(number, pair, type_, rate, amount, date)
+        self.orders[number] = order
+        key = -rate if type_ == BUY else rate
+        heapq.heappush(self._sides[(pair, type_)], (key, number))
+        return order
+
+    def remove(self, number):
+        # heap entries of removed orders are dropped lazily on match
+        return self.orders.pop(number)
+
+    def get_orders(self):
+        res = collections.defaultdict(list)
+        for number in sorted(self.orders):
+            order = self.orders[number]
+            res[order.pair].append(order)
+        return res
+
+    def match(self, pair, type_, price, budget, start, end):
+        '''Fill orders crossed by market trades at price between start and end.
+
+        Fills are limited by budget, in gold; orders placed after start get
+        a part of it proportional to time they were in the book. Returns
+        list of (order, amount) filled.
+        '''
+        heap = self._sides.get((pair, type_), [])
+        bound = -price if type_ == BUY else price
+        fills = []
+        postponed = []
+        while heap and budget > EPSILON:
+            key, number = heap[0]
+            order = self.orders.get(number)
+            if order is None:
+                heapq.heappop(heap)
+                continue
+            if key > bound:
+                break
+            heapq.heappop(heap)
+            share = min(1.0, float(end - order.date) / (end - start))
+            if share <= 0:
+                postponed.append((key, number))
+                continue
+            amount = min(order.amount, budget * share / order.rate)
+            budget -= amount * order.rate
+            order.amount -= amount
+            fills.append((order, amount))
+            if order.amount > EPSILON:
+                # partially filled orders keep their priority
+                postponed.append((key, number))
+            else:
+                del self.orders[number]
+        for item in postponed:
+            heapq.heappush(heap, item)
+        return fills
+
+
+class Simulator(exchange.Exchange):
+    '''Exchange simulated in process, on its own clock.
+
+    Prices come from a synthetic random walk, from candles of another
+    exchange recorded in the local cache, or from market passed by caller.
+    Orders crossing the spread fill at once with taker fee; others rest in
+    the order book and fill with maker fee when candles trade through their
+    rates, sharing a part of candle volume in price-time priority.
+    '''
+
+    CANDLESTICKS = polo.Poloniex.CANDLESTICKS
+
+    # number of candles to look back for the last price, since recorded
+    # markets have no candles for periods without trades
+    PRICE_LOOKBACK = 12
+
+    def __init__(self, conf, market=None):
+        super(Simulator, self).__init__(conf)
+        # simulated candles are cheap to produce, while caching them would
+        # mix up candles of different simulations
+        self.candle_cache = None
+        self.gold = self.get_option('gold', 'BTC')
+        self.period = min(self.CANDLESTICKS)
+
+        market_name = self.get_option('market', 'synthetic')
+        start = self.get_option('start')
+        seed = self.get_option('seed', 0)
+        if market is not None:
+            start = time.time() if start is None else start
+            self.market = market
+        elif market_name == 'synthetic':
+            start = time.time() if start is None else start
+            self.market = SyntheticMarket(
+                self.period, start,
+                volatility=self.get_option('volatility', 0.002),
+                volume=self.get_option('volume', 10.0),
+                seed=seed)
+        else:
+            if start is None:
+                raise MissingStart(market_name)
+            self.market = RecordedMarket(
+                self.period, conf, market_name, self.gold)
+
+        self.maker_fee = self.get_option('maker_fee', 0.0015)
+        self.taker_fee = self.get_option('taker_fee', 0.0025)
+        self.spread = self.get_option('spread', 0.001)
+        # part of candle volume available to fill resting orders
+        self.participation = self.get_option('participation', 0.1)
+        # time it takes each api request to reach exchange
+        self.latency = self.get_option('latency', 0.1)
+        self.jitter = self.get_option('jitter', 0.0)
+        # whether order updates are pushed, or have to be polled for
+        self.push = self.get_option('push', True)
+
+        if isinstance(self.tape, recording.Player):
+            # replayed responses arrive on their own, at recorded times
+            self.latency = self.jitter = 0.0
+        else:
+            self.clock = clock.VirtualClock(start, self.get_option('speed'))
+
+        self.balances = collections.defaultdict(float)
+        self.balances.update(self.get_option('balances', {self.gold: 1.0}))
+        self.book = OrderBook()
+        self.trades = []
+        self._updates = []
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        # whether latency of the current request is already paid for
+        self._in_flight = False
+        self._matched = self._last_closed()
+        self._prices = {}
+
+    def _last_closed(self):
+        # date of the last closed candle
+        return (int(self.clock.time()) // self.period - 1) * self.period
+
+    def _delay(self):
+        self.clock.sleep(self.latency + self._random.uniform(0, self.jitter))
+
+    def _call(self, lane, func, *args, **kwargs):
+        if not self._in_flight:
+            self._delay()
+
+        @functools.wraps(func)
+        def serve(*args, **kwargs):
+            with self._lock:
+                self._advance()
+                return func(*args, **kwargs)
+        return super(Simulator, self)._call(lane, serve, *args, **kwargs)
+
+    def _advance(self):
+        # fill resting orders with candles closed since the last call
+        last = self._last_closed()
+        if last <= self._matched:
+            return
+        pairs = set(order.pair for order in self.book.orders.values())
+        for pair in sorted(pairs):
+            currency = pair.split('_', 1)[1]
+            columns = self.market.get_columns(
+                currency, self._matched + self.period, last)
+            for date, high, low, volume in zip(
+                    columns['date'].tolist(), columns['high'].tolist(),
+                    columns['low'].tolist(), columns['volume'].tolist()):
+                budget = volume * self.participation
+                for type_, price in ((BUY, low), (SELL, high)):
+                    for order, amount in self.book.match(
+                            pair, type_, price, budget, date,
+                            date + self.period):
+                        self._fill(
+                            currency, type_, order.rate, order.rate, amount,
+                            self.maker_fee, date)
+                        self._push(order.number, orders_.FILLED, amount,
+                                   order.amount)
+        self._matched = last
+        self._prices = {}
+
+    def _fill(self, currency, type_, limit, rate, amount, fee, date):
+        # funds are reserved at limit rate when order is placed
+        if type_ == BUY:
+            self.balances[self.gold] += amount * (limit - rate)
+            self.balances[currency] += amount * (1 - fee)
+        else:
+            self.balances[self.gold] += amount * rate * (1 - fee)
+        trade = {
+            'type': type_,
+            'currencyPair': '%s_%s' % (self.gold, currency),
+            'rate': rate,
+            'amount': amount,
+            'total': amount * rate,
+            'fee': fee,
+            'date': date,
+        }
+        self.trades.append(trade)
+        return trade
+
+    def _push(self, number, kind, amount, remaining):
+        if self.push:
+            self._updates.append({
+                'orderNumber': number, 'kind': kind, 'amount': amount,
+                'remaining': remaining,
+            })
+
+    def _get_order_updates(self):
+        updates, self._updates = self._updates, []
+        return updates
+
+    def get_order_updates(self):
+        if not self.push:
+            return None
+        return self._call(scheduler.ACCOUNT, self._get_order_updates)
+
+    def _price(self, currency):
+        if currency == self.gold:
+            return 1.0
+        if currency not in self._prices:
+            last = self._last_closed()
+            columns = self.market.get_columns(currency, last, last)
+            if not len(columns['close']):
+                columns = self.market.get_columns(
+                    currency, last - self.period * self.PRICE_LOOKBACK, last)
+            if not len(columns['close']):
+                raise exchange.CommandError(
+                    'No market for %s_%s' % (self.gold, currency))
+            self._prices[currency] = columns['close'][-1]
+        return self._prices[currency]
+
+    def _get_bid(self, currency):
+        if currency == self.gold:
+            return 1.0
+        return self._price(currency) * (1 - self.spread / 2)
+
+    def _get_ask(self, currency):
+        return self._price(currency) * (1 + self.spread / 2)
+
+    def _get_balances(self):
+        return collections.defaultdict(float, {
+            k: v for k, v in self.balances.items() if v > EPSILON
+        })
+
+    def get_balances(self):
+        return self._call(scheduler.ACCOUNT, self._get_balances)
+
+    def _get_fee(self):
+        return self.taker_fee
+
+    def get_fee(self):
+        return self._call(scheduler.ACCOUNT, self._get_fee)
+
+    def get_rate(self, from_, to_):
+        assert from_ == self.gold, 'simulator has %s pairs only' % self.gold
+        return self._call(scheduler.MARKET, self._get_bid, to_)
+
+    def _get_bids(self, currencies):
+        return {currency: self._get_bid(currency) for currency in currencies}
+
+    def get_rates(self, gold, currencies):
+        assert gold == self.gold, 'simulator has %s pairs only' % self.gold
+        return self._call(scheduler.MARKET, self._get_bids, currencies)
+
+    def _get_candlesticks(self, to_, period, start, end):
+        now = self.clock.time()
+        first = start + (-start % period)
+        columns = self.market.get_columns(
+            to_, first, min(end + period - self.period, self._last_closed()))
+        dates, columns = rates.resample(
+            columns.pop('date'), columns, period)
+        candles = [
+            dict(zip(('date',) + FIELDS, values))
+            for values in zip(dates.tolist(), *[
+                columns[field].tolist() for field in FIELDS])
+        ]
+        current = int(now) // period * period
+        if first <= current <= end and (
+                not candles or candles[-1]['date'] < current):
+            # the current candle didn't trade yet
+            price = self._price(to_)
+            candles.append({
+                'date': current, 'open': price, 'high': price, 'low': price,
+                'close': price, 'volume': 0.0})
+        return candles
+
+    def get_candlesticks(self, from_, to_, period, start, end):
+        assert from_ == self.gold, 'simulator has %s pairs only' % self.gold
+        return self._call(
+            scheduler.MARKET, self._get_candlesticks, to_, period, start, end)
+
+    def _get_orders(self):
+        return {
+            pair: [order.as_dict() for order in orders]
+            for pair, orders in self.book.get_orders().items()
+        }
+
+    def get_orders(self):
+        return self._call(scheduler.ACCOUNT, self._get_orders)
+
+    def _cancel_order(self, number):
+        try:
+            order = self.book.remove(number)
+        except KeyError:
+            raise exchange.CommandError(
+                'Invalid order number, or you are not the person who '
+                'placed the order.')
+        currency = order.pair.split('_', 1)[1]
+        if order.type == BUY:
+            self.balances[self.gold] += order.amount * order.rate
+        else:
+            self.balances[currency] += order.amount
+        self._push(number, orders_.CANCELLED, 0.0, order.amount)
+
+    def cancel_order(self, order):
+        self._call(scheduler.ORDER, self._cancel_order, order['orderNumber'])
+
+    def _map_orders(self, calls):
+        # requests sent in parallel travel at the same time: pay latency once
+        # per batch of order_workers, but serve them in order, so that
+        # simulations stay reproducible
+        res = []
+        for i, (func, args) in enumerate(calls):
+            if i % self.order_workers == 0:
+                self._delay()
+            self._in_flight = True
+            try:
+                res.append(exchange.call_order(func, *args))
+            finally:
+                self._in_flight = False
+        return res
+
+    def _place(self, type_, currency, rate, amount):
+        rate = float(rate)
+        amount = float(amount)
+        if rate <= 0 or amount <= 0:
+            raise exchange.CommandError('Invalid rate or amount.')
+        if type_ == BUY:
+            needed, funds = amount * rate, self.gold
+        else:
+            needed, funds = amount, currency
+        if self.balances[funds] < needed * (1 - 1e-9):
+            raise exchange.CommandError('Not enough %s.' % funds)
+        self.balances[funds] -= needed
+
+        now = self.clock.time()
+        number = self.book.next_number()
+        pair = '%s_%s' % (self.gold, currency)
+        if type_ == BUY and rate >= self._get_ask(currency):
+            trades = [self._fill(currency, type_, rate,
+                                 self._get_ask(currency), amount,
+                                 self.taker_fee, now)]
+        elif type_ == SELL and rate <= self._get_bid(currency):
+            trades = [self._fill(currency, type_, rate,
+                                 self._get_bid(currency), amount,
+                                 self.taker_fee, now)]
+        else:
+            trades = []
+            self.book.add(number, pair, type_, rate, amount, now)
+        if trades:
+            self._push(number, orders_.FILLED, amount, 0.0)
+        return {'orderNumber': number, 'resultingTrades': trades}
+
+    def buy(self, from_, to_, rate, amount):
+        assert from_ == self.gold, 'simulator has %s pairs only' % self.gold
+        return self._call(scheduler.ORDER, self._place, BUY, to_, rate, amount)
+
+    def sell(self, from_, to_, rate, amount):
+        assert from_ == self.gold, 'simulator has %s pairs only' % self.gold
+        return self._call(
+            scheduler.ORDER, self._place, SELL, to_, rate, amount)
@@ -0,0 +1,115 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import abc
+
+import numpy as np
+import six
+from stevedore.driver import DriverManager
+from stevedore.extension import ExtensionManager
+
+from cryptotrade import portfolio
+from cryptotrade import trader
+
+
+ENGINE_NAMESPACE = 'ct.engines'
+
+
+_ENGINE_NAMES = None
+
+
+def list_engine_names():
+    global _ENGINE_NAMES
+    if _ENGINE_NAMES is None:
+        _ENGINE_NAMES = ExtensionManager(ENGINE_NAMESPACE).entry_points_names()
+    return _ENGINE_NAMES
+
+
+def get_engine(name):
+    return DriverManager(ENGINE_NAMESPACE, name, invoke_on_load=True).driver
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Engine(object):
+
+    @abc.abstractmethod
+    def trade(self, strategy, targets, weights, gold, fee, balances, rates,
+              ops_log=trader.OPS_NONE):
+        pass
+
+
+class LoopEngine(Engine):
+    def trade(self, strategy, targets, weights, gold, fee, balances, rates,
+              ops_log=trader.OPS_NONE):
+        return strategy.trade(
+            targets, weights, gold, fee, balances, rates, ops_log=ops_log)
+
+
+class VectorEngine(Engine):
+    # keeps rates as (time x currency) matrix and balances as a vector, and
+    # rebalances all currencies at once on each iteration instead of
+    # producing and applying TradeOp objects; note that ops are not recorded
+
+    def trade(self, strategy, targets, weights, gold, fee, balances, rates,
+              ops_log=trader.OPS_NONE):
+        res = portfolio.Portfolio.from_balances(
+            balances, list(targets or []) + [gold])
+        currencies, index = res.currencies, res.index
+        gold_j = index[gold]
+
+        rates_ = np.array(
+            [rates[currency] for currency in currencies],
+            dtype=np.float64).T
+        # updated in place
+        balances_ = res.amounts
+
+        weights_ = tradable = None
+        for i in range(rates_.shape[0]):
+            rate = rates_[i]
+            worth = balances_ * rate
+            new_weights = strategy.get_weights_vector(
+                index, targets, weights, gold, worth, rates_, i)
+            if new_weights is None:
+                continue
+            if new_weights is not weights_:
+                # todo: revisit the rounding workaround
+                assert \
+                    round(np.nansum(new_weights), 5) == round(1.0, 5), \
+                    "new targets don't add up to 1.0"
+                tradable = ~np.isnan(new_weights)
+                tradable[gold_j] = False
+                weights_ = new_weights
+                trade_weights = np.where(tradable, new_weights, 0.0)
+
+            gold_diff = np.where(
+                tradable, worth.sum() * trade_weights - worth, 0.0)
+            # buy a bit less than needed to leave some gold for fees
+            gold_diff = np.where(
+                gold_diff > 0, gold_diff / strategy.adjust_gold, gold_diff)
+            balances_ += gold_diff / rate
+            balances_[gold_j] -= gold_diff.sum()
+            # sold out currencies should not be left with rounding errors
+            balances_[tradable & (trade_weights == 0.0)] = 0.0
+
+            assert \
+                balances_.min() >= 0.0, \
+                "negative balance! %s" % dict(zip(currencies, balances_))
+
+        return None, res
@@ -0,0 +1,353 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Offline benchmarks for trading and data layer hot paths.
+#
+# Run with `python -m cryptotrade.bench --baseline FILE` (or `tox -e bench`):
+# the first run records the baseline, next runs fail if any benchmark got
+# slower or hungrier for memory than the baseline by more than tolerance.
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+from cryptotrade import backtest
+from cryptotrade import cache
+from cryptotrade import exchange
+from cryptotrade import trader
+
+
+# (currencies, candles) of generated rate matrices
+SIZES = ((10, 1000), (50, 2000), (100, 4000))
+QUICK_SIZES = ((5, 200), (10, 500))
+
+# relative slowdown or memory growth that is considered a regression
+TOLERANCE = 0.25
+
+PERIOD = 300
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+
+def get_currencies(n):
+    return ['C%03d' % j for j in range(n)]
+
+
+def generate_rates(currencies, candles, gold='BTC', seed=0):
+    # geometric random walks, one per currency
+    rng = np.random.RandomState(seed)
+    steps = rng.normal(0, 0.01, (currencies, candles))
+    walks = (
+        np.exp(np.cumsum(steps, axis=1)) *
+        rng.uniform(0.001, 0.1, (currencies, 1)))
+    res = {
+        currency: walk.tolist()
+        for currency, walk in zip(get_currencies(currencies), walks)
+    }
+    res[gold] = [1.0] * candles
+    return res
+
+
+class SyntheticExchange(exchange.Exchange):
+    '''Exchange serving generated market data without any network access.
+
+    Candles are a function of pair and date only, so any range requested
+    at any time is consistent with others.
+    '''
+
+    CANDLESTICKS = (300, 900, 1800, 7200, 14400, 86400)
+
+    def __init__(self, conf=None, currencies=10):
+        super(SyntheticExchange, self).__init__(conf or {})
+        self.currencies = get_currencies(currencies)
+        self.orders = 0
+
+    @staticmethod
+    def _price(currency, dates):
+        phase = zlib.crc32(currency.encode('utf-8')) % 1000
+        return 0.05 * (1.5 + np.sin((dates / 3600.0 + phase) / 24.0))
+
+    def get_balances(self):
+        res = {currency: 1.0 for currency in self.currencies}
+        res['BTC'] = 1.0
+        return res
+
+    def get_rate(self, from_, to_):
+        if from_ == to_:
+            return 1.0
+        return float(self._price(to_, np.array([time.time()]))[0])
+
+    def get_rates(self, gold, currencies):
+        return {
+            currency: self.get_rate(gold, currency)
+            for currency in currencies
+        }
+
+    def get_candlesticks(self, from_, to_, period, start, end):
+        dates = np.arange(start + (-start % period), end + 1, period)
+        opens = self._price(to_, dates)
+        closes = self._price(to_, dates + period)
+        return [
+            {'date': date, 'open': open_, 'close': close,
+             'high': max(open_, close), 'low': min(open_, close),
+             'volume': 1.0}
+            for date, open_, close in zip(
+                dates.tolist(), opens.tolist(), closes.tolist())
+        ]
+
+    def get_orders(self):
+        return {}
+
+    def cancel_order(self, order):
+        pass
+
+    def get_fee(self):
+        return 0.0025
+
+    def _order(self):
+        self.orders += 1
+        return {'orderNumber': self.orders}
+
+    def buy(self, from_, to_, rate, amount):
+        return self._order()
+
+    def sell(self, from_, to_, rate, amount):
+        return self._order()
+
+
+def _trade_case(engine, strategy, currencies, candles):
+    rates = generate_rates(currencies, candles)
+    targets = sorted(rates)
+    balances = {currency: 1.0 for currency in targets}
+    engine_ = backtest.get_engine(engine)
+
+    def run():
+        engine_.trade(
+            trader.get_strategy(strategy), targets, None, 'BTC', 0.0025,
+            balances, rates)
+    return currencies * candles, run
+
+
+def _rates_case(columnar, currencies, candles):
+    ex = SyntheticExchange(currencies=currencies)
+    end = 1500000000
+    start = end - PERIOD * (candles - 1)
+    path = None
+    if columnar:
+        path = tempfile.mkdtemp()
+        ex.candle_cache = cache.ColumnarCandleCache(path)
+        # measure reading of stored candles, not generation
+        ex.get_closing_rates('BTC', ex.currencies, PERIOD, start, end)
+
+    def run():
+        ex.get_closing_rates('BTC', ex.currencies, PERIOD, start, end)
+    return currencies * candles, run, path
+
+
+def _worth_case(currencies):
+    ex = SyntheticExchange(currencies=currencies)
+    balances = ex.get_balances()
+    rates = ex.get_rates('BTC', list(balances))
+
+    def run():
+        ex.get_worth('BTC', balances=balances, rates=rates)
+    return 1, run
+
+
+_STARTUP_SCRIPT = '''
+import sys
+from cryptotrade.cmd import ct
+try:
+    ct.main(['-c', sys.argv[1], 'balance', '--help'])
+except SystemExit:
+    pass
+'''
+
+
+def _startup_case(conf):
+    def run():
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(
+                [sys.executable, '-c', _STARTUP_SCRIPT, conf],
+                stdout=devnull, stderr=devnull)
+    return 1, run
+
+
+def get_cases(sizes, conf):
+    # yields (name, repeat, units, run, cleanup path)
+    for currencies, candles in sizes:
+        size = '%dx%d' % (currencies, candles)
+        for engine in ('loop', 'vector'):
+            for strategy in ('crp', 'pamr'):
+                units, run = _trade_case(
+                    engine, strategy, currencies, candles)
+                yield ('trade/%s/%s/%s' % (engine, strategy, size),
+                       5, units, run, None)
+        for columnar in (False, True):
+            units, run, path = _rates_case(columnar, currencies, candles)
+            yield ('rates/%s/%s' % ('columnar' if columnar else 'nocache',
+                                    size),
+                   5, units, run, path)
+        units, run = _worth_case(currencies)
+        yield 'worth/%d' % currencies, 200, units, run, None
+    units, run = _startup_case(conf)
+    yield 'startup', 5, units, run, None
+
+
+def measure(run, repeat, units):
+    latencies = []
+    for _ in range(repeat):
+        start = _timer()
+        run()
+        latencies.append(_timer() - start)
+
+    # separate run, since tracing allocations slows everything down
+    peak_memory = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            run()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]).tolist()
+    return {
+        'p50': p50,
+        'p90': p90,
+        'p99': p99,
+        'throughput': units / p50 if p50 else None,
+        'peak_memory': peak_memory,
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    regressions = []
+    for name, res in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if res['p50'] > base['p50'] * (1 + tolerance):
+            regressions.append(
+                '%s: median latency %.6fs, baseline %.6fs' %
+                (name, res['p50'], base['p50']))
+        if (res['peak_memory'] and base.get('peak_memory') and
+                res['peak_memory'] > base['peak_memory'] * (1 + tolerance)):
+            regressions.append(
+                '%s: peak memory %d bytes, baseline %d bytes' %
+                (name, res['peak_memory'], base['peak_memory']))
+    return regressions
+
+
+def run(sizes, name_filter=None, out=sys.stdout):
+    fd, conf = tempfile.mkstemp()
+    with os.fdopen(fd, 'w') as f:
+        f.write('poloniex:\n'
+                '    api_key: fakekey\n'
+                '    api_secret: fakesecret\n')
+    results = {}
+    try:
+        for name, repeat, units, run_, path in get_cases(sizes, conf):
+            try:
+                if name_filter and name_filter not in name:
+                    continue
+                res = results[name] = measure(run_, repeat, units)
+                print('%-32s p50 %10.6fs  p99 %10.6fs  %12.1f/s  %s' % (
+                    name, res['p50'], res['p99'], res['throughput'] or 0,
+                    '%.1f KiB' % (res['peak_memory'] / 1024.0)
+                    if res['peak_memory'] is not None else '-'),
+                    file=out)
+            finally:
+                if path:
+                    shutil.rmtree(path)
+    finally:
+        os.remove(conf)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='offline benchmarks for cryptotrade')
+    parser.add_argument(
+        '--baseline',
+        metavar='FILE',
+        help='compare with results stored in the file; if the file does '
+             'not exist, store results there')
+    parser.add_argument(
+        '--save',
+        action='store_true',
+        default=False,
+        help='overwrite baseline with new results')
+    parser.add_argument(
+        '--quick',
+        action='store_true',
+        default=False,
+        help='use small rate matrices only')
+    parser.add_argument(
+        '--filter',
+        metavar='SUBSTRING',
+        help='run only benchmarks with names containing the substring')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=TOLERANCE,
+        help='allowed relative slowdown (default: %s)' % TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run(QUICK_SIZES if args.quick else SIZES, args.filter)
+    if not args.baseline:
+        return 0
+
+    if args.save or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('Baseline stored in %s' % args.baseline)
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print('\nPERFORMANCE REGRESSIONS (tolerance %d%%):' %
+              (args.tolerance * 100), file=sys.stderr)
+        for regression in regressions:
+            print(' * %s' % regression, file=sys.stderr)
+        return 1
+    print('No regressions against %s' % args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,391 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import errno
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+DEFAULT_TICKER_TTL = 60
+
+
+def _missing_ranges(ranges, start, end):
+    # ranges is a sorted list of disjoint [start, end] intervals
+    res = []
+    for start_, end_ in ranges:
+        if end_ < start:
+            continue
+        if start_ > end:
+            break
+        if start_ > start:
+            res.append((start, start_))
+        start = max(start, end_)
+    if start < end:
+        res.append((start, end))
+    return res
+
+
+def _merge_ranges(ranges, start, end):
+    res = []
+    for start_, end_ in sorted(ranges + [[start, end]]):
+        if res and start_ <= res[-1][1]:
+            res[-1][1] = max(res[-1][1], end_)
+        else:
+            res.append([start_, end_])
+    return res
+
+
+def _makedirs(dirname):
+    # other threads and processes may be creating the same directory
+    try:
+        os.makedirs(dirname)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def _atomic_write(filename, data):
+    dirname = os.path.dirname(filename)
+    _makedirs(dirname)
+    fd, tmpname = tempfile.mkstemp(dir=dirname)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.rename(tmpname, filename)
+
+
+def _fetch_missing(fetch, ranges, from_, to_, period, start, end):
+    # fetch candles for [start, end] that are not covered by ranges yet;
+    # returns candles to store, candles not to store, and new ranges
+    closed = time.time() - period
+    stored = {}
+    fresh = {}
+    for start_, end_ in _missing_ranges(ranges, start, end):
+        fetched = fetch(from_, to_, period, start_, end_)
+        # sometimes candlesticks get back with zero rates, don't cache
+        # them so that next fetch has a chance to get correct values
+        valid = all([candle['close'] != 0.0 for candle in fetched])
+        for candle in fetched:
+            # candles that are not closed yet should not be cached
+            if valid and candle['date'] <= closed:
+                stored[candle['date']] = candle
+            else:
+                fresh[candle['date']] = candle
+        if valid and start_ < closed:
+            ranges = _merge_ranges(ranges, start_, min(end_, closed))
+    return stored, fresh, ranges
+
+
+class CandleCache(object):
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+
+    def _get_filename(self, exchange, pair, period):
+        return os.path.join(
+            self.path, 'candles', exchange, '%s-%d.json' % (pair, period))
+
+    def _load(self, filename):
+        if not os.path.exists(filename):
+            return {'ranges': [], 'candles': []}
+        with open(filename, 'r') as f:
+            return json.load(f)
+
+    def get_candlesticks(self, fetch, exchange, from_, to_, period, start,
+                         end):
+        filename = self._get_filename(
+            exchange, '%s_%s' % (from_, to_), period)
+        data = self._load(filename)
+        candles = {candle['date']: candle for candle in data['candles']}
+
+        stored, fresh, ranges = _fetch_missing(
+            fetch, data['ranges'], from_, to_, period, start, end)
+        candles.update(stored)
+        if ranges != data['ranges']:
+            data['ranges'] = ranges
+            data['candles'] = [candles[k] for k in sorted(candles)]
+            _atomic_write(filename, data)
+
+        candles.update(fresh)
+        return [
+            candles[k] for k in sorted(candles)
+            if start <= k <= end
+        ]
+
+    def get_columns(self, fetch, exchange, from_, to_, period, start, end,
+                    fields):
+        candles = self.get_candlesticks(
+            fetch, exchange, from_, to_, period, start, end)
+        return {
+            field: [candle[field] for candle in candles]
+            for field in fields
+        }
+
+
+class ColumnarCandleCache(object):
+
+    # keeps each candle field of a pair in a separate file of fixed width
+    # values sorted by date, so that readers map only the columns they need
+    # and slice them by time without parsing or copying anything
+
+    FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+
+    def _get_dirname(self, exchange, pair, period):
+        return os.path.join(
+            self.path, 'columns', exchange, '%s-%d' % (pair, period))
+
+    @staticmethod
+    def _get_filename(dirname, field):
+        return os.path.join(dirname, '%s.bin' % field)
+
+    @staticmethod
+    def _get_dtype(field):
+        return np.int64 if field == 'date' else np.float64
+
+    def _load_ranges(self, dirname):
+        try:
+            with open(os.path.join(dirname, 'ranges.json'), 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return []
+
+    def _length(self, dirname):
+        # a concurrent writer may have appended to some columns only, so
+        # use the number of rows present in all of them
+        try:
+            return min(
+                os.path.getsize(self._get_filename(dirname, field)) // 8
+                for field in ('date',) + self.FIELDS)
+        except OSError:
+            return 0
+
+    def _open(self, dirname, field, length):
+        dtype = self._get_dtype(field)
+        if not length:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(
+            self._get_filename(dirname, field), dtype=dtype, mode='r',
+            shape=(length,))
+
+    def _store(self, dirname, candles):
+        _makedirs(dirname)
+        length = self._length(dirname)
+        dates = self._open(dirname, 'date', length)
+        new_dates = sorted(candles)
+
+        if not length or new_dates[0] > dates[-1]:
+            # common case: new candles go after all stored ones
+            for field in ('date',) + self.FIELDS:
+                values = np.array(
+                    [candles[date][field] for date in new_dates],
+                    dtype=self._get_dtype(field))
+                filename = self._get_filename(dirname, field)
+                with open(filename, 'r+b' if length else 'wb') as f:
+                    f.seek(length * 8)
+                    f.truncate()
+                    f.write(values.tobytes())
+            return
+
+        # otherwise merge and replace each column atomically
+        all_dates = np.union1d(dates, np.array(new_dates, dtype=np.int64))
+        for field in ('date',) + self.FIELDS:
+            values = dict(zip(
+                dates.tolist(),
+                self._open(dirname, field, length).tolist()))
+            values.update(
+                (date, candles[date][field]) for date in new_dates)
+            column = np.array(
+                [values[date] for date in all_dates.tolist()],
+                dtype=self._get_dtype(field))
+            fd, tmpname = tempfile.mkstemp(dir=dirname)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(column.tobytes())
+            os.rename(tmpname, self._get_filename(dirname, field))
+
+    def _update(self, fetch, exchange, from_, to_, period, start, end):
+        dirname = self._get_dirname(exchange, '%s_%s' % (from_, to_), period)
+        ranges = self._load_ranges(dirname)
+        stored, fresh, new_ranges = _fetch_missing(
+            fetch, ranges, from_, to_, period, start, end)
+        if stored:
+            self._store(dirname, stored)
+        if new_ranges != ranges:
+            _atomic_write(os.path.join(dirname, 'ranges.json'), new_ranges)
+        fresh = {
+            date: candle for date, candle in fresh.items()
+            if start <= date <= end
+        }
+        return dirname, fresh
+
+    def _slice(self, dirname, start, end):
+        length = self._length(dirname)
+        dates = self._open(dirname, 'date', length)
+        return (
+            length,
+            np.searchsorted(dates, start, 'left'),
+            np.searchsorted(dates, end, 'right'))
+
+    def get_candlesticks(self, fetch, exchange, from_, to_, period, start,
+                         end):
+        dirname, fresh = self._update(
+            fetch, exchange, from_, to_, period, start, end)
+        length, lo, hi = self._slice(dirname, start, end)
+        columns = {
+            field: self._open(dirname, field, length)[lo:hi].tolist()
+            for field in ('date',) + self.FIELDS
+        }
+        candles = {
+            date: {
+                field: columns[field][i]
+                for field in ('date',) + self.FIELDS
+            }
+            for i, date in enumerate(columns['date'])
+        }
+        candles.update(fresh)
+        return [candles[k] for k in sorted(candles)]
+
+    def get_columns(self, fetch, exchange, from_, to_, period, start, end,
+                    fields):
+        dirname, fresh = self._update(
+            fetch, exchange, from_, to_, period, start, end)
+        length, lo, hi = self._slice(dirname, start, end)
+        # read-only views into the mapped column files
+        res = {
+            field: self._open(dirname, field, length)[lo:hi]
+            for field in fields
+        }
+        if not fresh:
+            return res
+
+        dates = self._open(dirname, 'date', length)[lo:hi].tolist()
+        all_dates = sorted(set(dates) | set(fresh))
+        for field in fields:
+            merged = dict(zip(dates, res[field].tolist()))
+            merged.update(
+                (date, candle[field]) for date, candle in fresh.items())
+            res[field] = np.array(
+                [merged[date] for date in all_dates],
+                dtype=self._get_dtype(field))
+        return res
+
+
+class SnapshotCache(object):
+
+    # keeps api responses (like tickers) for ttl seconds; if path is set,
+    # snapshots are also shared between processes through files that are
+    # replaced atomically, so that short lived ct invocations start warm
+
+    def __init__(self, name, ttl, path=None):
+        self.name = name
+        self.ttl = ttl
+        self.path = os.path.expanduser(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = {}
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _get_filename(self, key):
+        return os.path.join(self.path, 'snapshots', self.name, key + '.json')
+
+    def _is_fresh(self, snapshot):
+        return (
+            snapshot is not None and
+            time.time() - snapshot['time'] < self.ttl)
+
+    def _load(self, key):
+        snapshot = self._snapshots.get(key)
+        if not self._is_fresh(snapshot) and self.path:
+            # other process could have refreshed it meanwhile
+            try:
+                with open(self._get_filename(key), 'r') as f:
+                    snapshot = json.load(f)
+            except (IOError, OSError, ValueError):
+                pass
+        return snapshot
+
+    def get(self, key, fetch):
+        snapshot = self._load(key)
+        if self._is_fresh(snapshot):
+            self._snapshots[key] = snapshot
+            self.hits += 1
+            return snapshot['data']
+
+        self.misses += 1
+        snapshot = {'time': time.time(), 'data': fetch()}
+        self._snapshots[key] = snapshot
+        if self.path:
+            _atomic_write(self._get_filename(key), snapshot)
+        return snapshot['data']
+
+
+class StateFile(object):
+
+    # small json document that survives between ct runs, like strategy
+    # state of trade_execute
+
+    def __init__(self, filename):
+        self.filename = os.path.expanduser(filename)
+
+    def load(self):
+        try:
+            with open(self.filename, 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def save(self, data):
+        _atomic_write(self.filename, data)
+
+
+def get_state_file(conf, name):
+    try:
+        path = conf['cache']['path']
+    except (KeyError, TypeError):
+        return None
+    return StateFile(
+        os.path.join(os.path.expanduser(path), 'state', name + '.json'))
+
+
+def get_snapshot_cache(conf, name):
+    try:
+        path = conf['cache']['path']
+    except (KeyError, TypeError):
+        path = None
+    return SnapshotCache(
+        name, conf[name].get('ticker_ttl', DEFAULT_TICKER_TTL), path=path)
+
+
+def get_candle_cache(conf):
+    try:
+        cache_conf = conf['cache']
+    except (KeyError, TypeError):
+        return None
+    if cache_conf.get('format', 'json') == 'columnar':
+        return ColumnarCandleCache(cache_conf['path'])
+    return CandleCache(cache_conf['path'])
@@ -23,11 +23,22 @@ import time
 from cliff.lister import Lister
 
 from cryptotrade._exchanges import polo
+from cryptotrade import backtest
 from cryptotrade import exchange
+from cryptotrade import rates as rates_
+from cryptotrade import sweep
 from cryptotrade import trader
 from cryptotrade.cli import trade_base
 
 
+def _weights(value):
+    return tuple(float(w) for w in value.split(','))
+
+
+def _format_weights(weights):
+    return ','.join('%g' % w for w in weights) if weights else '-'
+
+
 class TradeAssessCommand(Lister, trade_base.BaseTradeCommand):
     '''assess trade strategy'''
 
@@ -48,9 +59,136 @@ class TradeAssessCommand(Lister, trade_base.BaseTradeCommand):
             required=True,
             type=float,
             help='past time period to assess')
+        parser.add_argument(
+            '--engine',
+            dest='engine',
+            default='loop',
+            choices=backtest.list_engine_names(),
+            help='backtest engine to assess strategy with (default: loop)')
+        # sweep mode: each option extends the corresponding regular option
+        # and all combinations of values are assessed
+        parser.add_argument(
+            '--sweep-strategy',
+            dest='sweep_strategies',
+            action='append',
+            metavar='STRATEGY',
+            choices=trader.list_strategy_names(),
+            help='additional strategy to assess in sweep mode')
+        parser.add_argument(
+            '--sweep-weights',
+            dest='sweep_weights',
+            action='append',
+            type=_weights,
+            metavar='WEIGHT,...',
+            help='additional weights (in order of -t) to assess in sweep mode')
+        parser.add_argument(
+            '--sweep-interval',
+            dest='sweep_intervals',
+            action='append',
+            type=int,
+            metavar='INTERVAL',
+            choices=polo.Poloniex.CANDLESTICKS,
+            help='additional interval to assess in sweep mode')
+        parser.add_argument(
+            '--sweep-adjust-gold',
+            dest='sweep_adjust_gold',
+            action='append',
+            type=float,
+            metavar='FACTOR',
+            help='gold adjustment factor to assess in sweep mode')
+        parser.add_argument(
+            '-j',
+            dest='jobs',
+            type=int,
+            default=None,
+            help='number of processes for sweep mode (default: CPU count)')
         return parser
 
+    @staticmethod
+    def _is_sweep(parsed_args):
+        return any([
+            parsed_args.sweep_strategies,
+            parsed_args.sweep_weights,
+            parsed_args.sweep_intervals,
+            parsed_args.sweep_adjust_gold,
+        ])
+
+    def take_sweep_action(self, parsed_args):
+        ex = exchange.get_exchange_by_name(self.app.cfg, parsed_args.exchange)
+
+        now = time.time()
+        in_past = now - 60 * 60 * 24 * parsed_args.period
+
+        gold = 'BTC'
+
+        targets = parsed_args.targets
+        balances = self.get_balances(parsed_args)
+        currencies = list(set(list(balances.keys()) + targets))
+
+        strategies = (
+            ([parsed_args.strategy] if parsed_args.strategy else []) +
+            (parsed_args.sweep_strategies or []))
+        weights = (
+            ([tuple(parsed_args.weights)] if parsed_args.weights else []) +
+            (parsed_args.sweep_weights or [])) or [None]
+        intervals = sorted(
+            set([parsed_args.interval] + (parsed_args.sweep_intervals or [])))
+        adjust_golds = parsed_args.sweep_adjust_gold or [None]
+
+        current_rates = ex.get_rates(gold, currencies)
+        old_worth_btc = ex.get_worth(
+            gold, balances=balances, rates=current_rates)
+
+        # rates are fetched once and mapped by workers from a shared file
+        shared_rates = {}
+        try:
+            for interval in intervals:
+                rates = ex.get_closing_rates(
+                    gold, currencies, interval, in_past, now)
+                shared_rates[interval] = (
+                    rates_.RatesMatrix.from_rates(rates).publish())
+
+            context = sweep.Context(
+                engine=parsed_args.engine, targets=targets, gold=gold,
+                fee=ex.get_fee(), balances=balances, rates=shared_rates)
+            jobs = sweep.get_jobs(
+                strategies, weights, intervals, adjust_golds)
+
+            results = []
+            for done, (job, new_balances, error) in enumerate(
+                    sweep.run(jobs, context, processes=parsed_args.jobs), 1):
+                if error is None:
+                    worth = ex.get_worth(
+                        gold, balances=new_balances, rates=current_rates)
+                    outcome = '%.8f BTC' % worth
+                else:
+                    worth = None
+                    outcome = error
+                results.append((job, worth, error))
+                self.app.stdout.write(
+                    '[%d/%d] %s -i %d -w %s adjust_gold=%s: %s\n' %
+                    (done, len(jobs), job.strategy, job.interval,
+                     _format_weights(job.weights), job.adjust_gold or '-',
+                     outcome))
+                self.app.stdout.flush()
+        finally:
+            for shared in shared_rates.values():
+                rates_.unpublish(shared)
+
+        # best results first, failed jobs last
+        results.sort(key=lambda r: (r[1] is None, -(r[1] or 0)))
+        return (
+            ('Rank', 'Strategy', 'Interval', 'Weights', 'Adjust gold',
+             'Old BTC', 'New BTC', 'Error'),
+            ((rank, job.strategy, job.interval, _format_weights(job.weights),
+              job.adjust_gold or '-', old_worth_btc, worth, error or '')
+             for rank, (job, worth, error) in enumerate(results, 1)),
+        )
+
     def take_action(self, parsed_args):
+        if self._is_sweep(parsed_args):
+            return self.take_sweep_action(parsed_args)
+
         ex = exchange.get_exchange_by_name(self.app.cfg, parsed_args.exchange)
 
         now = time.time()
@@ -65,13 +203,14 @@ class TradeAssessCommand(Lister, trade_base.BaseTradeCommand):
         old_worth_btc = ex.get_worth('BTC', balances=balances)
 
         rates = ex.get_closing_rates(
-            gold, list(set(balances.keys() + targets)),
+            gold, list(set(list(balances.keys()) + targets)),
             parsed_args.interval,
             in_past, now)
 
         strategy = trader.get_strategy(parsed_args.strategy)
-        _, new_balances = strategy.trade(
-            targets, weights, gold, ex.get_fee(), balances, rates)
+        engine = backtest.get_engine(parsed_args.engine)
+        _, new_balances = engine.trade(
+            strategy, targets, weights, gold, ex.get_fee(), balances, rates)
 
         new_worth_btc = ex.get_worth('BTC', balances=new_balances)
 
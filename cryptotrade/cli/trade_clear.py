@@ -20,9 +20,6 @@
 
 from cliff.command import Command
 
-# todo: transform into exchange agnostic exceptions
-from poloniex import exceptions as plx_exc
-
 from cryptotrade import exchange
 from cryptotrade import trader
 
@@ -76,14 +73,15 @@ class TradeClearCommand(Command):
                 if answer not in 'yY':
                     return
 
-        for _, orders_ in orders.items():
-            for order in orders_:
-                order_number = order['orderNumber']
-                try:
-                    ex.cancel_order(order)
-                except plx_exc.PoloniexCommandException as e:
-                    print('Failed to cancel order #%(order_number)d: %(e)s' %
-                          {'order_number': order_number, 'e': e})
-                    raise
-
-                print('Cancelled order %d' % order_number)
+        orders = [order for orders_ in orders.values() for order in orders_]
+        failed = 0
+        for order, res in zip(orders, ex.cancel_orders(orders)):
+            d = {'order_number': order['orderNumber'], 'e': res.error}
+            if res.error is None:
+                print('Cancelled order %(order_number)d' % d)
+            else:
+                print('Failed to cancel order #%(order_number)d: %(e)s' % d)
+                failed += 1
+        if failed:
+            raise exchange.CommandError(
+                'Failed to cancel %d of %d orders' % (failed, len(orders)))
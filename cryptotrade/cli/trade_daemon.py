@@ -0,0 +1,131 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logging
+
+from cryptotrade.cli import trade_execute
+from cryptotrade import exchange
+from cryptotrade import trader
+
+
+LOG = logging.getLogger(__name__)
+
+# failures of exchange that are expected to go away by the next cycle
+EXCHANGE_ERRORS = (
+    exchange.CommandError, exchange.ExchangeTimeout, EnvironmentError)
+
+
+class TradeDaemonCommand(trade_execute.TradeExecuteCommand):
+    '''execute trade strategy on each interval, staying resident'''
+
+    # how long before candle close to warm up caches and connections
+    PREFETCH = 30
+
+    # refreshed on prefetch
+    fee = None
+
+    def get_parser(self, prog_name):
+        parser = super(TradeDaemonCommand, self).get_parser(prog_name)
+        parser.add_argument(
+            '--cycles',
+            type=int,
+            default=None,
+            help='number of trading cycles to run (default: unlimited)')
+        return parser
+
+    def get_fee(self, ex):
+        # refreshed on prefetch, no need to query it again in the cycle
+        if self.fee is None:
+            self.fee = ex.get_fee()
+        return self.fee
+
+    def get_ops(self, ex, strategy, gold, parsed_args):
+        ops = super(TradeDaemonCommand, self).get_ops(
+            ex, strategy, gold, parsed_args)
+        latency = ex.clock.time() - self.boundary
+        self.report('Decision made %.3f seconds after candle close' % latency)
+        return ops
+
+    def get_rates_range(self, ex, interval):
+        # decide on the candle that closed on the boundary
+        last = self.boundary - interval
+        return last, last
+
+    def _get_currencies(self, parsed_args):
+        currencies = set(parsed_args.targets or [])
+        if self.stream is not None:
+            # held on the previous cycle
+            currencies.update(self.stream.balances)
+        return sorted(currencies - set(['BTC']))
+
+    def prefetch(self, ex, parsed_args):
+        self.fee = ex.get_fee()
+        # balances are left to the cycle since orders it cancels release
+        # funds
+        currencies = self._get_currencies(parsed_args)
+        # warm up ticker for placing orders
+        ex.get_rates('BTC', currencies)
+        if ex.candle_cache is not None:
+            # cache the finest candles of the closing candle traded so far,
+            # so that only the last of them is left to fetch after the close
+            start, end = self.get_rates_range(ex, parsed_args.interval)
+            for currency in currencies:
+                ex.get_columns(('close',), 'BTC', currency,
+                               parsed_args.interval, start, end)
+
+    def wait_until(self, ex, when):
+        ex.clock.sleep(when - ex.clock.time())
+
+    def take_action(self, parsed_args):
+        # there is nobody to confirm orders
+        parsed_args.force = True
+
+        # exchange and strategy objects, as well as their caches and
+        # connections, are reused between cycles
+        ex = exchange.get_exchange_by_name(self.app.cfg, parsed_args.exchange)
+        strategy = trader.get_strategy(parsed_args.strategy)
+        self.run_cycles(ex, strategy, parsed_args)
+
+    def run_cycles(self, ex, strategy, parsed_args, until=None):
+        interval = parsed_args.interval
+        cycles = 0
+        while parsed_args.cycles is None or cycles < parsed_args.cycles:
+            self.boundary = (ex.clock.time() // interval + 1) * interval
+            if until is not None and self.boundary > until:
+                break
+            self.wait_until(
+                ex, self.boundary - min(self.PREFETCH, interval / 2))
+            try:
+                self.prefetch(ex, parsed_args)
+            except Exception as e:
+                # the cycle will fetch what it needs on its own
+                LOG.warning('Prefetch failed: %s', e)
+            self.wait_until(ex, self.boundary)
+            try:
+                self.run_cycle(ex, strategy, parsed_args)
+            except EXCHANGE_ERRORS as e:
+                # exchange may get back by the next boundary
+                LOG.error('Trading cycle at %d failed: %s', self.boundary, e)
+            except Exception:
+                # e.g. rates that couldn't be fetched, or strategy failing on
+                # them; start over with strategy state of the last good cycle
+                LOG.exception('Trading cycle at %d failed', self.boundary)
+                self.stream = self.candle = None
+            cycles += 1
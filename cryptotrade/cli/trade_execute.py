@@ -18,20 +18,35 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import time
-
-# todo: transform into exchange agnostic exceptions
-from poloniex import exceptions as plx_exc
+from six.moves import input
 
 from cryptotrade._exchanges import polo
 from cryptotrade.cli import trade_base
+from cryptotrade import cache
 from cryptotrade import exchange
+from cryptotrade import orders
 from cryptotrade import trader
 
 
 class TradeExecuteCommand(trade_base.BaseTradeCommand):
     '''execute trade strategy'''
 
+    # how many times to respin trading cycle if orders don't execute
+    CYCLE_ATTEMPTS = 3
+    # how long to wait for orders to execute before respinning
+    ORDERS_TIMEOUT = 300
+    # how often to check for executed orders, at most
+    POLL_INTERVAL = 10
+    # how many times to try cancelling an order
+    CANCEL_ATTEMPTS = 3
+    # how much worse than pre-calculated rate can be paid to outbid others
+    OUTBID_TOLERANCE = 1.002
+
+    # strategy state between cycles, see get_ops()
+    stream = None
+    candle = None
+    currencies = None
+
     def get_parser(self, prog_name):
         parser = super(TradeExecuteCommand, self).get_parser(prog_name)
         parser.add_argument(
@@ -47,171 +62,270 @@ class TradeExecuteCommand(trade_base.BaseTradeCommand):
             # todo: untangle from poloniex exchange
             choices=polo.Poloniex.CANDLESTICKS,
             help='time since previous assessment')
+        parser.add_argument(
+            '--state',
+            metavar='FILE',
+            default=None,
+            help='file to keep strategy state in between runs (default: '
+                 'under cache path, if configured)')
         return parser
 
-    def take_action(self, parsed_args):
-        attempts = 0
-        while True:
-            # flag indicating whether we are done with all trading for the
-            # cycle and can bail out
-            exit = False
-            attempts += 1
-            if attempts > 3:
-                print("Couldn't complete trading cycle with "
-                      "all orders closed, bailing out")
+    def get_state_file(self, parsed_args):
+        if parsed_args.state:
+            return cache.StateFile(parsed_args.state)
+        return cache.get_state_file(
+            self.app.cfg,
+            'trade-%s-%s-%d' % (parsed_args.exchange, parsed_args.strategy,
+                                parsed_args.interval))
+
+    @staticmethod
+    def _get_state_key(parsed_args, currencies):
+        # state of a different setup is of no use
+        return {
+            'strategy': parsed_args.strategy,
+            'interval': parsed_args.interval,
+            'targets': parsed_args.targets,
+            'weights': parsed_args.weights,
+            'currencies': sorted(currencies),
+        }
+
+    def load_state(self, parsed_args, currencies, candle):
+        state_file = self.get_state_file(parsed_args)
+        state = state_file.load() if state_file else None
+        if (not state or
+                state['key'] != self._get_state_key(parsed_args, currencies)):
+            return False
+        # state missing cycles in between would feed strategy with a gap
+        if candle - state['candle'] // parsed_args.interval > 1:
+            return False
+        self.stream.set_state(state['stream'])
+        self.candle = state['candle'] // parsed_args.interval
+        return True
+
+    def save_state(self, parsed_args):
+        state_file = self.get_state_file(parsed_args)
+        if state_file:
+            state_file.save({
+                'key': self._get_state_key(parsed_args, self.currencies),
+                'candle': self.candle * parsed_args.interval,
+                'stream': self.stream.get_state(),
+            })
+
+    def report(self, message):
+        # all chatter of execution loop goes through here
+        print(message)
+
+    def cancel_orders(self, ex):
+        pending = [
+            order for orders_ in ex.get_orders().values() for order in orders_
+        ]
+        for _ in range(self.CANCEL_ATTEMPTS):
+            if not pending:
                 break
+            results = ex.cancel_orders(pending)
+            failed = []
+            for order, res in zip(pending, results):
+                d = {'order_number': order['orderNumber'], 'e': res.error}
+                if res.error is None:
+                    self.report('Cancelled order %(order_number)d' % d)
+                else:
+                    self.report('Failed to cancel order #%(order_number)d: '
+                                '%(e)s' % d)
+                    failed.append(order)
+            pending = failed
+        # orders still failing are apparently no longer
+
+    def get_fee(self, ex):
+        return ex.get_fee()
+
+    def get_trade_balances(self, ex):
+        # strategy manages balances on all exchanges as a single portfolio
+        return exchange.get_global_balance(self.app.cfg)
+
+    def get_rates_range(self, ex, interval):
+        # candles to decide on: the current one
+        now = ex.clock.time()
+        return now - interval, now
+
+    def _get_rates(self, get_rates, gold, currencies, interval, start, end):
+        rates = get_rates(gold, currencies, interval, start, end)
+        assert \
+            all([len(v) == 1 for v in rates.values()]), \
+            "too many rate results"
+        return {currency: v[0] for currency, v in rates.items()}
+
+    def get_ops(self, ex, strategy, gold, parsed_args):
+        interval = parsed_args.interval
+        balances = self.get_trade_balances(ex)
+
+        now = ex.clock.time()
+        candle = int(now // interval)
+        start, end = self.get_rates_range(ex, interval)
+        all_currencies = list(set(list(balances.keys()) + parsed_args.targets))
+
+        if self.stream is None:
+            self.stream = strategy.stream(
+                parsed_args.targets, parsed_args.weights, gold,
+                self.get_fee(ex), balances)
+            self.currencies = all_currencies
+            if not self.load_state(parsed_args, all_currencies, candle):
+                # warm up strategy with opening rates of the current candle
+                self.stream.feed(self._get_rates(
+                    ex.get_opening_rates, gold, all_currencies, interval,
+                    start, end))
 
-            ex = exchange.get_exchange_by_name(
-                self.app.cfg, parsed_args.exchange)
+        if candle == self.candle:
+            # respinning the same cycle: strategy already made its decision,
+            # recalculate orders for what is left to trade
+            ops, _ = self.stream.rebalance(balances)
+            return ops
 
+        ops, _ = self.stream.feed(
+            self._get_rates(
+                ex.get_closing_rates, gold, all_currencies, interval,
+                start, end),
+            balances=balances)
+        self.candle = candle
+        self.save_state(parsed_args)
+        return ops
+
+    def confirm_ops(self, gold, ops):
+        print('The following trade orders are to be schedule:')
+        for o in ops:
+            d = {'gold': gold,
+                 'op': o.op,
+                 'rate': o.rate,
+                 'gold_amount': o.gold_amount,
+                 'alt_amount': o.alt_amount,
+                 'alt': o.alt}
+            if o.op == trader.SELL_OP:
+                print(' * buy %(gold_amount).4f %(gold)s '
+                      'with %(alt_amount).4f %(alt)s '
+                      '(rate: %(rate)s)' % d)
+            else:
+                print(' * sell %(gold_amount).4f %(gold)s '
+                      'for %(alt_amount).4f %(alt)s '
+                      '(rate: %(rate)s)' % d)
+        answer = input("Would you like to proceed? ")
+        return answer in 'yY'
+
+    def create_orders(self, ex, gold, ops, tracker=None):
+        ops_ = []
+        for o in ops:
+            if o.scheduled:
+                continue
+            # poloniex doesn't support BTC amounts less than 0.0001
+            if o.alt_amount * o.rate < 0.0001:
+                self.report(
+                    "Ignore request for %f %s due to negligible size" %
+                    (o.alt_amount, o.alt))
+                o.scheduled = True
+                continue
+            ops_.append(o)
+        if not ops_:
+            return
+
+        # single snapshot of rates for all orders, instead of a request each
+        rates = ex.get_rates(gold, list(set(o.alt for o in ops_)))
+        requests = []
+        for o in ops_:
+            # try to outbid others, unless it's much worse than the rate
+            # strategy planned for
+            if o.op == trader.BUY_OP:
+                rate = rates[o.alt] + 0.00000001
+                affordable = rate <= o.rate * self.OUTBID_TOLERANCE
+            else:
+                rate = rates[o.alt] - 0.00000001
+                affordable = rate >= o.rate / self.OUTBID_TOLERANCE
+            if affordable:
+                self.report('overriding exchange rate to outbid others')
+            else:
+                self.report('we cannot afford ticker rate, use '
+                            'pre-calculated rate and hope for the best')
+                rate = o.rate
+            requests.append(exchange.OrderRequest(
+                o.op, gold, o.alt, rate, "%.8f" % o.alt_amount))
+
+        results = ex.place_orders(requests)
+        for o, request, res in zip(ops_, requests, results):
+            if res.error is not None:
+                self.report('Failed to create %(op)s order for '
+                            '%(alt_amount).4f %(alt)s: %(e)s' %
+                            {
+                                'op': o.op,
+                                'alt_amount': o.alt_amount,
+                                'alt': o.alt,
+                                'e': res.error,
+                            })
+                continue
+
+            o.scheduled = True
+            order = res.result
+            if tracker is not None:
+                tracker.add(
+                    order['orderNumber'], '%s_%s' % (gold, o.alt),
+                    request.amount)
+            self.report('Placed order %(order_number)d to '
+                        '%(op)s %(alt_amount).4f %(alt)s' %
+                        {
+                            'order_number': order['orderNumber'],
+                            'op': o.op,
+                            'alt_amount': o.alt_amount,
+                            'alt': o.alt,
+                        })
+
+    def report_event(self, event):
+        d = {'number': event.number, 'amount': event.amount}
+        if event.kind == orders.PARTIAL:
+            self.report('Order %(number)d partially filled, %(amount).4f' % d)
+        elif event.kind == orders.FILLED:
+            self.report('Order %(number)d filled' % d)
+        elif event.kind == orders.CANCELLED:
+            self.report('Order %(number)d cancelled' % d)
+
+    def execute_ops(self, ex, gold, ops):
+        sell_ops = [o for o in ops if o.op == trader.SELL_OP]
+        buy_ops = [o for o in ops if o.op == trader.BUY_OP]
+
+        tracker = orders.OrderTracker(ex, max_interval=self.POLL_INTERVAL)
+        # if orders don't execute for a while, respin trading
+        deadline = ex.clock.time() + self.ORDERS_TIMEOUT
+        while True:
+            # orders of each kind are placed concurrently, but sells go
+            # first since buys need funds they release; orders that failed,
+            # e.g. for lack of those funds yet, are retried on each event
+            if any([not o.scheduled for o in sell_ops]):
+                self.create_orders(ex, gold, sell_ops, tracker)
+            if any([not o.scheduled for o in buy_ops]):
+                self.create_orders(ex, gold, buy_ops, tracker)
+
+            if tracker.done and all([o.scheduled for o in ops]):
+                self.report('All orders executed!')
+                return True
+            if ex.clock.time() >= deadline:
+                return False
+
+            for event in tracker.wait(deadline):
+                self.report_event(event)
+
+    def run_cycle(self, ex, strategy, parsed_args):
+        gold = 'BTC'
+        for _ in range(self.CYCLE_ATTEMPTS):
             # cancel all orders before proceeding
-            orders = ex.get_orders()
-            for _, orders_ in orders.items():
-                for order in orders_:
-                    order_number = order['orderNumber']
-                    attempts = 0
-                    while True:
-                        if attempts == 3:
-                            # apparently the order is no longer
-                            break
-                        try:
-                            ex.cancel_order(order)
-                            break
-                        except plx_exc.PoloniexCommandException as e:
-                            print('Failed to cancel order #%(order_number)d: '
-                                  '%(e)s' %
-                                  {'order_number': order_number, 'e': e})
-                            attempts += 1
-                            continue
-                    print('Cancelled order %d' % order_number)
-
-            gold = 'BTC'
-
-            targets = parsed_args.targets
-            weights = parsed_args.weights
-            balances = exchange.get_global_balance(self.app.cfg)
-
-            now = time.time()
-            in_past = now - parsed_args.interval
-
-            old_rates = ex.get_opening_rates(
-                gold, list(set(balances.keys() + targets)),
-                parsed_args.interval,
-                in_past, now)
-            assert \
-                all([len(v) == 1 for v in old_rates.values()]), \
-                "too many rate results"
-
-            all_currencies = list(set(balances.keys() + targets))
-            new_rates = ex.get_closing_rates(
-                gold, all_currencies,
-                parsed_args.interval,
-                in_past, now)
-            assert \
-                all([len(v) == 1 for v in old_rates.values()]), \
-                "too many rate results"
-
-            rates = {}
-            for target in all_currencies:
-                rates[target] = old_rates[target] + new_rates[target]
-
-            strategy = trader.get_strategy(parsed_args.strategy)
-            ops, _ = strategy.trade(
-                targets, weights, gold, ex.get_fee(), balances, rates)
-
-            _, ops_ = ops[-1]  # we are interested in the last 'trade' only
-            if not parsed_args.force:
-                if ops_:
-                    print('The following trade orders are to be schedule:')
-                    for o in ops_:
-                        d = {'gold': gold,
-                             'op': o.op,
-                             'rate': o.rate,
-                             'gold_amount': o.gold_amount,
-                             'alt_amount': o.alt_amount,
-                             'alt': o.alt}
-                        if o.op == trader.SELL_OP:
-                            print(' * buy %(gold_amount).4f %(gold)s '
-                                  'with %(alt_amount).4f %(alt)s '
-                                  '(rate: %(rate)s)' % d)
-                        else:
-                            print(' * sell %(gold_amount).4f %(gold)s '
-                                  'for %(alt_amount).4f %(alt)s '
-                                  '(rate: %(rate)s)' % d)
-                    answer = raw_input("Would you like to proceed? ")
-                    if answer not in 'yY':
-                        return
-
-            sell_ops = [o for o in ops_ if o.op == trader.SELL_OP]
-            buy_ops = [o for o in ops_ if o.op == trader.BUY_OP]
-
-            def create_orders(ops):
-                for o in ops:
-                    if o.scheduled:
-                        continue
-                    # poloniex doesn't support BTC amounts less than 0.0001
-                    if o.alt_amount * o.rate < 0.0001:
-                        print(
-                            "Ignore request for %f %s due to negligible size" %
-                            (o.alt_amount, o.alt))
-                        o.scheduled = True
-                        continue
-                    alt_amount = "%.8f" % o.alt_amount
-
-                    # try to outbid others
-                    rate = (
-                        ex.get_rate(gold, o.alt) +
-                        (0.00000001 if o.op == trader.BUY_OP else -0.00000001)
-                    )
-                    if rate / o.rate <= 1.002:
-                        print('overriding exchange rate to outbid others')
-                        rate = o.rate
-                    else:
-                        print('we cannot afford ticker rate, use '
-                              'pre-calculated rate and hope for the best')
-
-                    method = ex.sell if o.op == trader.SELL_OP else ex.buy
-                    try:
-                        order = method(gold, o.alt, o.rate, alt_amount)
-                        o.scheduled = True
-                    except plx_exc.PoloniexCommandException as e:
-                        print('Failed to create %(op)s order for '
-                              '%(alt_amount).4f %(alt)s: %(e)s' %
-                              {
-                                  'op': o.op,
-                                  'alt_amount': o.alt_amount,
-                                  'alt': o.alt,
-                                  'e': e,
-                              })
-                        continue
-
-                    print('Placed order %(order_number)d to '
-                          '%(op)s %(alt_amount).4f %(alt)s' %
-                          {
-                              'order_number': order['orderNumber'],
-                              'op': o.op,
-                              'alt_amount': o.alt_amount,
-                              'alt': o.alt,
-                          })
-
-            now = time.time()
-            while True:
-                # if orders don't execute for a while, respin trading
-                if time.time() - now > 300:
-                    break
-
-                if any([not o.scheduled for o in sell_ops]):
-                    create_orders(sell_ops)
-                if any([not o.scheduled for o in buy_ops]):
-                    create_orders(buy_ops)
-
-                time.sleep(10)
-
-                orders = ex.get_orders()
-                if not orders and all([o.scheduled for o in ops_]):
-                    print('All orders executed!')
-                    exit = True
-                    break
-
-            if exit:
-                break
+            self.cancel_orders(ex)
+
+            ops = self.get_ops(ex, strategy, gold, parsed_args)
+            if not parsed_args.force and ops:
+                if not self.confirm_ops(gold, ops):
+                    return
+
+            if self.execute_ops(ex, gold, ops):
+                return
+
+        self.report("Couldn't complete trading cycle with "
+                    "all orders closed, bailing out")
+
+    def take_action(self, parsed_args):
+        ex = exchange.get_exchange_by_name(self.app.cfg, parsed_args.exchange)
+        strategy = trader.get_strategy(parsed_args.strategy)
+        self.run_cycle(ex, strategy, parsed_args)
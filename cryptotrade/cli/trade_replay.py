@@ -0,0 +1,178 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import collections
+import logging
+import time
+
+from cliff.lister import Lister
+import numpy as np
+
+from cryptotrade._exchanges import sim
+from cryptotrade.cli import trade_daemon
+from cryptotrade import backtest
+from cryptotrade import exchange
+from cryptotrade import trader
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TradeReplayCommand(Lister, trade_daemon.TradeDaemonCommand):
+    '''replay trade execution over past candles on simulated exchange'''
+
+    # don't start cycles that can't complete before the end of history
+    RESERVE = (
+        trade_daemon.TradeDaemonCommand.ORDERS_TIMEOUT *
+        trade_daemon.TradeDaemonCommand.CYCLE_ATTEMPTS)
+
+    def get_parser(self, prog_name):
+        parser = super(TradeReplayCommand, self).get_parser(prog_name)
+        parser.add_argument(
+            '-p',
+            dest='period',
+            metavar='DAYS',
+            required=True,
+            type=float,
+            help='past time period to replay')
+        parser.add_argument(
+            '--engine',
+            dest='engine',
+            default='loop',
+            choices=backtest.list_engine_names(),
+            help='backtest engine for idealized result (default: loop)')
+        return parser
+
+    def get_state_file(self, parsed_args):
+        # replay should not interfere with live trading
+        return None
+
+    def get_trade_balances(self, ex):
+        return ex.get_balances()
+
+    def report(self, message):
+        # chatter of execution loop is shown in verbose mode only
+        LOG.debug(message)
+
+    def execute_ops(self, ex, gold, ops):
+        res = super(TradeReplayCommand, self).execute_ops(ex, gold, ops)
+        if not res:
+            self.stats['respins'] += 1
+        return res
+
+    def run_cycle(self, ex, strategy, parsed_args):
+        respins = self.stats['respins']
+        super(TradeReplayCommand, self).run_cycle(ex, strategy, parsed_args)
+        self.stats['cycles'] += 1
+        if self.stats['respins'] - respins == self.CYCLE_ATTEMPTS:
+            self.stats['bailouts'] += 1
+
+    @staticmethod
+    def _get_rate(history, currency, gold, when):
+        # close of the last candle closed by the time
+        if currency == gold:
+            return 1.0
+        columns = history[currency]
+        period = sim.Simulator.CANDLESTICKS[0]
+        i = np.searchsorted(columns['date'], when - period, side='right')
+        return float(columns['close'][max(i - 1, 0)])
+
+    def _get_worth(self, history, balances, gold, when):
+        return sum(
+            amount * self._get_rate(history, currency, gold, when)
+            for currency, amount in balances.items())
+
+    def take_action(self, parsed_args):
+        # there is nobody to confirm orders
+        parsed_args.force = True
+        self.stats = collections.Counter()
+
+        real = exchange.get_exchange_by_name(
+            self.app.cfg, parsed_args.exchange)
+
+        gold = 'BTC'
+        interval = parsed_args.interval
+        balances = self.get_balances(parsed_args)
+        currencies = sorted(
+            (set(balances) | set(parsed_args.targets)) - set([gold]))
+
+        end = int(real.clock.time()) // interval * interval
+        start = end - int(parsed_args.period * 60 * 60 * 24) // interval * \
+            interval
+        period = min(sim.Simulator.CANDLESTICKS)
+        history = {
+            currency: real.get_columns(
+                ('date',) + sim.FIELDS, gold, currency, period, start, end)
+            for currency in currencies
+        }
+
+        options = dict(self.app.cfg.get('simulator') or {})
+        for key in ('market', 'speed', 'record', 'replay'):
+            options.pop(key, None)
+        options.update(start=start, balances=dict(balances))
+        ex = sim.Simulator(
+            {'simulator': options},
+            market=sim.HistoryMarket(period, gold, history))
+
+        started = time.time()
+        self.run_cycles(
+            ex, trader.get_strategy(parsed_args.strategy),
+            parsed_args, until=end - self.RESERVE)
+        # orders of the last cycle may be still open, holding funds
+        self.cancel_orders(ex)
+        elapsed = time.time() - started
+        finished = ex.clock.time()
+
+        # idealized result for closing rates at the same boundaries
+        boundaries = range(start + interval, end - self.RESERVE + 1, interval)
+        rates = {
+            currency: [
+                self._get_rate(history, currency, gold, boundary)
+                for boundary in boundaries
+            ]
+            for currency in currencies + [gold]
+        }
+        engine = backtest.get_engine(parsed_args.engine)
+        _, ideal_balances = engine.trade(
+            trader.get_strategy(parsed_args.strategy), parsed_args.targets,
+            parsed_args.weights, gold, ex.taker_fee, balances, rates)
+
+        old_worth = self._get_worth(
+            history, balances, gold, start + interval)
+        new_worth = self._get_worth(
+            history, ex.get_balances(), gold, finished)
+        ideal_worth = self._get_worth(
+            history, ideal_balances, gold, finished)
+        fees = sum(trade['total'] * trade['fee'] for trade in ex.trades)
+
+        return (
+            ('', 'Replayed', 'Ideal'),
+            (
+                ('Old BTC', old_worth, old_worth),
+                ('New BTC', new_worth, ideal_worth),
+                ('Cycles', self.stats['cycles'], len(boundaries)),
+                ('Respins', self.stats['respins'], ''),
+                ('Bail-outs', self.stats['bailouts'], ''),
+                ('Trades', len(ex.trades), ''),
+                ('Fees BTC', fees, ''),
+                ('Simulated days', (finished - start) / (60 * 60 * 24), ''),
+                ('Seconds taken', elapsed, ''),
+            ),
+        )
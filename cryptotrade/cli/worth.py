@@ -26,9 +26,20 @@ class WorthCommand(Lister):
     '''calculate total worth in BTC and USD'''
 
     def take_action(self, parsed_args):
+        currencies = ('BTC', 'USD')
+
+        def get_worth(ex):
+            balances = ex.get_balances()
+            # take USD rate from the same snapshot as others, so that each
+            # exchange is asked for rates only once
+            rates = ex.get_rates('BTC', sorted(set(balances) | set(['USD'])))
+            worth = ex.get_worth('BTC', balances=balances, rates=rates)
+            return [worth, worth / rates['USD']]
+
         exchanges = exchange.get_active_exchanges(self.app.cfg)
+        worth = exchange.map_exchanges(get_worth, exchanges)
         return (
             ('Currency', 'Worth'),
-            ((curr, sum([e.get_worth(curr) for e in exchanges]))
-             for curr in ('BTC', 'USD'))
+            ((curr, sum([w[i] for w in worth]))
+             for i, curr in enumerate(currencies))
         )
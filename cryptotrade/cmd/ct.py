@@ -31,6 +31,7 @@ from cliff.commandmanager import CommandManager
 
 from cryptotrade import config
 from cryptotrade import exchange
+from cryptotrade import scheduler
 from cryptotrade import version
 
 
@@ -42,12 +43,22 @@ CONFIG_FILE = '.cryptotrade.conf'
 CONFIG_PATH = os.path.join(os.path.expanduser('~'), CONFIG_FILE)
 
 
+def _get_command_manager():
+    command_manager = CommandManager('ct.cli')
+    # commands can be called by their entry point names too, like
+    # ct trade_execute
+    for name, _ in list(command_manager):
+        if ' ' in name:
+            command_manager.add_legacy_command(name.replace(' ', '_'), name)
+    return command_manager
+
+
 class CtApp(App):
     def __init__(self):
         super(CtApp, self).__init__(
             description=sys.modules[__name__].__doc__,
             version=version.get_version(),
-            command_manager=CommandManager('ct.cli'),
+            command_manager=_get_command_manager(),
             deferred_help=True,
             )
 
@@ -65,6 +76,10 @@ class CtApp(App):
         self.cfg = config.get_config(
             getattr(self.options, 'config_file', CONFIG_PATH))
 
+    def clean_up(self, cmd, result, err):
+        for name, scheduler_ in scheduler.get_schedulers().items():
+            LOG.debug('%s api requests: %s', name, scheduler_.stats())
+
 
 def main(argv=sys.argv[1:]):
     app = CtApp()
@@ -23,12 +23,12 @@ import yaml
 
 # todo: make it a tad smarter by loading the list of additional sections from
 # extension managers
-_SUPPORTED_SECTIONS = ('poloniex', 'coinbase')
+_SUPPORTED_SECTIONS = ('cache', 'poloniex', 'coinbase', 'simulator')
 
 
 def get_config(filename):
     with open(filename, 'r') as ymlfile:
-        cfg = yaml.load(ymlfile)
+        cfg = yaml.safe_load(ymlfile)
     # filter out unknown sections
     return {
         k: v for k, v in cfg.items()
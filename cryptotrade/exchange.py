@@ -22,16 +22,102 @@ import abc
 import collections
 import time
 
+from concurrent import futures
 import six
 from stevedore.enabled import EnabledExtensionManager
 
+from cryptotrade import cache
+from cryptotrade import clock
+from cryptotrade import rates
+from cryptotrade import recording
+from cryptotrade import scheduler
+
+
+# default time in seconds to wait for an exchange to respond
+DEFAULT_TIMEOUT = 60
+
+
+class CommandError(Exception):
+    # exchange agnostic error for failed api requests
+    pass
+
+
+class ExchangeTimeout(Exception):
+    message = 'Exchange %(name)s did not respond in %(timeout)s seconds.'
+
+    def __init__(self, name, timeout):
+        super(ExchangeTimeout, self).__init__(
+            self.message % {'name': name, 'timeout': timeout})
+
+
+# order to place with Exchange.place_orders; op is the name of exchange method
+# to place it with, trader.BUY_OP or trader.SELL_OP
+OrderRequest = collections.namedtuple(
+    'OrderRequest', ('op', 'from_', 'to_', 'rate', 'amount'))
+
+# outcome of a bulk order operation for a single order: exchange response,
+# or CommandError the request failed with
+OrderResult = collections.namedtuple('OrderResult', ('result', 'error'))
+
+
+def call_order(func, *args):
+    try:
+        return OrderResult(func(*args), None)
+    except CommandError as e:
+        return OrderResult(None, e)
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Exchange(object):
 
+    # number of currencies to fetch rates for in parallel
+    FETCH_WORKERS = 8
+    FETCH_ATTEMPTS = 6
+
+    # default number of order requests to send in parallel
+    ORDER_WORKERS = 4
+
+    # default number of api requests per second allowed by exchange
+    RATE_LIMIT = None
+
+    # candlestick periods supported by exchange
+    CANDLESTICKS = ()
+
     def __init__(self, conf):
         super(Exchange, self).__init__()
         self.conf = conf
+        self.candle_cache = cache.get_candle_cache(conf)
+        # time as seen by exchange, simulated exchanges run their own clocks
+        self.clock = clock.WallClock()
+        # api traffic is recorded, or replayed on its own clock
+        self.tape = recording.get_tape(
+            record=self.get_option('record'),
+            replay=self.get_option('replay'),
+            speed=self.get_option('replay_speed'))
+        if isinstance(self.tape, recording.Player):
+            self.clock = self.tape.clock
+        self.scheduler = scheduler.get_scheduler(
+            self.name, self.get_option('rate_limit', self.RATE_LIMIT))
+
+    @property
+    def name(self):
+        return self.__class__.__name__.lower()
+
+    def get_option(self, key, default=None):
+        try:
+            return self.conf[self.name].get(key, default)
+        except (KeyError, TypeError):
+            return default
+
+    @property
+    def timeout(self):
+        return self.get_option('timeout', DEFAULT_TIMEOUT)
+
+    def _call(self, lane, func, *args, **kwargs):
+        # all api calls should go through scheduler to respect rate limits
+        if self.tape is not None:
+            return self.tape.call(self, lane, func, *args, **kwargs)
+        return self.scheduler.call(lane, func, *args, **kwargs)
 
     @abc.abstractmethod
     def get_balances(self):
@@ -41,6 +127,11 @@ class Exchange(object):
     def get_rate(self):
         return NotImplemented
 
+    @abc.abstractmethod
+    def get_rates(self, gold, currencies):
+        # return rates for all currencies to gold using single snapshot
+        return NotImplemented
+
     @abc.abstractmethod
     def get_candlesticks(self, from_, to_, period, start, end):
         return NotImplemented
@@ -53,6 +144,40 @@ class Exchange(object):
     def cancel_order(self, order):
         return NotImplemented
 
+    @property
+    def order_workers(self):
+        return self.get_option('order_workers', self.ORDER_WORKERS)
+
+    def _map_orders(self, calls):
+        # send (func, args) requests in parallel, no more than order_workers
+        # at once; scheduler still keeps them within rate limits
+        if not calls:
+            return []
+        workers = min(self.order_workers, len(calls))
+        with futures.ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(
+                lambda call: call_order(call[0], *call[1]), calls))
+
+    def cancel_orders(self, orders):
+        # return OrderResult for each order, in the same order; failures of
+        # some orders don't affect others
+        return self._map_orders(
+            [(self.cancel_order, (order,)) for order in orders])
+
+    def place_orders(self, requests):
+        # return OrderResult with response of buy or sell for each
+        # OrderRequest, in the same order
+        return self._map_orders([
+            (getattr(self, request.op),
+             (request.from_, request.to_, request.rate, request.amount))
+            for request in requests
+        ])
+
+    def get_order_updates(self):
+        # exchanges pushing order updates return those received since the
+        # previous call, see orders.OrderTracker; others are polled
+        return None
+
     @abc.abstractmethod
     def get_fee(self):
         return NotImplemented
@@ -65,38 +190,66 @@ class Exchange(object):
     def sell(self, from_, to_, rate, amount):
         return NotImplemented
 
-    def get_worth(self, gold, balances=None):
+    def get_worth(self, gold, balances=None, rates=None):
         balances = balances or self.get_balances()
-
-        if gold == 'USD':
-            return (self.get_worth('BTC', balances=balances) *
-                    self.get_rate('USD', 'BTC'))
+        rates = rates or self.get_rates(gold, list(balances.keys()))
 
         worth = 0
         for currency, amount in balances.items():
-            if currency == gold:
-                worth += amount
-            else:
-                converted_amount = amount * self.get_rate(gold, currency)
-                worth += converted_amount
+            worth += amount * rates[currency]
         return worth
 
+    def get_columns(self, fields, from_, to_, period, start, end):
+        # return candlestick fields in columns, one per field
+        base = min(self.CANDLESTICKS) if self.CANDLESTICKS else period
+        if (self.candle_cache is not None and
+                period != base and period % base == 0):
+            # with cache, fetch the finest candles only once and aggregate
+            # them locally for all coarser periods; without it, they would
+            # be fetched again and again
+            first = start + (-start % period)
+            columns = self.get_columns(
+                ('date',) + tuple(f for f in fields if f != 'date'),
+                from_, to_, base, first, end + period - base)
+            dates, res = rates.resample(
+                columns.pop('date'), columns, period)
+            res['date'] = dates
+            return res
+
+        if self.candle_cache is None:
+            candles = self.get_candlesticks(from_, to_, period, start, end)
+            return {
+                field: [candle[field] for candle in candles]
+                for field in fields
+            }
+        return self.candle_cache.get_columns(
+            self.get_candlesticks, self.name, from_, to_, period, start, end,
+            fields)
+
     def _get_rates(self, type_, gold, other, period, start, end):
-        while True:
-            res = {
-                currency: [
-                    candle[type_]
-                    for candle in self.get_candlesticks(
-                        gold, currency, period, start, end)
+        def fetch(currency):
+            return self.get_columns(
+                (type_,), gold, currency, period, start, end)[type_]
+
+        res = {}
+        currencies = [currency for currency in other if currency != gold]
+        with futures.ThreadPoolExecutor(self.FETCH_WORKERS) as executor:
+            for attempt in range(self.FETCH_ATTEMPTS):
+                if attempt:
+                    time.sleep(min(2 ** attempt, 10))
+                res.update(zip(currencies, executor.map(fetch, currencies)))
+                # sometimes candlesticks get back with zero rates, repeat for
+                # those currencies until succeed
+                currencies = [
+                    currency for currency in currencies
+                    if 0.0 in res[currency]
                 ]
-                for currency in other
-                if currency != gold
-            }
-            # sometimes candlesticks get back with zero rates, repeat until
-            # succeed
-            if all([v != 0.0 for v in res.values()]):
-                break
-            time.sleep(10)
+                if not currencies:
+                    break
+            else:
+                raise RuntimeError(
+                    "error: couldn't fetch rates for %s" %
+                    ', '.join(currencies))
 
         for k, v in res.items():
             num_of_rates = len(v)
@@ -124,10 +277,7 @@ def _get_exchange_manager(conf):
 
 
 def get_active_exchange_names(conf):
-    mgr = EnabledExtensionManager(
-        'ct.exchanges',
-        lambda ext: ext.name in conf)
-    return [ext.name for ext in mgr.extensions]
+    return [ext.name for ext in _get_exchange_manager(conf).extensions]
 
 
 def get_active_exchanges(conf):
@@ -149,11 +299,30 @@ def get_exchange_by_name(conf, name):
             return ext.obj
 
 
+def map_exchanges(func, exchanges):
+    # call func for each exchange concurrently, waiting no longer than
+    # exchange timeout for each of them
+    executor = futures.ThreadPoolExecutor(max(len(exchanges), 1))
+    try:
+        start = time.time()
+        futures_ = [executor.submit(func, ex) for ex in exchanges]
+        res = []
+        for ex, future in zip(exchanges, futures_):
+            timeout = max(0, start + ex.timeout - time.time())
+            try:
+                res.append(future.result(timeout=timeout))
+            except futures.TimeoutError:
+                raise ExchangeTimeout(ex.name, ex.timeout)
+        return res
+    finally:
+        # don't block on hanging requests
+        executor.shutdown(wait=False)
+
+
 def get_global_balance(conf):
     exchanges = get_active_exchanges(conf)
     balance_total = collections.defaultdict(float)
-    for ex in exchanges:
-        balances = ex.get_balances()
+    for balances in map_exchanges(lambda ex: ex.get_balances(), exchanges):
         for currency, amount in balances.items():
             balance_total[currency] += amount
     return balance_total
@@ -0,0 +1,135 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# numpy implementations of online portfolio selection algorithms that follow
+# olpsR (https://github.com/booxter/olpsR) update rules; each function
+# receives current portfolio b and returns the next one
+
+import numpy as np
+
+
+def project_simplex(v):
+    # euclidean projection onto probability simplex in closed form, see
+    # Duchi et al. "Efficient Projections onto the l1-Ball for Learning in
+    # High Dimensions" (2008)
+    u = np.sort(v)[::-1]
+    css = np.cumsum(u) - 1.0
+    ind = np.arange(1, len(v) + 1)
+    rho = np.nonzero(u - css / ind > 0)[0][-1]
+    theta = css[rho] / (rho + 1.0)
+    return np.maximum(v - theta, 0.0)
+
+
+def pamr(b, x, eps=0.5, C=500, variant=0):
+    x_mean = np.mean(x)
+    loss = max(0.0, np.dot(b, x) - eps)
+    denom = np.sum((x - x_mean) ** 2)
+    if variant == 0:
+        tau = loss / denom if denom else 0.0
+    elif variant == 1:
+        tau = min(C, loss / denom) if denom else 0.0
+    else:
+        tau = loss / (denom + 0.5 / C)
+    return project_simplex(b - tau * (x - x_mean))
+
+
+def olmar(b, prices, eps=10):
+    # prices is a (window x currency) slice of price history, last row being
+    # current prices
+    x_pred = np.mean(prices, axis=0) / prices[-1]
+    x_mean = np.mean(x_pred)
+    denom = np.sum((x_pred - x_mean) ** 2)
+    lam = max(0.0, (eps - np.dot(b, x_pred)) / denom) if denom else 0.0
+    return project_simplex(b + lam * (x_pred - x_mean))
+
+
+def eg(b, x, eta=0.05):
+    b = b * np.exp(eta * x / np.dot(b, x))
+    return b / np.sum(b)
+
+
+class ONSState(object):
+
+    def __init__(self, n):
+        self.A = np.eye(n)
+        self.p = np.zeros(n)
+        self.b = np.full(n, 1.0 / n)
+
+    def to_dict(self):
+        return {'A': self.A.tolist(), 'p': self.p.tolist(),
+                'b': self.b.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        res = cls(len(data['b']))
+        res.A = np.array(data['A'])
+        res.p = np.array(data['p'])
+        res.b = np.array(data['b'])
+        return res
+
+
+def _project_simplex_norm(y, A, start):
+    # projection onto simplex in the norm induced by A, i.e. minimum of
+    # (b - y)' A (b - y) subject to sum(b) = 1 and b >= 0; there is no closed
+    # form, so solve the quadratic program with primal active set method
+    # warm started from a feasible portfolio
+    n = len(y)
+    c = np.dot(A, y)
+    b = start.copy()
+    free = b > 0
+    for _ in range(10 * n):
+        idx = np.nonzero(free)[0]
+        k = len(idx)
+        kkt = np.zeros((k + 1, k + 1))
+        kkt[:k, :k] = A[np.ix_(idx, idx)]
+        kkt[:k, k] = kkt[k, :k] = 1.0
+        sol = np.linalg.solve(kkt, np.append(c[idx], 1.0))
+        target = np.zeros(n)
+        target[idx] = sol[:k]
+
+        if (target[idx] >= 0).all():
+            b = target
+            # check lagrange multipliers of currencies fixed at zero
+            multipliers = np.dot(A, b) - c + sol[k]
+            multipliers[free] = 0.0
+            j = np.argmin(multipliers)
+            if multipliers[j] >= -1e-12:
+                break
+            free[j] = True
+        else:
+            # move towards the solution until first currency drops to zero
+            shrinking = free & (target < 0)
+            steps = b[shrinking] / (b[shrinking] - target[shrinking])
+            j = np.nonzero(shrinking)[0][np.argmin(steps)]
+            b = b + np.min(steps) * (target - b)
+            b[j] = 0.0
+            free[j] = False
+    return np.maximum(b, 0.0)
+
+
+def ons(b, x, state, eta=0.0, beta=1.0, delta=0.125):
+    n = len(b)
+    grad = x / np.dot(b, x)
+    state.A += np.outer(grad, grad)
+    state.p += (1 + 1.0 / beta) * grad
+    b = _project_simplex_norm(
+        delta * np.linalg.solve(state.A, state.p), state.A, state.b)
+    state.b = b
+    return (1 - eta) * b + eta / n
@@ -0,0 +1,139 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import collections
+
+
+PARTIAL = 'partial'
+FILLED = 'filled'
+CANCELLED = 'cancelled'
+
+# amount is filled amount for fills, remaining amount for cancellations
+OrderEvent = collections.namedtuple(
+    'OrderEvent', ('kind', 'number', 'pair', 'amount'))
+
+# remaining amounts below that are considered filled
+EPSILON = 1e-12
+
+
+class OrderTracker(object):
+    '''Local state of open orders, updated from exchange.
+
+    Only orders added to the tracker are followed. Exchanges pushing
+    order updates are drained for them, others are polled for open orders,
+    and snapshots are compared with known state. In the latter case,
+    orders that disappear are considered filled, since snapshots don't
+    tell cancelled ones apart.
+
+    Polling interval starts at MIN_INTERVAL and grows up to max_interval
+    while nothing happens; any event brings it back.
+    '''
+
+    MIN_INTERVAL = 1.0
+    BACKOFF = 2.0
+
+    def __init__(self, ex, max_interval=10.0):
+        self.ex = ex
+        self.max_interval = max_interval
+        self.interval = self.MIN_INTERVAL
+        self.orders = {}
+
+    @property
+    def done(self):
+        return not self.orders
+
+    def add(self, number, pair, amount):
+        self.orders[number] = {'pair': pair, 'amount': float(amount)}
+        self.interval = self.MIN_INTERVAL
+
+    def _remove(self, number, kind=FILLED):
+        order = self.orders.pop(number)
+        return OrderEvent(kind, number, order['pair'], order['amount'])
+
+    def update(self, snapshot):
+        '''Compare snapshot of open orders with known state.'''
+        events = []
+        seen = set()
+        for pair, orders in sorted(snapshot.items()):
+            for order in orders:
+                number = order['orderNumber']
+                known = self.orders.get(number)
+                if known is None:
+                    # the order is not ours
+                    continue
+                seen.add(number)
+                amount = float(order['amount'])
+                if amount < known['amount'] - EPSILON:
+                    events.append(OrderEvent(
+                        PARTIAL, number, pair, known['amount'] - amount))
+                    known['amount'] = amount
+        for number in sorted(set(self.orders) - seen):
+            events.append(self._remove(number))
+        return events
+
+    def consume(self, updates):
+        '''Apply order updates pushed by exchange.'''
+        events = []
+        for update in updates:
+            number = update['orderNumber']
+            if number not in self.orders:
+                # the order is not ours, or was done with already
+                continue
+            order = self.orders[number]
+            if update['kind'] == CANCELLED:
+                events.append(self._remove(number, CANCELLED))
+            elif update['remaining'] > EPSILON:
+                order['amount'] = update['remaining']
+                events.append(OrderEvent(
+                    PARTIAL, number, order['pair'], update['amount']))
+            else:
+                events.append(self._remove(number))
+        return events
+
+    def poll(self):
+        updates = self.ex.get_order_updates()
+        if updates is None:
+            events = self.update(self.ex.get_orders())
+        else:
+            events = self.consume(updates)
+        if events:
+            self.interval = self.MIN_INTERVAL
+        else:
+            self.interval = min(
+                self.interval * self.BACKOFF, self.max_interval)
+        return events
+
+    def wait(self, until):
+        '''Poll until something happens or time is out.
+
+        With no orders to track, just wait for one interval.
+        '''
+        while True:
+            delay = min(self.interval, until - self.ex.clock.time())
+            if delay <= 0:
+                return []
+            self.ex.clock.sleep(delay)
+            if self.done:
+                self.interval = min(
+                    self.interval * self.BACKOFF, self.max_interval)
+                return []
+            events = self.poll()
+            if events:
+                return events
@@ -0,0 +1,127 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import numpy as np
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # python 2
+    from collections import Mapping
+
+
+class Portfolio(Mapping):
+    '''Currency balances kept in slots of a single contiguous float array.
+
+    Currencies are mapped to slots once; balances of unknown currencies
+    read as zero, like with defaultdict(float) used elsewhere, but without
+    inserting them.
+    '''
+
+    def __init__(self, currencies, amounts=None):
+        self.currencies = list(currencies)
+        self.index = {
+            currency: j for j, currency in enumerate(self.currencies)}
+        self.amounts = (
+            np.zeros(len(self.currencies)) if amounts is None
+            else np.array(amounts, dtype=np.float64))
+        # rates aligned to slots, see worth()
+        self._rates = None
+        self._matrix = None
+
+    @classmethod
+    def from_balances(cls, balances, currencies=()):
+        res = cls(sorted(set(balances) | set(currencies)))
+        for currency, amount in balances.items():
+            res.amounts[res.index[currency]] = amount
+        return res
+
+    def __getitem__(self, currency):
+        j = self.index.get(currency)
+        return 0.0 if j is None else self.amounts.item(j)
+
+    def __contains__(self, currency):
+        return currency in self.index
+
+    def get(self, currency, default=None):
+        j = self.index.get(currency)
+        return default if j is None else self.amounts.item(j)
+
+    def __setitem__(self, currency, amount):
+        j = self.slot(currency)
+        self.amounts[j] = amount
+
+    def __iter__(self):
+        return iter(self.currencies)
+
+    def __len__(self):
+        return len(self.currencies)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self.items()))
+
+    def slot(self, currency):
+        j = self.index.get(currency)
+        if j is None:
+            j = len(self.currencies)
+            self.currencies.append(currency)
+            self.index = dict(self.index)
+            self.index[currency] = j
+            self.amounts = np.append(self.amounts, 0.0)
+            self._rates = self._matrix = None
+        return j
+
+    def slots(self, currencies):
+        index = self.index
+        return [
+            index[currency] if currency in index else self.slot(currency)
+            for currency in currencies
+        ]
+
+    def copy(self):
+        res = self.__class__.__new__(self.__class__)
+        # slots of existing currencies never change, so share them
+        res.currencies = list(self.currencies)
+        res.index = self.index
+        res.amounts = self.amounts.copy()
+        res._rates = self._rates
+        res._matrix = self._matrix
+        return res
+
+    def apply_op(self, gold, alt, alt_amount, gold_amount):
+        # get alt_amount of alt for gold_amount of gold; negative amounts
+        # stand for selling alt
+        self.apply_ops(gold, [alt], [alt_amount], [gold_amount])
+
+    def apply_ops(self, gold, alts, alt_amounts, gold_amounts):
+        # batch version of apply_op(), updates all slots at once
+        slots = self.slots(alts)
+        gold_j = self.slot(gold)
+        np.add.at(self.amounts, slots, alt_amounts)
+        self.amounts[gold_j] -= np.sum(gold_amounts)
+
+    def worth(self, rates, i):
+        # total worth in gold under rates at index i; rates are aligned to
+        # slots once and reused while the same rates object is passed
+        if rates is not self._rates:
+            self._matrix = np.array(
+                [rates[currency] for currency in self.currencies],
+                dtype=np.float64).reshape(len(self.currencies), -1).T.copy()
+            self._rates = rates
+        return float(self.amounts.dot(self._matrix[i]))
@@ -0,0 +1,126 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import collections
+import os
+import tempfile
+
+import numpy as np
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # python 2
+    from collections import Mapping
+
+
+# handle to a published rates matrix, cheap to pass to other processes
+SharedRates = collections.namedtuple(
+    'SharedRates', ('filename', 'currencies', 'length'))
+
+
+# how to aggregate candle fields: each gets values, indices of first and
+# indices of last candles of each group
+_AGGREGATES = {
+    'open': lambda values, first, last: values[first],
+    'close': lambda values, first, last: values[last],
+    'high': lambda values, first, last: np.maximum.reduceat(values, first),
+    'low': lambda values, first, last: np.minimum.reduceat(values, first),
+    'volume': lambda values, first, last: np.add.reduceat(values, first),
+}
+
+
+def resample(dates, columns, period):
+    '''Aggregate candle columns sorted by date into candles of period.
+
+    Returns dates of new candles and dict of aggregated columns.
+    '''
+    dates = np.asarray(dates, dtype=np.int64)
+    keys = dates - dates % period
+    first = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    last = np.append(first[1:], len(keys)) - 1
+    res = {}
+    for field, values in columns.items():
+        try:
+            aggregate = _AGGREGATES[field]
+        except KeyError:
+            raise ValueError("error: can't resample %s" % field)
+        values = np.asarray(values, dtype=np.float64)
+        res[field] = aggregate(values, first, last) if len(keys) else values
+    return keys[first] if len(keys) else keys, res
+
+
+class RatesMatrix(Mapping):
+    '''Rates of currencies stored as rows of a single 2-D array.
+
+    Behaves like the dict of rate lists returned by Exchange.get_*_rates,
+    so it can be passed to strategies and backtest engines as is.
+    '''
+
+    def __init__(self, currencies, matrix):
+        self.currencies = list(currencies)
+        self.matrix = matrix
+        self._index = {
+            currency: i for i, currency in enumerate(self.currencies)}
+
+    @classmethod
+    def from_rates(cls, rates):
+        currencies = sorted(rates)
+        return cls(
+            currencies,
+            np.array([rates[currency] for currency in currencies],
+                     dtype=np.float64).reshape(len(currencies), -1))
+
+    def __getitem__(self, currency):
+        return self.matrix[self._index[currency]]
+
+    def __iter__(self):
+        return iter(self.currencies)
+
+    def __len__(self):
+        return len(self.currencies)
+
+    def publish(self, path=None):
+        # dump the matrix into a file that other processes can map into
+        # their memory without copying; the caller should unpublish it
+        fd, filename = tempfile.mkstemp(
+            prefix='ct-rates-', suffix='.bin', dir=path)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(np.ascontiguousarray(
+                self.matrix, dtype=np.float64).tobytes())
+        return SharedRates(filename, self.currencies, self.matrix.shape[1])
+
+    @classmethod
+    def attach(cls, shared):
+        # all rows are read-only views into the same mapped file
+        if not shared.currencies or not shared.length:
+            matrix = np.zeros((len(shared.currencies), shared.length))
+            matrix.flags.writeable = False
+        else:
+            matrix = np.memmap(
+                shared.filename, dtype=np.float64, mode='r',
+                shape=(len(shared.currencies), shared.length))
+        return cls(shared.currencies, matrix)
+
+
+def unpublish(shared):
+    try:
+        os.unlink(shared.filename)
+    except OSError:
+        pass
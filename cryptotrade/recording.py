@@ -0,0 +1,176 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Recording of exchange api traffic, and its replay without network.
+#
+# Each api request that goes through Exchange._call is appended to a file
+# as a single line of compact JSON: start time, duration, lane, method,
+# arguments, and either response or error message.
+
+import collections
+import json
+import os
+import threading
+import time
+
+from cryptotrade import clock
+
+
+class MissingRecord(Exception):
+    message = 'No recorded response for %(method)s%(args)s.'
+
+    def __init__(self, method, args, kwargs):
+        super(MissingRecord, self).__init__(
+            self.message % {'method': method, 'args': (args, kwargs)})
+
+
+def _encode(value):
+    # client libraries may return values JSON doesn't know, like decimals
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _normalize(value):
+    # the same form as after reading back from file
+    return json.loads(json.dumps(value, default=_encode))
+
+
+def _fuzzy(value):
+    # ignore numbers, since request times and amounts are rarely the same
+    # in different sessions, and order of lists, that are often built from
+    # sets
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return None
+    if isinstance(value, list):
+        return sorted((_fuzzy(v) for v in value), key=json.dumps)
+    if isinstance(value, dict):
+        return {k: _fuzzy(v) for k, v in value.items()}
+    return value
+
+
+def _key(method, args, kwargs):
+    return json.dumps([method, args, kwargs], sort_keys=True)
+
+
+class Recorder(object):
+    '''Calls exchange api and appends requests and responses to file.'''
+
+    def __init__(self, filename):
+        self.filename = os.path.expanduser(filename)
+        self._lock = threading.Lock()
+
+    def _write(self, entry):
+        line = json.dumps(entry, separators=(',', ':'), default=_encode)
+        with self._lock:
+            with open(self.filename, 'a') as f:
+                f.write(line + '\n')
+
+    def call(self, ex, lane, func, *args, **kwargs):
+        start = ex.clock.time()
+        entry = {
+            't': start, 'l': lane, 'm': func.__name__,
+            'a': args, 'k': kwargs,
+        }
+        try:
+            res = ex.scheduler.call(lane, func, *args, **kwargs)
+        except Exception as e:
+            entry['d'] = ex.clock.time() - start
+            entry['e'] = str(e)
+            entry['x'] = 'io' if isinstance(e, EnvironmentError) else 'api'
+            self._write(entry)
+            raise
+        entry['d'] = ex.clock.time() - start
+        entry['r'] = res
+        self._write(entry)
+        return res
+
+
+class Player(object):
+    '''Serves api responses recorded by Recorder instead of exchange.
+
+    Requests are matched to recorded ones with the same method and
+    arguments; failing that, to the oldest unserved one that differs in
+    numbers and order of lists only. Responses arrive on clock at times
+    they were recorded at: clock starts with the first recorded request and
+    runs speed times faster than wall clock, or doesn't wait at all if speed
+    is not set.
+    '''
+
+    def __init__(self, filename, speed=None):
+        self.filename = os.path.expanduser(filename)
+        with open(self.filename, 'r') as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        self.clock = clock.VirtualClock(
+            self.entries[0]['t'] if self.entries else time.time(), speed)
+        self._exact = collections.defaultdict(collections.deque)
+        self._fuzzy = collections.defaultdict(collections.deque)
+        for i, entry in enumerate(self.entries):
+            method, args, kwargs = entry['m'], entry['a'], entry['k']
+            self._exact[_key(method, args, kwargs)].append(i)
+            self._fuzzy[
+                _key(method, _fuzzy(args), _fuzzy(kwargs))].append(i)
+        self._served = set()
+        self._lock = threading.Lock()
+
+    @property
+    def unserved(self):
+        return len(self.entries) - len(self._served)
+
+    def _pop(self, queues, key):
+        queue = queues.get(key)
+        while queue:
+            i = queue.popleft()
+            if i not in self._served:
+                self._served.add(i)
+                return self.entries[i]
+
+    def _find(self, method, args, kwargs):
+        with self._lock:
+            return (
+                self._pop(self._exact, _key(method, args, kwargs)) or
+                self._pop(self._fuzzy,
+                          _key(method, _fuzzy(args), _fuzzy(kwargs))))
+
+    def call(self, ex, lane, func, *args, **kwargs):
+        # there is no exchange to respect rate limits of
+        method = func.__name__
+        args, kwargs = _normalize(args), _normalize(kwargs)
+        entry = self._find(method, args, kwargs)
+        if entry is None:
+            raise MissingRecord(method, args, kwargs)
+        self.clock.advance_to(entry['t'] + entry['d'])
+        if 'e' in entry:
+            if entry['x'] == 'io':
+                raise IOError(entry['e'])
+            # imported here since exchange module itself uses this one
+            from cryptotrade import exchange
+            raise exchange.CommandError(entry['e'])
+        return entry['r']
+
+
+def get_tape(record=None, replay=None, speed=None):
+    if replay:
+        return Player(replay, speed)
+    if record:
+        return Recorder(record)
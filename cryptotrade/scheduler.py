@@ -0,0 +1,143 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import heapq
+import itertools
+import threading
+import time
+
+
+# lanes in order of priority
+ORDER = 0  # order placement and cancellation
+ACCOUNT = 1  # balances, open orders, fees
+MARKET = 2  # tickers and candlesticks
+
+LANES = {ORDER: 'order', ACCOUNT: 'account', MARKET: 'market'}
+
+
+class TokenBucket(object):
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.time()
+
+    def consume(self):
+        # take a token if available, otherwise return time to wait for it
+        now = time.time()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class LaneStats(object):
+
+    def __init__(self):
+        self.requests = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def add(self, wait):
+        self.requests += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'wait_avg': (
+                self.wait_total / self.requests if self.requests else 0.0),
+            'wait_max': self.wait_max,
+        }
+
+
+class RequestScheduler(object):
+
+    # throttles requests to an exchange with token bucket; requests waiting
+    # for a token are served in order of their lanes, and FIFO in a lane
+
+    def __init__(self, rate, capacity=None):
+        self.bucket = TokenBucket(rate, capacity) if rate else None
+        self.max_queue_depth = 0
+        self._lanes = {lane: LaneStats() for lane in LANES}
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def stats(self):
+        res = {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+        }
+        for lane, name in LANES.items():
+            res[name] = self._lanes[lane].as_dict()
+        return res
+
+    def _acquire(self, lane):
+        start = time.time()
+        ticket = (lane, next(self._counter))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            while True:
+                if self._queue[0] == ticket:
+                    wait = self.bucket.consume()
+                    if not wait:
+                        heapq.heappop(self._queue)
+                        # let the next request in line to check for token
+                        self._cond.notify_all()
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            self._lanes[lane].add(time.time() - start)
+
+    def call(self, lane, func, *args, **kwargs):
+        if self.bucket is not None:
+            self._acquire(lane)
+        else:
+            with self._cond:
+                self._lanes[lane].add(0.0)
+        return func(*args, **kwargs)
+
+
+_SCHEDULERS = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+
+def get_scheduler(name, rate):
+    # all objects for the same exchange share rate limits
+    with _SCHEDULERS_LOCK:
+        if name not in _SCHEDULERS:
+            _SCHEDULERS[name] = RequestScheduler(rate)
+        return _SCHEDULERS[name]
+
+
+def get_schedulers():
+    return dict(_SCHEDULERS)
@@ -0,0 +1,84 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import collections
+import itertools
+import multiprocessing
+
+from cryptotrade import backtest
+from cryptotrade import rates
+from cryptotrade import trader
+
+
+Job = collections.namedtuple(
+    'Job', ('strategy', 'weights', 'interval', 'adjust_gold'))
+
+# data shared by all jobs of a sweep: rates are published rates matrices
+# (see rates.RatesMatrix.publish) keyed by interval
+Context = collections.namedtuple(
+    'Context', ('engine', 'targets', 'gold', 'fee', 'balances', 'rates'))
+
+
+def get_jobs(strategies, weights, intervals, adjust_golds):
+    return [
+        Job(*args)
+        for args in itertools.product(
+            strategies, weights, intervals, adjust_golds)
+    ]
+
+
+# context is passed to each worker process once, not with every job
+_CONTEXT = None
+
+
+def _init_worker(context):
+    global _CONTEXT
+    _CONTEXT = context._replace(rates={
+        interval: rates.RatesMatrix.attach(shared)
+        for interval, shared in context.rates.items()
+    })
+
+
+def _run_job(job):
+    context = _CONTEXT
+    strategy = trader.get_strategy(job.strategy)
+    if job.adjust_gold is not None:
+        strategy.adjust_gold = job.adjust_gold
+    engine = backtest.get_engine(context.engine)
+    try:
+        _, balances = engine.trade(
+            strategy, context.targets, job.weights, context.gold,
+            context.fee, context.balances, context.rates[job.interval])
+    except Exception as e:
+        # don't let a single bad combination to break the whole sweep
+        return job, None, '%s: %s' % (e.__class__.__name__, e)
+    return job, dict(balances), None
+
+
+def run(jobs, context, processes=None):
+    # yields (job, balances, error) tuples in order of completion
+    pool = multiprocessing.Pool(
+        processes, initializer=_init_worker, initargs=(context,))
+    try:
+        for res in pool.imap_unordered(_run_job, jobs):
+            yield res
+    finally:
+        pool.terminate()
+        pool.join()
@@ -60,6 +60,61 @@ class TestPoloniex(unittest.TestCase):
         m.assert_called_once_with('BTC_XMR', 300, start=0, end=1000)
         self.assertEqual(m.return_value, res)
 
+    def _get_chart_data(self, pair, period, start, end):
+        first = start + (-start % period)
+        return [
+            {'date': date, 'close': 1.0}
+            # chunks may overlap on their boundaries
+            for date in range(first, end + period, period)
+        ]
+
+    def test_get_candlesticks_chunked(self):
+        self.plx.CHART_CHUNK = 10
+        with mock.patch.object(self.plx.private, 'returnChartData',
+                               side_effect=self._get_chart_data) as m:
+            res = self.plx.get_candlesticks(
+                'BTC', 'XMR', period=300, start=0, end=9000)
+        self.assertEqual(4, m.call_count)
+        m.assert_any_call('BTC_XMR', 300, start=0, end=2999)
+        m.assert_any_call('BTC_XMR', 300, start=9000, end=9000)
+        self.assertEqual(
+            list(range(0, 9001, 300)), [c['date'] for c in res])
+
+    def test_get_candlesticks_chunked_float_bounds(self):
+        # callers pass bounds derived from time.time()
+        self.plx.CHART_CHUNK = 10
+        with mock.patch.object(self.plx.private, 'returnChartData',
+                               side_effect=self._get_chart_data) as m:
+            res = self.plx.get_candlesticks(
+                'BTC', 'XMR', period=300, start=0.5, end=8999.5)
+        self.assertEqual(4, m.call_count)
+        m.assert_any_call('BTC_XMR', 300, start=0, end=2999)
+        m.assert_any_call('BTC_XMR', 300, start=9000, end=9000)
+        self.assertEqual(
+            list(range(300, 9000, 300)), [c['date'] for c in res])
+
+    @mock.patch('time.sleep')
+    def test_get_candlesticks_retries_failed_chunk(self, sleep_mock):
+        from poloniex import exceptions as plx_exc
+
+        self.plx.CHART_CHUNK = 10
+        failures = [True]
+
+        def get_chart_data(pair, period, start, end):
+            if start == 3000 and failures:
+                failures.pop()
+                raise plx_exc.PoloniexCommandException('bad chunk')
+            return self._get_chart_data(pair, period, start, end)
+
+        with mock.patch.object(self.plx.private, 'returnChartData',
+                               side_effect=get_chart_data) as m:
+            res = self.plx.get_candlesticks(
+                'BTC', 'XMR', period=300, start=0, end=5999)
+        self.assertEqual(3, m.call_count)
+        self.assertEqual(1, sleep_mock.call_count)
+        self.assertEqual(
+            list(range(0, 5999, 300)), [c['date'] for c in res])
+
     def test_get_balances(self):
         balances = {'BTC': 1.0, 'XMR': 2.5, 'ETH': 0.0}
         with mock.patch.object(self.plx.private, 'returnBalances',
@@ -78,6 +133,21 @@ class TestPoloniex(unittest.TestCase):
             res = self.plx.get_rate('BTC', 'LTC')
         self.assertEqual(0.0251, res)
 
+    def test_get_rates(self):
+        ticker = {
+            'BTC_LTC': {'lowestAsk': 0.0251, 'highestBid': 0.0251},
+            'BTC_NXT': {'lowestAsk': 0.1234, 'highestBid': 0.1234},
+            'USDT_BTC': {'lowestAsk': 2500.0, 'highestBid': 2500.0},
+        }
+        with mock.patch.object(self.plx.private, 'returnTicker',
+                               return_value=ticker) as m:
+            res = self.plx.get_rates('BTC', ['BTC', 'LTC', 'NXT', 'USD'])
+            usd_res = self.plx.get_rates('USD', ['BTC', 'LTC'])
+        self.assertEqual(
+            {'BTC': 1, 'LTC': 0.0251, 'NXT': 0.1234, 'USD': 1 / 2500.0}, res)
+        self.assertEqual({'BTC': 2500.0, 'LTC': 0.0251 * 2500.0}, usd_res)
+        m.assert_called_once()
+
     def test_ticker_cache(self):
         with mock.patch.object(self.plx.private, 'returnTicker') as m:
             self.plx._ticker()
@@ -0,0 +1,271 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from cryptotrade._exchanges import sim
+from cryptotrade import cache
+from cryptotrade import exchange
+
+
+START = 1500000100
+
+
+class TestSyntheticMarket(unittest.TestCase):
+
+    def test_consistent(self):
+        market = sim.SyntheticMarket(300, START, seed=1)
+        part = market.get_columns('ETH', START - 3000, START + 3000)
+        whole = sim.SyntheticMarket(300, START, seed=1).get_columns(
+            'ETH', START - 300 * 5000, START + 300 * 3000)
+        i = np.searchsorted(whole['date'], part['date'][0])
+        for field, values in part.items():
+            np.testing.assert_allclose(values, whole[field][i:i + 20])
+
+    def test_candles(self):
+        columns = sim.SyntheticMarket(300, START).get_columns(
+            'ETH', START - 300 * 2000, START + 300 * 2000)
+        self.assertEqual(4000, len(columns['date']))
+        self.assertTrue(np.all(np.diff(columns['date']) == 300))
+        np.testing.assert_allclose(columns['open'][1:], columns['close'][:-1])
+        for field in ('open', 'close'):
+            self.assertTrue(np.all(columns['high'] >= columns[field]))
+            self.assertTrue(np.all(columns['low'] <= columns[field]))
+
+    def test_seed(self):
+        columns1 = sim.SyntheticMarket(300, START, seed=1).get_columns(
+            'ETH', START, START + 3000)
+        columns2 = sim.SyntheticMarket(300, START, seed=2).get_columns(
+            'ETH', START, START + 3000)
+        self.assertFalse(np.allclose(columns1['close'], columns2['close']))
+
+
+class TestHistoryMarket(unittest.TestCase):
+
+    def setUp(self):
+        super(TestHistoryMarket, self).setUp()
+        columns = {'date': [0, 300, 900], 'close': [1.0, 2.0, 3.0]}
+        self.market = sim.HistoryMarket(300, 'BTC', {'ETH': columns})
+
+    def test_get_columns(self):
+        columns = self.market.get_columns('ETH', 300, 900)
+        self.assertEqual([300, 900], columns['date'].tolist())
+        self.assertEqual([2.0, 3.0], columns['close'].tolist())
+        self.assertEqual(
+            [], self.market.get_columns('ETH', 1000, 2000)['date'].tolist())
+
+    def test_unknown_currency(self):
+        self.assertRaises(
+            exchange.CommandError, self.market.get_columns, 'XMR', 0, 300)
+
+    def test_simulator(self):
+        sim_ = sim.Simulator(
+            {'simulator': {'start': 1150, 'latency': 0}}, market=self.market)
+        # there were no trades in the last candle
+        self.assertAlmostEqual(
+            2.0 * (1 - sim_.spread / 2), sim_.get_rate('BTC', 'ETH'))
+
+
+class TestOrderBook(unittest.TestCase):
+
+    def setUp(self):
+        super(TestOrderBook, self).setUp()
+        self.book = sim.OrderBook()
+
+    def _add(self, type_, rate, amount, date=0):
+        return self.book.add(
+            self.book.next_number(), 'BTC_ETH', type_, rate, amount, date)
+
+    def test_price_time_priority(self):
+        late = self._add(sim.BUY, 1.0, 1.0)
+        low = self._add(sim.BUY, 0.5, 1.0)
+        best = self._add(sim.BUY, 2.0, 1.0)
+        early = self._add(sim.BUY, 1.0, 1.0)
+        self.book.remove(early.number)
+        early = self._add(sim.BUY, 1.0, 1.0)
+        fills = self.book.match('BTC_ETH', sim.BUY, 0.8, 100.0, 0, 300)
+        self.assertEqual(
+            [(best, 1.0), (late, 1.0), (early, 1.0)], fills)
+        self.assertEqual([low.number], list(self.book.orders))
+
+    def test_budget(self):
+        first = self._add(sim.SELL, 2.0, 1.0)
+        second = self._add(sim.SELL, 2.0, 1.0)
+        fills = self.book.match('BTC_ETH', sim.SELL, 3.0, 3.0, 0, 300)
+        self.assertEqual([(first, 1.0), (second, 0.5)], fills)
+        self.assertEqual(0.5, second.amount)
+        # partially filled order keeps its priority
+        third = self._add(sim.SELL, 2.0, 1.0)
+        fills = self.book.match('BTC_ETH', sim.SELL, 3.0, 2.0, 0, 300)
+        self.assertEqual([(second, 0.5), (third, 0.5)], fills)
+
+    def test_not_crossed(self):
+        self._add(sim.SELL, 2.0, 1.0)
+        self.assertEqual(
+            [], self.book.match('BTC_ETH', sim.SELL, 1.9, 10.0, 0, 300))
+        self.assertEqual(
+            [], self.book.match('BTC_ETH', sim.BUY, 1.0, 10.0, 0, 300))
+
+    def test_placed_during_trades(self):
+        order = self._add(sim.BUY, 1.0, 10.0, date=200)
+        fills = self.book.match('BTC_ETH', sim.BUY, 1.0, 3.0, 0, 300)
+        self.assertEqual([(order, 1.0)], fills)
+        self.assertEqual(
+            [], self.book.match('BTC_ETH', sim.BUY, 1.0, 3.0, -300, 0))
+
+
+class TestSimulator(unittest.TestCase):
+
+    def _get_simulator(self, **options):
+        conf = {'start': START, 'balances': {'BTC': 1.0}, 'latency': 0}
+        conf.update(options)
+        return sim.Simulator({'simulator': conf})
+
+    def setUp(self):
+        super(TestSimulator, self).setUp()
+        self.sim = self._get_simulator()
+
+    def test_get_balances(self):
+        self.assertEqual({'BTC': 1.0}, self.sim.get_balances())
+
+    def test_get_rates(self):
+        rates = self.sim.get_rates('BTC', ['BTC', 'ETH'])
+        self.assertEqual(1.0, rates['BTC'])
+        self.assertEqual(rates['ETH'], self.sim.get_rate('BTC', 'ETH'))
+        self.assertLess(rates['ETH'], self.sim._get_ask('ETH'))
+
+    def test_no_future_candles(self):
+        candles = self.sim.get_candlesticks(
+            'BTC', 'ETH', 300, START - 3000, START + 3000)
+        dates = [candle['date'] for candle in candles]
+        current = START // 300 * 300
+        self.assertEqual(list(range(current - 3000 + 300, current + 1, 300)),
+                         dates)
+        # the current candle didn't trade yet
+        self.assertEqual(0.0, candles[-1]['volume'])
+        self.assertEqual(candles[-2]['close'], candles[-1]['close'])
+
+    def test_get_closing_rates(self):
+        rates = self.sim.get_closing_rates(
+            'BTC', ['ETH'], 1800, START - 18000, START)
+        self.assertEqual(10, len(rates['ETH']))
+        self.assertEqual(self.sim._price('ETH'), rates['ETH'][-1])
+
+    def test_taker_order(self):
+        rate = self.sim._get_ask('ETH')
+        res = self.sim.buy('BTC', 'ETH', rate * 1.01, '1.0')
+        self.assertEqual(rate, res['resultingTrades'][0]['rate'])
+        self.assertEqual({}, self.sim.get_orders())
+        balances = self.sim.get_balances()
+        self.assertAlmostEqual(1.0 - rate, balances['BTC'])
+        self.assertAlmostEqual(1.0 - self.sim.taker_fee, balances['ETH'])
+
+    def test_maker_order(self):
+        rate = self.sim.get_rate('BTC', 'ETH') * 0.99
+        res = self.sim.buy('BTC', 'ETH', rate, '1.0')
+        self.assertEqual([], res['resultingTrades'])
+        orders = self.sim.get_orders()['BTC_ETH']
+        self.assertEqual(res['orderNumber'], orders[0]['orderNumber'])
+        self.assertAlmostEqual(1.0 - rate, self.sim.get_balances()['BTC'])
+
+        while self.sim.get_orders():
+            self.sim.clock.sleep(300)
+        balances = self.sim.get_balances()
+        self.assertAlmostEqual(1.0 - rate, balances['BTC'])
+        self.assertAlmostEqual(1.0 - self.sim.maker_fee, balances['ETH'])
+        self.assertTrue(all(trade['fee'] == self.sim.maker_fee
+                            for trade in self.sim.trades))
+
+    def test_cancel_order(self):
+        rate = self.sim.get_rate('BTC', 'ETH') * 0.5
+        res = self.sim.buy('BTC', 'ETH', rate, '1.0')
+        self.sim.cancel_order(res)
+        self.assertEqual({}, self.sim.get_orders())
+        self.assertAlmostEqual(1.0, self.sim.get_balances()['BTC'])
+        self.assertRaises(
+            exchange.CommandError, self.sim.cancel_order, res)
+
+    def test_not_enough(self):
+        rate = self.sim.get_rate('BTC', 'ETH')
+        self.assertRaises(
+            exchange.CommandError,
+            self.sim.buy, 'BTC', 'ETH', rate, str(2 / rate))
+        self.assertRaises(
+            exchange.CommandError,
+            self.sim.sell, 'BTC', 'ETH', rate, '1.0')
+
+    def test_latency(self):
+        sim_ = self._get_simulator(latency=0.5, jitter=0.5)
+        for _ in range(10):
+            sim_.get_balances()
+        self.assertGreaterEqual(sim_.clock.time(), START + 5)
+        self.assertLessEqual(sim_.clock.time(), START + 10)
+
+    def test_bulk_orders(self):
+        sim_ = self._get_simulator(latency=1.0, order_workers=2)
+        rate = sim_.get_rate('BTC', 'ETH') * 0.5
+        requests = [
+            exchange.OrderRequest('buy', 'BTC', 'ETH', rate, '0.1'),
+            exchange.OrderRequest('buy', 'BTC', 'ETH', rate, str(4 / rate)),
+            exchange.OrderRequest('buy', 'BTC', 'ETH', rate, '0.1'),
+        ]
+        start = sim_.clock.time()
+        res = sim_.place_orders(requests)
+        # requests in parallel share latency
+        self.assertEqual(start + 2, sim_.clock.time())
+        self.assertIsInstance(res[1].error, exchange.CommandError)
+        placed = [r.result for r in res if r.error is None]
+        self.assertEqual(2, len(sim_.get_orders()['BTC_ETH']))
+
+        res = sim_.cancel_orders(placed + placed[:1])
+        self.assertEqual([None, None], [r.error for r in res[:2]])
+        self.assertIsInstance(res[2].error, exchange.CommandError)
+        self.assertEqual({}, sim_.get_orders())
+
+    def test_recorded_market(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        start = START // 300 * 300
+        candles = [
+            {'date': date, 'open': 2.0, 'high': 3.0, 'low': 1.0,
+             'close': 2.0, 'volume': 10.0}
+            for date in range(start - 3000, start + 3000, 300)
+        ]
+        cache.CandleCache(path).get_candlesticks(
+            lambda *args: candles, 'poloniex', 'BTC', 'ETH', 300,
+            start - 3000, start + 2700)
+
+        sim_ = sim.Simulator({
+            'cache': {'path': path},
+            'simulator': {'market': 'poloniex', 'start': START},
+        })
+        self.assertAlmostEqual(
+            2.0 * (1 - sim_.spread / 2), sim_.get_rate('BTC', 'ETH'))
+        self.assertRaises(
+            exchange.CommandError, sim_.get_rate, 'BTC', 'XMR')
+
+    def test_recorded_market_needs_start(self):
+        self.assertRaises(
+            sim.MissingStart, sim.Simulator,
+            {'simulator': {'market': 'poloniex'}})
@@ -0,0 +1,183 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from cryptotrade._exchanges import sim
+from cryptotrade.cli import trade_daemon
+from cryptotrade import cache
+from cryptotrade import exchange
+
+
+START = 1500000100
+INTERVAL = 1800
+
+
+class TestTradeDaemon(unittest.TestCase):
+
+    def setUp(self):
+        super(TestTradeDaemon, self).setUp()
+        self.ex = sim.Simulator({'simulator': {'start': START}})
+        self.cmd = trade_daemon.TradeDaemonCommand(mock.Mock(cfg={}), None)
+        self.args = argparse.Namespace(
+            exchange='simulator', strategy='crp', targets=['ETH', 'XMR'],
+            weights=None, balances=None, interval=INTERVAL, cycles=3,
+            force=True, state=None)
+        self.first = (START // INTERVAL + 1) * INTERVAL
+        self.times = []
+
+    def _record(self, *args, **kwargs):
+        self.times.append(self.ex.clock.time())
+
+    def _run_cycles(self):
+        self.cmd.run_cycles(self.ex, mock.Mock(), self.args)
+
+    def test_boundaries(self):
+        with mock.patch.object(self.cmd, 'prefetch',
+                               side_effect=self._record), \
+                mock.patch.object(self.cmd, 'run_cycle',
+                                  side_effect=self._record):
+            self._run_cycles()
+        boundaries = [self.first + i * INTERVAL for i in range(3)]
+        expected = []
+        for boundary in boundaries:
+            expected += [boundary - self.cmd.PREFETCH, boundary]
+        self.assertEqual(expected, self.times)
+
+    def test_until(self):
+        self.args.cycles = None
+        with mock.patch.object(self.cmd, 'run_cycle',
+                               side_effect=self._record):
+            self.cmd.run_cycles(self.ex, mock.Mock(), self.args,
+                                until=self.first + INTERVAL)
+        self.assertEqual(
+            [self.first, self.first + INTERVAL],
+            [int(t) for t in self.times])
+
+    def test_prefetch(self):
+        with mock.patch.object(self.ex, 'get_rates',
+                               wraps=self.ex.get_rates) as rates_mock, \
+                mock.patch.object(self.ex, 'get_balances') as balances_mock:
+            self.cmd.prefetch(self.ex, self.args)
+        rates_mock.assert_called_once_with('BTC', ['ETH', 'XMR'])
+        # cancelled orders would make them stale by the cycle
+        self.assertFalse(balances_mock.called)
+        with mock.patch.object(self.ex, 'get_fee') as fee_mock:
+            self.assertEqual(self.ex.taker_fee, self.cmd.get_fee(self.ex))
+        self.assertFalse(fee_mock.called)
+
+    def test_prefetch_no_targets(self):
+        self.args.targets = None
+        with mock.patch.object(self.ex, 'get_rates') as rates_mock:
+            self.cmd.prefetch(self.ex, self.args)
+        rates_mock.assert_called_once_with('BTC', [])
+
+    @mock.patch('time.time')
+    def test_prefetch_candles(self, time_mock):
+        # cache tells open candles by time
+        time_mock.side_effect = lambda: self.ex.clock.time()
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.ex.candle_cache = cache.CandleCache(path)
+        self.cmd.boundary = self.first
+        self.ex.clock.sleep(self.first - self.cmd.PREFETCH - START)
+        self.cmd.prefetch(self.ex, self.args)
+
+        self.ex.clock.sleep(self.cmd.PREFETCH + 1)
+        start, end = self.cmd.get_rates_range(self.ex, INTERVAL)
+        with mock.patch.object(
+                self.ex, 'get_candlesticks',
+                wraps=self.ex.get_candlesticks) as candlesticks_mock:
+            rates = self.cmd._get_rates(
+                self.ex.get_closing_rates, 'BTC', ['ETH', 'XMR'], INTERVAL,
+                start, end)
+        # only the last finest candle is left to fetch after the boundary
+        finest = min(self.ex.CANDLESTICKS)
+        self.assertEqual(2, candlesticks_mock.call_count)
+        for call in candlesticks_mock.call_args_list:
+            self.assertGreater(call[0][3], self.first - 2 * finest)
+        self.assertEqual(set(['BTC', 'ETH', 'XMR']), set(rates))
+
+    def test_cycle_failures(self):
+        failures = [exchange.CommandError('Nonce must be greater'), None,
+                    IOError('Connection reset'), None]
+        self.args.cycles = len(failures)
+
+        def run_cycle(*args):
+            self._record()
+            error = failures[len(self.times) - 1]
+            if error is not None:
+                raise error
+
+        with mock.patch.object(self.cmd, 'run_cycle',
+                               side_effect=run_cycle), \
+                mock.patch.object(trade_daemon.LOG, 'error') as error_mock:
+            self._run_cycles()
+        self.assertEqual(
+            [self.first + i * INTERVAL for i in range(4)],
+            [int(t) for t in self.times])
+        self.assertEqual(2, error_mock.call_count)
+
+    def test_prefetch_failure(self):
+        self.args.cycles = 1
+        with mock.patch.object(self.ex, 'get_fee',
+                               side_effect=IOError('Connection reset')), \
+                mock.patch.object(self.cmd, 'run_cycle',
+                                  side_effect=self._record):
+            self._run_cycles()
+        self.assertEqual([self.first], [int(t) for t in self.times])
+
+    def test_strategy_failure(self):
+        self.args.cycles = 2
+        failures = [KeyError('LTC'), RuntimeError("couldn't fetch rates")]
+
+        def run_cycle(*args):
+            self._record()
+            self.cmd.stream = mock.Mock()
+            raise failures.pop(0)
+
+        with mock.patch.object(self.cmd, 'run_cycle',
+                               side_effect=run_cycle), \
+                mock.patch.object(trade_daemon.LOG,
+                                  'exception') as exception_mock:
+            self._run_cycles()
+        self.assertEqual(
+            [self.first, self.first + INTERVAL],
+            [int(t) for t in self.times])
+        self.assertEqual(2, exception_mock.call_count)
+        # strategy state may be broken, it's restored from state file
+        self.assertIsNone(self.cmd.stream)
+
+    def test_cycles(self):
+        # the whole loop against the simulator
+        with mock.patch.object(self.cmd, 'get_trade_balances',
+                               side_effect=lambda ex: ex.get_balances()), \
+                mock.patch.object(self.cmd, 'report'):
+            self.cmd.run_cycles(
+                self.ex, trade_daemon.trader.get_strategy('crp'), self.args)
+        self.assertEqual(self.first + 2 * INTERVAL,
+                         self.cmd.candle * INTERVAL)
+        self.assertEqual(
+            set(['BTC', 'ETH', 'XMR']), set(self.ex.get_balances()))
@@ -0,0 +1,111 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from cryptotrade._exchanges import sim
+from cryptotrade.cli import trade_execute
+from cryptotrade import exchange
+from cryptotrade import trader
+
+
+START = 1500000100
+INTERVAL = 1800
+
+
+class TestTradeExecuteState(unittest.TestCase):
+
+    def setUp(self):
+        super(TestTradeExecuteState, self).setUp()
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.args = argparse.Namespace(
+            exchange='simulator', strategy='ons', targets=['ETH', 'XMR'],
+            weights=None, balances=None, interval=INTERVAL, force=True,
+            state=os.path.join(path, 'state.json'))
+        self.balances = {'BTC': 1.0}
+
+    def _get_ops(self, when):
+        # each run of trade_execute starts from scratch
+        ex = sim.Simulator({'simulator': {'start': when}})
+        cmd = trade_execute.TradeExecuteCommand(mock.Mock(cfg={}), None)
+        with mock.patch.object(cmd, 'get_trade_balances',
+                               return_value=self.balances), \
+                mock.patch.object(ex, 'get_opening_rates',
+                                  wraps=ex.get_opening_rates) as opening:
+            cmd.get_ops(ex, trader.get_strategy('ons'), 'BTC', self.args)
+        # strategy is warmed up unless state is restored
+        return not opening.called
+
+    def test_restored(self):
+        self.assertFalse(self._get_ops(START))
+        self.assertTrue(self._get_ops(START + INTERVAL))
+
+    def test_stale(self):
+        self.assertFalse(self._get_ops(START))
+        self.assertFalse(self._get_ops(START + 2 * INTERVAL))
+
+    def test_currencies_changed(self):
+        self.assertFalse(self._get_ops(START))
+        # ons keeps matrices sized by currencies
+        self.balances = {'BTC': 0.5, 'LTC': 10.0}
+        self.assertFalse(self._get_ops(START + INTERVAL))
+
+
+class TestCreateOrders(unittest.TestCase):
+
+    def setUp(self):
+        super(TestCreateOrders, self).setUp()
+        self.cmd = trade_execute.TradeExecuteCommand(mock.Mock(cfg={}), None)
+        self.ex = mock.Mock()
+        self.ex.get_rates.return_value = {'ETH': 0.1, 'XMR': 0.01}
+        self.ex.place_orders.side_effect = lambda requests: [
+            exchange.OrderResult({'orderNumber': i}, None)
+            for i, _ in enumerate(requests)
+        ]
+
+    def _get_rates(self, *ops):
+        with mock.patch.object(self.cmd, 'report'):
+            self.cmd.create_orders(self.ex, 'BTC', ops)
+        self.assertTrue(all(o.scheduled for o in ops))
+        requests, = self.ex.place_orders.call_args[0]
+        return [request.rate for request in requests]
+
+    def test_outbid(self):
+        rates = self._get_rates(
+            trader.TradeOp(trader.BUY_OP, alt='ETH', rate=0.0999,
+                           alt_amount=1.0),
+            trader.TradeOp(trader.SELL_OP, alt='XMR', rate=0.01001,
+                           alt_amount=1.0))
+        self.assertEqual([0.10000001, 0.00999999], rates)
+
+    def test_cannot_afford(self):
+        rates = self._get_rates(
+            trader.TradeOp(trader.BUY_OP, alt='ETH', rate=0.09,
+                           alt_amount=1.0),
+            trader.TradeOp(trader.SELL_OP, alt='XMR', rate=0.011,
+                           alt_amount=1.0))
+        self.assertEqual([0.09, 0.011], rates)
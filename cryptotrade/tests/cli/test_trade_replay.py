@@ -0,0 +1,81 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import unittest
+
+import mock
+import six
+
+from cryptotrade._exchanges import sim
+from cryptotrade.cli import trade_replay
+from cryptotrade import exchange
+
+
+START = 1500000000
+
+
+class TestTradeReplay(unittest.TestCase):
+
+    def setUp(self):
+        super(TestTradeReplay, self).setUp()
+        conf = {'simulator': {'start': START, 'seed': 1}}
+        self.real = sim.Simulator(conf)
+        patcher = mock.patch.object(
+            exchange, 'get_exchange_by_name', return_value=self.real)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cmd = trade_replay.TradeReplayCommand(mock.Mock(cfg=conf), None)
+        self.args = argparse.Namespace(
+            exchange='simulator', strategy='crp', targets=['ETH', 'XMR'],
+            weights=None, balances=['BTC=1.0'], interval=1800, period=1.0,
+            engine='loop', cycles=None, force=False, state=None)
+
+    def _get_results(self):
+        _, rows = self.cmd.take_action(self.args)
+        return {row[0]: row[1:] for row in rows}
+
+    @mock.patch('sys.stdout', new_callable=six.StringIO)
+    def test_replay(self, stdout_mock):
+        with mock.patch.object(trade_replay.LOG, 'debug') as debug_mock:
+            res = self._get_results()
+        self.assertEqual(1.0, res['Old BTC'][0])
+        self.assertAlmostEqual(res['New BTC'][1], res['New BTC'][0], 1)
+        self.assertEqual(res['Cycles'][1], res['Cycles'][0])
+        self.assertGreater(res['Trades'][0], 0)
+        # execution loop reports to log instead of stdout
+        self.assertEqual('', stdout_mock.getvalue())
+        self.assertTrue(debug_mock.called)
+
+    def test_replay_open_orders(self):
+        orders = []
+
+        def run_cycles(ex, strategy, parsed_args, until=None):
+            # the last cycle leaves an order that holds half of funds
+            ex.clock.sleep(parsed_args.interval)
+            rate = ex.get_rate('BTC', 'ETH') * 0.5
+            orders.append(ex.buy('BTC', 'ETH', rate, str(0.5 / rate)))
+
+        with mock.patch.object(self.cmd, 'run_cycles',
+                               side_effect=run_cycles):
+            res = self._get_results()
+        self.assertEqual(1, len(orders))
+        self.assertEqual(0, res['Trades'][0])
+        self.assertAlmostEqual(1.0, res['New BTC'][0])
@@ -0,0 +1,64 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+
+import mock
+
+from cryptotrade._exchanges import coin
+from cryptotrade._exchanges import polo
+from cryptotrade.cli import worth
+from cryptotrade import exchange
+
+
+class TestWorth(unittest.TestCase):
+
+    def setUp(self):
+        super(TestWorth, self).setUp()
+        conf = {
+            'coinbase': {'api_key': 'fakekey', 'api_secret': 'fakesecret'},
+            'poloniex': {'api_key': 'fakekey', 'api_secret': 'fakesecret'},
+        }
+        self.coin = coin.Coinbase(conf)
+        self.plx = polo.Poloniex(conf)
+        self.cmd = worth.WorthCommand(mock.Mock(cfg=conf), None)
+
+    def test_worth(self):
+        rates = {'currency': 'BTC', 'rates': {'ETH': '10.0', 'USD': '2500.0'}}
+        ticker = {
+            'BTC_XMR': {'lowestAsk': 0.02, 'highestBid': 0.02},
+            'USDT_BTC': {'lowestAsk': 2000.0, 'highestBid': 2000.0},
+        }
+        with mock.patch.object(exchange, 'get_active_exchanges',
+                               return_value=[self.coin, self.plx]), \
+                mock.patch.object(self.coin, 'get_balances',
+                                  return_value={'BTC': 1.0, 'ETH': 10.0}), \
+                mock.patch.object(self.plx, 'get_balances',
+                                  return_value={'XMR': 50.0}), \
+                mock.patch.object(self.coin.client, 'get_exchange_rates',
+                                  return_value=rates) as coin_mock, \
+                mock.patch.object(self.plx.private, 'returnTicker',
+                                  return_value=ticker) as plx_mock:
+            res = dict(self.cmd.take_action(None)[1])
+        # each exchange is asked for rates only once
+        coin_mock.assert_called_once_with(currency='BTC')
+        plx_mock.assert_called_once()
+        self.assertAlmostEqual(3.0, res['BTC'])
+        self.assertAlmostEqual(2.0 * 2500 + 2000, res['USD'])
@@ -18,9 +18,65 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 
+from cryptotrade.cli import trade_execute
+from cryptotrade.cmd import ct
+
 
 # todo: actually cover the module with tests
 class TestMain(unittest.TestCase):
     pass
+
+
+class TestCommandManager(unittest.TestCase):
+
+    def test_entry_point_names(self):
+        command_manager = ct._get_command_manager()
+        for argv in (['trade', 'execute'], ['trade_execute']):
+            cmd_factory, name, args = command_manager.find_command(
+                argv + ['-t', 'ETH'])
+            self.assertIs(trade_execute.TradeExecuteCommand, cmd_factory)
+            self.assertEqual(['-t', 'ETH'], args)
+
+
+class TestStartup(unittest.TestCase):
+
+    # startup time itself is tracked by benchmarks (tox -e bench) against
+    # recorded baseline, since wall clock of a test run is too noisy to judge
+
+    HEAVY_MODULES = ('coinbase', 'poloniex', 'rpy2')
+
+    SCRIPT = '''
+import sys
+from cryptotrade.cmd import ct
+try:
+    ct.main(['-c', sys.argv[1], 'balance', '--help'])
+except SystemExit:
+    pass
+sys.stderr.write(' '.join(m for m in %r if m in sys.modules))
+'''
+
+    def setUp(self):
+        super(TestStartup, self).setUp()
+        fp, self.fname = tempfile.mkstemp()
+        self.addCleanup(os.remove, self.fname)
+        with os.fdopen(fp, 'w') as f:
+            f.write('poloniex:\n'
+                    '    api_key: fakekey\n'
+                    '    api_secret: fakesecret\n')
+
+    def test_balance_help(self):
+        proc = subprocess.Popen(
+            [sys.executable, '-c', self.SCRIPT % (self.HEAVY_MODULES,),
+             self.fname],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, err = proc.communicate()
+
+        self.assertEqual(0, proc.returncode)
+        # heavy client libraries should be loaded on first use only
+        self.assertEqual('', err.decode('utf-8').strip())
@@ -0,0 +1,130 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import collections
+import random
+import unittest
+
+from cryptotrade import backtest
+from cryptotrade import trader
+
+
+class TestVectorEngine(unittest.TestCase):
+
+    def setUp(self):
+        super(TestVectorEngine, self).setUp()
+        self.engine = backtest.VectorEngine()
+
+    def test_balance_trader_balances(self):
+        targets = ['ETH', 'BTC', 'LTC']
+        weights = [0.5, 0.25, 0.25]
+        balances = {'BTC': 1000.0, 'ETH': 0.0, 'LTC': 0.0}
+        fake_rates = {
+            'ETH': [0.5,  1.0, 0.5],
+            'LTC': [0.5, 0.25, 1.0],
+            'BTC': [1.0,  1.0, 1.0],
+        }
+
+        strategy = trader.CRPStrategy(adjust_gold=1.0)
+        _, new_balances = self.engine.trade(
+            strategy, targets, weights, 'BTC', 0.0, balances, fake_rates)
+
+        # same as in TestBalanceTrader
+        self.assertEqual(
+            {'BTC': 515.625, 'ETH': 2062.5, 'LTC': 515.625}, new_balances)
+
+    def test_matches_loop_engine(self):
+        balances = collections.defaultdict(float)
+        balances.update({'BTC': 5, 'ETH': 10, 'XMR': 20})
+        targets = ['BTC', 'ETH', 'XMR', 'LTC']
+        weights = [0.4, 0.3, 0.2, 0.1]
+        fake_rates = {
+            currency: [
+                random.uniform(0.09, 0.11) for i in range(50)
+            ]
+            for currency in ('ETH', 'XMR', 'LTC')
+        }
+        fake_rates['BTC'] = [1.0] * 50
+
+        strategy = trader.CRPStrategy()
+        _, expected = backtest.LoopEngine().trade(
+            strategy, targets, weights, 'BTC', 0.0, balances, fake_rates)
+        _, res = self.engine.trade(
+            strategy, targets, weights, 'BTC', 0.0, balances, fake_rates)
+
+        for currency in set(expected) | set(res):
+            self.assertAlmostEqual(expected[currency], res[currency])
+
+    def test_olps_matches_loop_engine(self):
+        balances = collections.defaultdict(float)
+        balances.update({'BTC': 5, 'ETH': 10, 'XMR': 20})
+        targets = ['BTC', 'ETH', 'XMR']
+        fake_rates = {
+            currency: [
+                random.uniform(0.09, 0.11) for i in range(50)
+            ]
+            for currency in ('ETH', 'XMR')
+        }
+        fake_rates['BTC'] = [1.0] * 50
+
+        for cls in (trader.PAMRStrategy, trader.OLMARStrategy,
+                    trader.EGStrategy, trader.ONSStrategy):
+            strategy = cls()
+            _, expected = backtest.LoopEngine().trade(
+                strategy, targets, None, 'BTC', 0.0, balances, fake_rates)
+            _, res = self.engine.trade(
+                strategy, targets, None, 'BTC', 0.0, balances, fake_rates)
+            for currency in set(expected) | set(res):
+                self.assertAlmostEqual(expected[currency], res[currency])
+
+    def test_no_targets(self):
+        # olps strategies rebalance currencies held
+        balances = {'BTC': 5, 'ETH': 10, 'XMR': 20}
+        fake_rates = {'BTC': [1.0, 1.0, 1.0], 'ETH': [0.1, 0.12, 0.09],
+                      'XMR': [0.1, 0.08, 0.11]}
+        strategy = trader.PAMRStrategy()
+        _, expected = backtest.LoopEngine().trade(
+            strategy, None, None, 'BTC', 0.0, balances, fake_rates)
+        _, res = self.engine.trade(
+            strategy, None, None, 'BTC', 0.0, balances, fake_rates)
+        for currency in set(expected) | set(res):
+            self.assertAlmostEqual(expected[currency], res[currency])
+
+    def test_noop_does_nothing(self):
+        balances = {'BTC': 5, 'ETH': 10, 'XMR': 20}
+        fake_rates = {
+            currency: [
+                random.random() for i in range(100)
+            ]
+            for currency in balances.keys()
+        }
+        strategy = trader.NoopStrategy()
+        _, res = self.engine.trade(
+            strategy, ['BTC', 'ETH'], [0.5, 0.5], 'BTC', 0.0, balances,
+            fake_rates)
+        self.assertEqual(balances, res)
+
+    def test_unsupported_strategy(self):
+        balances = {'BTC': 5, 'ETH': 10}
+        fake_rates = {'BTC': [1.0, 1.0], 'ETH': [0.5, 0.6]}
+        strategy = trader.OlpsRPAMRStrategy()
+        self.assertRaises(
+            NotImplementedError, self.engine.trade,
+            strategy, ['BTC', 'ETH'], None, 'BTC', 0.0, balances, fake_rates)
@@ -0,0 +1,115 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import tempfile
+import unittest
+
+import six
+
+from cryptotrade import bench
+
+
+class TestSyntheticExchange(unittest.TestCase):
+
+    def setUp(self):
+        super(TestSyntheticExchange, self).setUp()
+        self.ex = bench.SyntheticExchange(currencies=3)
+
+    def test_get_closing_rates(self):
+        rates = self.ex.get_closing_rates(
+            'BTC', self.ex.currencies, 300, 3000, 5700)
+        self.assertEqual(set(self.ex.currencies + ['BTC']), set(rates))
+        for v in rates.values():
+            self.assertEqual(10, len(v))
+
+    def test_candles_consistent(self):
+        whole = self.ex.get_candlesticks('BTC', 'C000', 300, 0, 2700)
+        part = self.ex.get_candlesticks('BTC', 'C000', 300, 900, 1500)
+        self.assertEqual(whole[3:6], part)
+
+    def test_get_worth(self):
+        balances = self.ex.get_balances()
+        self.assertGreater(self.ex.get_worth('BTC', balances=balances), 1.0)
+
+
+class TestCompare(unittest.TestCase):
+
+    BASELINE = {
+        'a': {'p50': 1.0, 'peak_memory': 100},
+        'b': {'p50': 1.0, 'peak_memory': None},
+    }
+
+    def test_no_regressions(self):
+        results = {
+            'a': {'p50': 1.1, 'peak_memory': 110},
+            'b': {'p50': 0.5, 'peak_memory': 1000},
+            'new': {'p50': 100.0, 'peak_memory': 1000},
+        }
+        self.assertEqual([], bench.compare(results, self.BASELINE, 0.25))
+
+    def test_regressions(self):
+        results = {
+            'a': {'p50': 1.5, 'peak_memory': 200},
+            'b': {'p50': 1.0, 'peak_memory': None},
+        }
+        regressions = bench.compare(results, self.BASELINE, 0.25)
+        self.assertEqual(2, len(regressions))
+        self.assertTrue(all(r.startswith('a: ') for r in regressions))
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        super(TestMain, self).setUp()
+        fd, self.baseline = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.baseline)
+        self.addCleanup(
+            lambda: os.path.exists(self.baseline) and
+            os.remove(self.baseline))
+
+    def test_run(self):
+        out = six.StringIO()
+        results = bench.run(bench.QUICK_SIZES, 'worth/', out=out)
+        self.assertEqual(
+            ['worth/5', 'worth/10'],
+            [line.split()[0] for line in out.getvalue().splitlines()])
+        for res in results.values():
+            self.assertLessEqual(res['p50'], res['p99'])
+            self.assertGreater(res['throughput'], 0)
+
+    def test_baseline(self):
+        argv = ['--quick', '--filter', 'worth/', '--baseline', self.baseline]
+        self.assertEqual(0, bench.main(argv))
+        with open(self.baseline) as f:
+            baseline = json.load(f)
+        self.assertEqual(set(['worth/5', 'worth/10']), set(baseline))
+
+        # make the baseline impossible to match
+        for res in baseline.values():
+            res['p50'] = 0.0
+        with open(self.baseline, 'w') as f:
+            json.dump(baseline, f)
+        self.assertEqual(1, bench.main(argv))
+
+        self.assertEqual(0, bench.main(argv + ['--save']))
+        self.assertEqual(0, bench.main(argv + ['--tolerance', '1000']))
@@ -0,0 +1,237 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+import numpy as np
+
+from cryptotrade import cache
+
+
+class TestMissingRanges(unittest.TestCase):
+    def test_nothing_cached(self):
+        self.assertEqual([(0, 100)], cache._missing_ranges([], 0, 100))
+
+    def test_everything_cached(self):
+        self.assertEqual([], cache._missing_ranges([[0, 100]], 10, 90))
+
+    def test_gaps(self):
+        self.assertEqual(
+            [(0, 10), (20, 30), (40, 50)],
+            cache._missing_ranges([[10, 20], [30, 40]], 0, 50))
+
+
+class TestCandleCache(unittest.TestCase):
+
+    def setUp(self):
+        super(TestCandleCache, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.cache = cache.CandleCache(self.path)
+        self.fetch = mock.Mock(side_effect=self._fetch)
+
+    @staticmethod
+    def _fetch(from_, to_, period, start, end):
+        first = start + (-start % period)
+        return [
+            {'date': date, 'open': float(date), 'high': float(date + 2),
+             'low': float(date), 'close': float(date + 1), 'volume': 1.0}
+            for date in range(first, end + 1, period)
+        ]
+
+    def _get(self, start, end):
+        return self.cache.get_candlesticks(
+            self.fetch, 'fake', 'BTC', 'XMR', 300, start, end)
+
+    def test_cached(self):
+        res = self._get(0, 3000)
+        self.assertEqual(11, len(res))
+        self.assertEqual(res, self._get(0, 3000))
+        self.fetch.assert_called_once_with('BTC', 'XMR', 300, 0, 3000)
+
+    def test_fetches_missing_range_only(self):
+        self._get(0, 3000)
+        res = self._get(1500, 4500)
+        self.assertEqual(
+            list(range(1500, 4501, 300)), [c['date'] for c in res])
+        self.fetch.assert_called_with('BTC', 'XMR', 300, 3000, 4500)
+
+    def test_directory_created_concurrently(self):
+        makedirs = os.makedirs
+
+        def racing_makedirs(name, *args, **kwargs):
+            # another writer gets there first
+            makedirs(name, *args, **kwargs)
+            raise OSError(errno.EEXIST, 'File exists')
+
+        with mock.patch.object(cache.os, 'makedirs',
+                               side_effect=racing_makedirs):
+            self._get(0, 3000)
+        self.fetch.reset_mock()
+        self._get(0, 3000)
+        self.assertFalse(self.fetch.called)
+
+    def test_directory_not_created(self):
+        with mock.patch.object(cache.os, 'makedirs',
+                               side_effect=OSError(errno.EACCES, 'Denied')):
+            self.assertRaises(OSError, self._get, 0, 3000)
+
+    def test_persisted(self):
+        self._get(0, 3000)
+        other = self.cache.__class__(self.path)
+        other.get_candlesticks(
+            self.fetch, 'fake', 'BTC', 'XMR', 300, 0, 3000)
+        self.fetch.assert_called_once_with('BTC', 'XMR', 300, 0, 3000)
+
+    def test_zero_rates_not_cached(self):
+        self.fetch.side_effect = lambda *args: [{'date': 0, 'close': 0.0}]
+        self._get(0, 300)
+        self._get(0, 300)
+        self.assertEqual(2, self.fetch.call_count)
+
+    @mock.patch('time.time', return_value=3000)
+    def test_open_candles_not_cached(self, time_mock):
+        self._get(0, 3000)
+        self._get(0, 3000)
+        self.fetch.assert_called_with('BTC', 'XMR', 300, 2700, 3000)
+
+
+class TestColumnarCandleCache(TestCandleCache):
+
+    def setUp(self):
+        super(TestColumnarCandleCache, self).setUp()
+        self.cache = cache.ColumnarCandleCache(self.path)
+
+    def _get_column(self, start, end, field='close'):
+        return self.cache.get_columns(
+            self.fetch, 'fake', 'BTC', 'XMR', 300, start, end, [field])[field]
+
+    def test_candles(self):
+        self.assertEqual(self._fetch('BTC', 'XMR', 300, 0, 3000),
+                         self._get(0, 3000))
+
+    def test_get_column(self):
+        res = self._get_column(0, 3000)
+        self.assertEqual(
+            [float(date + 1) for date in range(0, 3001, 300)], list(res))
+
+        # once stored, column is mapped from file
+        res = self._get_column(600, 1200, field='open')
+        self.assertIsInstance(res, np.memmap)
+        self.assertEqual([600.0, 900.0, 1200.0], list(res))
+        self.fetch.assert_called_once_with('BTC', 'XMR', 300, 0, 3000)
+
+    def test_prepend_older_candles(self):
+        self._get(3000, 6000)
+        res = self._get(0, 6000)
+        self.assertEqual(
+            list(range(0, 6001, 300)), [c['date'] for c in res])
+        self.assertEqual(
+            [float(date) for date in range(0, 6001, 300)],
+            list(self._get_column(0, 6000, field='low')))
+
+    @mock.patch('time.time', return_value=3000)
+    def test_get_column_open_candles(self, time_mock):
+        res = self._get_column(0, 3000)
+        self.assertEqual(
+            [float(date + 1) for date in range(0, 3001, 300)], list(res))
+        res = self._get_column(0, 3000)
+        self.assertEqual(
+            [float(date + 1) for date in range(0, 3001, 300)], list(res))
+
+
+class TestGetCandleCache(unittest.TestCase):
+    def test_not_configured(self):
+        self.assertIsNone(cache.get_candle_cache({}))
+
+    def test_configured(self):
+        res = cache.get_candle_cache({'cache': {'path': '/tmp'}})
+        self.assertIsInstance(res, cache.CandleCache)
+
+    def test_configured_columnar(self):
+        res = cache.get_candle_cache(
+            {'cache': {'path': '/tmp', 'format': 'columnar'}})
+        self.assertIsInstance(res, cache.ColumnarCandleCache)
+
+
+class TestStateFile(unittest.TestCase):
+
+    def setUp(self):
+        super(TestStateFile, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_load_missing(self):
+        state_file = cache.StateFile(os.path.join(self.path, 'state.json'))
+        self.assertIsNone(state_file.load())
+
+    def test_save_load(self):
+        state_file = cache.get_state_file(
+            {'cache': {'path': self.path}}, 'trade')
+        state_file.save({'steps': 1})
+        self.assertEqual(
+            os.path.join(self.path, 'state', 'trade.json'),
+            state_file.filename)
+        self.assertEqual({'steps': 1}, state_file.load())
+
+    def test_not_configured(self):
+        self.assertIsNone(cache.get_state_file({}, 'trade'))
+
+
+class TestSnapshotCache(unittest.TestCase):
+
+    def setUp(self):
+        super(TestSnapshotCache, self).setUp()
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.fetch = mock.Mock(return_value={'BTC_XMR': 0.1})
+
+    def test_cached_in_memory(self):
+        snapshots = cache.SnapshotCache('fake', 60)
+        self.assertEqual({'BTC_XMR': 0.1}, snapshots.get('t', self.fetch))
+        self.assertEqual({'BTC_XMR': 0.1}, snapshots.get('t', self.fetch))
+        self.fetch.assert_called_once_with()
+        self.assertEqual({'hits': 1, 'misses': 1}, snapshots.stats)
+
+    def test_expires(self):
+        snapshots = cache.SnapshotCache('fake', 60)
+        with mock.patch('time.time', return_value=1000):
+            snapshots.get('t', self.fetch)
+        with mock.patch('time.time', return_value=1060):
+            snapshots.get('t', self.fetch)
+        self.assertEqual(2, self.fetch.call_count)
+
+    def test_shared_between_instances(self):
+        cache.SnapshotCache('fake', 60, path=self.path).get('t', self.fetch)
+        snapshots = cache.SnapshotCache('fake', 60, path=self.path)
+        self.assertEqual({'BTC_XMR': 0.1}, snapshots.get('t', self.fetch))
+        self.fetch.assert_called_once_with()
+        self.assertEqual({'hits': 1, 'misses': 0}, snapshots.stats)
+
+    def test_get_snapshot_cache_ttl(self):
+        conf = {'poloniex': {'ticker_ttl': 5}, 'cache': {'path': self.path}}
+        snapshots = cache.get_snapshot_cache(conf, 'poloniex')
+        self.assertEqual(5, snapshots.ttl)
+        self.assertEqual(self.path, snapshots.path)
@@ -19,8 +19,15 @@
 # SOFTWARE.
 
 import random
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 
+import mock
+
+from cryptotrade import cache
 from cryptotrade import exchange
 from cryptotrade._exchanges import polo
 
@@ -43,6 +50,17 @@ class TestGetWorth(unittest.TestCase):
             else:  # BTC -> USD
                 return 2500
 
+        def get_rates(self, gold, currencies):
+            if gold == 'USD':
+                return {
+                    currency: self.get_rate('BTC', currency) * 2500
+                    for currency in currencies
+                }
+            return {
+                currency: self.get_rate(gold, currency)
+                for currency in currencies
+            }
+
         def get_fee(self):
             return 0.0
 
@@ -89,6 +107,12 @@ class TestGetWorth(unittest.TestCase):
         res = self.exchange.get_worth('USD', balances=balances)
         self.assertEqual(15 * 2500, res)
 
+    def test_get_worth_custom_rates(self):
+        balances = {'BTC': 10, 'ETH': 200}
+        rates = {'BTC': 1, 'ETH': 0.1}
+        res = self.exchange.get_worth('BTC', balances=balances, rates=rates)
+        self.assertEqual(30, res)
+
     def test_get_closing_rates(self):
         res = self.exchange.get_closing_rates(
             'BTC', ('XMR', 'ETH'), 300, 0, 0 + 1500)
@@ -96,6 +120,65 @@ class TestGetWorth(unittest.TestCase):
             self.assertEqual(1500/300, len(v))
         self.assertEqual([1] * len(v), res['BTC'])
 
+    @mock.patch('time.sleep')
+    def test_get_closing_rates_refetches_zero_rates(self, sleep_mock):
+        results = {
+            'XMR': [[{'close': 0.0}], [{'close': 0.0}], [{'close': 0.5}]],
+            'ETH': [[{'close': 0.1}]],
+        }
+        with mock.patch.object(
+                self.exchange, 'get_candlesticks',
+                side_effect=lambda from_, to_, *args: results[to_].pop(0)):
+            res = self.exchange.get_closing_rates(
+                'BTC', ('XMR', 'ETH'), 300, 0, 300)
+        self.assertEqual({'BTC': [1], 'XMR': [0.5], 'ETH': [0.1]}, res)
+        self.assertEqual(2, sleep_mock.call_count)
+
+    @mock.patch('time.sleep')
+    def test_get_closing_rates_gives_up(self, sleep_mock):
+        with mock.patch.object(self.exchange, 'get_candlesticks',
+                               return_value=[{'close': 0.0}]):
+            self.assertRaises(
+                RuntimeError, self.exchange.get_closing_rates,
+                'BTC', ('XMR', 'ETH'), 300, 0, 300)
+
+    @staticmethod
+    def _get_candlesticks(from_, to_, period, start, end):
+        return [
+            {'date': date, 'open': float(date), 'close': date + 1.0}
+            for date in range(start, end + 1, period)
+        ]
+
+    def test_get_closing_rates_resampled(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.exchange.candle_cache = cache.CandleCache(path)
+        self.exchange.CANDLESTICKS = (300, 900)
+        with mock.patch.object(
+                self.exchange, 'get_candlesticks',
+                side_effect=self._get_candlesticks) as candlesticks_mock:
+            closing = self.exchange.get_closing_rates(
+                'BTC', ('XMR',), 900, 100, 1800)
+            opening = self.exchange.get_opening_rates(
+                'BTC', ('XMR',), 900, 100, 1800)
+        # only finest candles are fetched, for whole coarse candles, once
+        candlesticks_mock.assert_called_once_with(
+            'BTC', 'XMR', 300, 900, 2400)
+        self.assertEqual([1501.0, 2401.0], list(closing['XMR']))
+        self.assertEqual([900.0, 1800.0], list(opening['XMR']))
+
+    def test_get_closing_rates_not_resampled_without_cache(self):
+        self.exchange.CANDLESTICKS = (300, 900)
+        with mock.patch.object(
+                self.exchange, 'get_candlesticks',
+                side_effect=self._get_candlesticks) as candlesticks_mock:
+            closing = self.exchange.get_closing_rates(
+                'BTC', ('XMR',), 900, 900, 1800)
+        # finest candles would be thrown away after each call
+        candlesticks_mock.assert_called_once_with(
+            'BTC', 'XMR', 900, 900, 1800)
+        self.assertEqual([901.0, 1801.0], list(closing['XMR']))
+
 
 class TestGetActiveExchanges(unittest.TestCase):
     def test_configured_exchange_is_returned(self):
@@ -103,3 +186,109 @@ class TestGetActiveExchanges(unittest.TestCase):
         exchanges = exchange.get_active_exchanges(conf)
         self.assertEqual(1, len(exchanges))
         self.assertIsInstance(exchanges[0], polo.Poloniex)
+
+
+class TestBulkOrders(unittest.TestCase):
+
+    def setUp(self):
+        super(TestBulkOrders, self).setUp()
+        self.exchange = TestGetWorth.FakeExchange(
+            {'fakeexchange': {'order_workers': 3}})
+
+    def test_cancel_orders(self):
+        def cancel_order(order):
+            if order['orderNumber'] == 2:
+                raise exchange.CommandError('No such order')
+
+        orders = [{'orderNumber': number} for number in range(5)]
+        with mock.patch.object(self.exchange, 'cancel_order',
+                               side_effect=cancel_order) as cancel_mock:
+            res = self.exchange.cancel_orders(orders)
+        self.assertEqual(5, cancel_mock.call_count)
+        self.assertEqual(
+            [None, None, 'No such order', None, None],
+            [str(r.error) if r.error else None for r in res])
+
+    def test_place_orders(self):
+        requests = [
+            exchange.OrderRequest('buy', 'BTC', 'ETH', 0.1, '1.0'),
+            exchange.OrderRequest('sell', 'BTC', 'XMR', 0.01, '2.0'),
+        ]
+        with mock.patch.object(self.exchange, 'buy',
+                               return_value={'orderNumber': 1}) as buy_mock, \
+                mock.patch.object(self.exchange, 'sell',
+                                  side_effect=exchange.CommandError):
+            res = self.exchange.place_orders(requests)
+        buy_mock.assert_called_once_with('BTC', 'ETH', 0.1, '1.0')
+        self.assertEqual({'orderNumber': 1}, res[0].result)
+        self.assertIsNone(res[0].error)
+        self.assertIsNone(res[1].result)
+        self.assertIsInstance(res[1].error, exchange.CommandError)
+
+    def test_bounded_parallelism(self):
+        lock = threading.Lock()
+        counts = {'current': 0, 'max': 0}
+
+        def cancel_order(order):
+            with lock:
+                counts['current'] += 1
+                counts['max'] = max(counts['max'], counts['current'])
+            time.sleep(0.05)
+            with lock:
+                counts['current'] -= 1
+
+        with mock.patch.object(self.exchange, 'cancel_order',
+                               side_effect=cancel_order):
+            self.exchange.cancel_orders(
+                [{'orderNumber': number} for number in range(9)])
+        self.assertEqual(3, counts['max'])
+
+    def test_empty(self):
+        self.assertEqual([], self.exchange.cancel_orders([]))
+        self.assertEqual([], self.exchange.place_orders([]))
+
+
+class TestMapExchanges(unittest.TestCase):
+
+    class FakeExchange(object):
+        def __init__(self, name, balances, timeout=1):
+            self.name = name
+            self.balances = balances
+            self.timeout = timeout
+            self.event = threading.Event()
+
+        def get_balances(self):
+            self.event.wait(5)
+            return self.balances
+
+    def test_get_global_balance(self):
+        exchanges = [
+            self.FakeExchange('one', {'BTC': 1.0, 'XMR': 2.0}),
+            self.FakeExchange('two', {'BTC': 3.0}),
+        ]
+        for ex in exchanges:
+            ex.event.set()
+        with mock.patch.object(exchange, 'get_active_exchanges',
+                               return_value=exchanges):
+            res = exchange.get_global_balance({})
+        self.assertEqual({'BTC': 4.0, 'XMR': 2.0}, res)
+
+    def test_runs_concurrently(self):
+        exchanges = [self.FakeExchange('one', 1), self.FakeExchange('two', 2)]
+
+        # first exchange doesn't respond until second one is called
+        def get_balances(ex):
+            if ex is exchanges[1]:
+                exchanges[0].event.set()
+                ex.event.set()
+            return ex.get_balances()
+
+        res = exchange.map_exchanges(get_balances, exchanges)
+        self.assertEqual([1, 2], res)
+
+    def test_timeout(self):
+        exchanges = [self.FakeExchange('one', 1, timeout=0.1)]
+        self.assertRaises(
+            exchange.ExchangeTimeout,
+            exchange.map_exchanges, lambda ex: ex.get_balances(), exchanges)
+        exchanges[0].event.set()
@@ -0,0 +1,199 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+
+import numpy as np
+
+from cryptotrade import olps
+
+
+# price matrix the reference weights below were calculated on, one row per
+# period, one column per currency
+PRICES = np.array([
+    [1.00, 1.00, 1.00],
+    [1.02, 0.99, 1.01],
+    [1.01, 1.01, 1.03],
+    [1.04, 0.98, 1.02],
+    [1.03, 0.97, 1.05],
+    [1.00, 1.00, 1.04],
+    [1.02, 1.03, 1.01],
+    [1.05, 1.01, 0.99],
+])
+
+# portfolios after each period of PRICES, starting from uniform one, as
+# calculated step by step with olpsR update rules (PAMR with eps=1.0, OLMAR
+# with eps=1.01 and window of 5, EG and ONS with olpsR defaults); ONS
+# projections were solved exactly by checking every support of portfolio
+PAMR_REFERENCE = np.array([
+    [0.1428571429, 0.5714285714, 0.2857142857],
+    [0.6729204499, 0.3010612367, 0.0260183134],
+    [0.4783768331, 0.4573774113, 0.0642457556],
+    [0.4783768331, 0.4573774113, 0.0642457556],
+    [0.4783768331, 0.4573774113, 0.0642457556],
+    [0.3384008850, 0.2093012262, 0.4522978888],
+    [0.3384008850, 0.2093012262, 0.4522978888],
+])
+
+OLMAR_REFERENCE = np.array([
+    [0.0000000000, 1.0000000000, 0.0000000000],
+    [0.7401875312, 0.2598124688, 0.0000000000],
+    [0.1453936720, 0.8546063280, 0.0000000000],
+    [0.1453936720, 0.8546063280, 0.0000000000],
+    [0.5413598239, 0.4586401761, 0.0000000000],
+    [0.5881065810, 0.0000000000, 0.4118934190],
+    [0.4404228052, 0.0000000000, 0.5595771948],
+])
+
+EG_REFERENCE = np.array([
+    [0.3335540930, 0.3330574454, 0.3333884616],
+    [0.3332261877, 0.3332246176, 0.3335491946],
+    [0.3337770149, 0.3327822895, 0.3334406956],
+    [0.3335637167, 0.3325598693, 0.3338764139],
+    [0.3331203481, 0.3331192021, 0.3337604499],
+    [0.3333346948, 0.3334990927, 0.3331662125],
+    [0.3338813883, 0.3332288216, 0.3328897901],
+])
+
+ONS_REFERENCE = np.array([
+    [0.3234041310, 0.3457448363, 0.3308510327],
+    [0.3381417303, 0.3382305841, 0.3236276856],
+    [0.3134277077, 0.3580887887, 0.3284835035],
+    [0.3229889266, 0.3681054188, 0.3089056545],
+    [0.3428244065, 0.3430562956, 0.3141192979],
+    [0.3332130569, 0.3260470064, 0.3407399367],
+    [0.3087596373, 0.3381160133, 0.3531243495],
+])
+
+
+class TestProjectSimplex(unittest.TestCase):
+    def test_already_on_simplex(self):
+        res = olps.project_simplex(np.array([0.2, 0.3, 0.5]))
+        np.testing.assert_allclose([0.2, 0.3, 0.5], res)
+
+    def test_shifts_uniformly(self):
+        res = olps.project_simplex(np.array([0.6, 0.6]))
+        np.testing.assert_allclose([0.5, 0.5], res)
+
+    def test_clips_negative(self):
+        res = olps.project_simplex(np.array([-2.0, 3.0]))
+        np.testing.assert_allclose([0.0, 1.0], res)
+
+
+class TestPAMR(unittest.TestCase):
+    def test_no_loss_keeps_portfolio(self):
+        b = np.array([0.5, 0.5])
+        res = olps.pamr(b, np.array([0.6, 0.2]), eps=0.5)
+        np.testing.assert_allclose(b, res)
+
+    def test_moves_away_from_winner(self):
+        # loss = 0.001, tau = 0.001 / 0.0002 = 5
+        b = np.array([0.5, 0.5])
+        res = olps.pamr(b, np.array([1.01, 0.99]), eps=0.999)
+        np.testing.assert_allclose([0.45, 0.55], res)
+
+    def test_aggressive_update(self):
+        b = np.array([0.5, 0.5])
+        res = olps.pamr(b, np.array([1.1, 0.9]))
+        np.testing.assert_allclose([0.0, 1.0], res)
+
+    def test_flat_market(self):
+        b = np.array([0.5, 0.5])
+        res = olps.pamr(b, np.array([1.0, 1.0]))
+        np.testing.assert_allclose(b, res)
+
+
+class TestOLMAR(unittest.TestCase):
+    def test_moves_to_mean_reverting_asset(self):
+        prices = np.array([[1.0, 1.0], [1.0, 1.0], [1.0, 2.0]])
+        res = olps.olmar(np.array([0.5, 0.5]), prices)
+        np.testing.assert_allclose([1.0, 0.0], res)
+
+
+class TestEG(unittest.TestCase):
+    def test_moves_to_winner(self):
+        res = olps.eg(np.array([0.5, 0.5]), np.array([1.1, 0.9]))
+        self.assertAlmostEqual(1.0, res.sum())
+        self.assertGreater(res[0], 0.5)
+
+
+class TestONS(unittest.TestCase):
+    def test_first_step(self):
+        # reference value calculated with brute force search for projection
+        state = olps.ONSState(2)
+        res = olps.ons(np.array([0.5, 0.5]), np.array([1.1, 0.9]), state)
+        np.testing.assert_allclose([0.42647059, 0.57352941], res, atol=1e-6)
+
+    def test_stays_on_simplex(self):
+        state = olps.ONSState(3)
+        b = np.array([0.2, 0.3, 0.5])
+        for x in ([1.1, 0.9, 1.0], [0.8, 1.2, 1.0], [1.0, 1.0, 1.3]):
+            b = olps.ons(b, np.array(x), state)
+            self.assertAlmostEqual(1.0, b.sum())
+            self.assertTrue((b >= 0).all())
+
+
+class TestOlpsRReference(unittest.TestCase):
+
+    def _assert_reference(self, reference, update):
+        b = np.full(PRICES.shape[1], 1.0 / PRICES.shape[1])
+        for i, expected in enumerate(reference, 1):
+            b = update(b, i)
+            np.testing.assert_allclose(expected, b, atol=1e-8)
+
+    def _relatives(self, i):
+        return PRICES[i] / PRICES[i - 1]
+
+    def test_pamr(self):
+        self._assert_reference(
+            PAMR_REFERENCE,
+            lambda b, i: olps.pamr(b, self._relatives(i), eps=1.0))
+
+    def test_olmar(self):
+        self._assert_reference(
+            OLMAR_REFERENCE,
+            lambda b, i: olps.olmar(b, PRICES[max(0, i - 4):i + 1], eps=1.01))
+
+    def test_eg(self):
+        self._assert_reference(
+            EG_REFERENCE, lambda b, i: olps.eg(b, self._relatives(i)))
+
+    def test_ons(self):
+        state = olps.ONSState(PRICES.shape[1])
+        self._assert_reference(
+            ONS_REFERENCE,
+            lambda b, i: olps.ons(b, self._relatives(i), state))
+
+    def test_pamr_olpsr(self):
+        # compare with olpsR itself where it is installed
+        try:
+            import rpy2.robjects as robjects
+            from rpy2.robjects.packages import importr
+            olpsR = importr('olpsR')
+        except Exception:
+            self.skipTest('olpsR is not available')
+        b = np.full(PRICES.shape[1], 1.0 / PRICES.shape[1])
+        for i in range(1, len(PRICES)):
+            x = self._relatives(i)
+            expected = [
+                float(w) for w in olpsR.alg_PAMR(
+                    robjects.FloatVector(b), robjects.FloatVector(x))]
+            b = olps.pamr(b, x)
+            np.testing.assert_allclose(expected, b, atol=1e-8)
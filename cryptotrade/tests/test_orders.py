@@ -0,0 +1,172 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+
+import mock
+
+from cryptotrade._exchanges import sim
+from cryptotrade import clock
+from cryptotrade import orders
+
+
+class FakeExchange(object):
+
+    def __init__(self, snapshots=(), updates=None):
+        self.clock = clock.VirtualClock(1000)
+        self.snapshots = list(snapshots)
+        self.updates = updates
+        self.cancel_order = mock.Mock()
+
+    def get_orders(self):
+        return self.snapshots.pop(0) if self.snapshots else {}
+
+    def get_order_updates(self):
+        return self.updates.pop(0) if self.updates else self.updates
+
+
+def _order(number, amount):
+    return {'orderNumber': number, 'amount': '%.8f' % amount}
+
+
+class TestOrderTracker(unittest.TestCase):
+
+    def test_update(self):
+        tracker = orders.OrderTracker(FakeExchange())
+        tracker.add(1, 'BTC_ETH', '2.0')
+        tracker.add(2, 'BTC_ETH', '1.0')
+        tracker.add(3, 'BTC_XMR', '1.0')
+        events = tracker.update({
+            'BTC_ETH': [_order(1, 1.5), _order(2, 1.0)],
+            'BTC_XMR': [_order(3, 1.0)],
+        })
+        self.assertEqual(
+            [orders.OrderEvent(orders.PARTIAL, 1, 'BTC_ETH', 0.5)], events)
+        events = tracker.update({'BTC_ETH': [_order(1, 1.5)]})
+        self.assertEqual([
+            orders.OrderEvent(orders.FILLED, 2, 'BTC_ETH', 1.0),
+            orders.OrderEvent(orders.FILLED, 3, 'BTC_XMR', 1.0),
+        ], events)
+        self.assertEqual([], tracker.update({'BTC_ETH': [_order(1, 1.5)]}))
+        self.assertFalse(tracker.done)
+
+    def test_update_ignores_other_orders(self):
+        # e.g. placed by hand, or left after failed cancellation
+        tracker = orders.OrderTracker(FakeExchange())
+        tracker.add(1, 'BTC_ETH', '1.0')
+        events = tracker.update({
+            'BTC_ETH': [_order(1, 1.0)],
+            'BTC_LTC': [_order(4, 3.0)],
+        })
+        self.assertEqual([], events)
+        events = tracker.update({'BTC_LTC': [_order(4, 3.0)]})
+        self.assertEqual(
+            [orders.OrderEvent(orders.FILLED, 1, 'BTC_ETH', 1.0)], events)
+        self.assertTrue(tracker.done)
+
+    def test_consume(self):
+        tracker = orders.OrderTracker(FakeExchange())
+        tracker.add(1, 'BTC_ETH', '2.0')
+        tracker.add(2, 'BTC_ETH', '1.0')
+        events = tracker.consume([
+            {'orderNumber': 1, 'kind': orders.FILLED, 'amount': 0.5,
+             'remaining': 1.5},
+            {'orderNumber': 2, 'kind': orders.CANCELLED, 'amount': 0.0,
+             'remaining': 1.0},
+            {'orderNumber': 3, 'kind': orders.FILLED, 'amount': 0.5,
+             'remaining': 0.0},
+            {'orderNumber': 1, 'kind': orders.FILLED, 'amount': 1.5,
+             'remaining': 0.0},
+        ])
+        self.assertEqual([
+            orders.OrderEvent(orders.PARTIAL, 1, 'BTC_ETH', 0.5),
+            orders.OrderEvent(orders.CANCELLED, 2, 'BTC_ETH', 1.0),
+            orders.OrderEvent(orders.FILLED, 1, 'BTC_ETH', 1.5),
+        ], events)
+        self.assertTrue(tracker.done)
+
+    def test_poll_cadence(self):
+        ex = FakeExchange(snapshots=[{'BTC_ETH': [_order(1, 1.0)]}] * 5)
+        tracker = orders.OrderTracker(ex, max_interval=5)
+        tracker.add(1, 'BTC_ETH', '1.0')
+        intervals = []
+        for _ in range(5):
+            tracker.poll()
+            intervals.append(tracker.interval)
+        self.assertEqual([2, 4, 5, 5, 5], intervals)
+        # the order is gone
+        self.assertEqual(1, len(tracker.poll()))
+        self.assertEqual(tracker.MIN_INTERVAL, tracker.interval)
+
+    def test_poll_push(self):
+        ex = FakeExchange(updates=[[], [
+            {'orderNumber': 1, 'kind': orders.FILLED, 'amount': 1.0,
+             'remaining': 0.0}]])
+        ex.get_orders = mock.Mock()
+        tracker = orders.OrderTracker(ex)
+        tracker.add(1, 'BTC_ETH', '1.0')
+        self.assertEqual([], tracker.poll())
+        self.assertEqual(1, len(tracker.poll()))
+        self.assertFalse(ex.get_orders.called)
+
+    def test_wait(self):
+        ex = FakeExchange(snapshots=[{'BTC_ETH': [_order(1, 1.0)]}] * 3)
+        tracker = orders.OrderTracker(ex)
+        tracker.add(1, 'BTC_ETH', '1.0')
+        events = tracker.wait(2000)
+        self.assertEqual(
+            [orders.OrderEvent(orders.FILLED, 1, 'BTC_ETH', 1.0)], events)
+        # polled after 1, 2, 4 and 8 seconds
+        self.assertEqual(1015, ex.clock.time())
+
+    def test_wait_timeout(self):
+        ex = FakeExchange(snapshots=[{'BTC_ETH': [_order(1, 1.0)]}] * 100)
+        tracker = orders.OrderTracker(ex)
+        tracker.add(1, 'BTC_ETH', '1.0')
+        self.assertEqual([], tracker.wait(1100))
+        self.assertEqual(1100, ex.clock.time())
+
+    def test_wait_nothing_to_track(self):
+        ex = FakeExchange()
+        tracker = orders.OrderTracker(ex)
+        self.assertEqual([], tracker.wait(2000))
+        self.assertEqual(1001, ex.clock.time())
+
+
+class TestOrderTrackerSimulator(unittest.TestCase):
+
+    def _test_fill(self, push):
+        ex = sim.Simulator({'simulator': {
+            'start': 1500000100, 'latency': 0, 'push': push}})
+        rate = ex.get_rate('BTC', 'ETH') * 0.999
+        order = ex.buy('BTC', 'ETH', rate, '10')
+        tracker = orders.OrderTracker(ex)
+        tracker.add(order['orderNumber'], 'BTC_ETH', '10')
+        events = []
+        while not tracker.done:
+            events.extend(tracker.wait(ex.clock.time() + 3600))
+        self.assertEqual(orders.FILLED, events[-1].kind)
+        self.assertAlmostEqual(10, sum(event.amount for event in events))
+
+    def test_fill_polled(self):
+        self._test_fill(False)
+
+    def test_fill_pushed(self):
+        self._test_fill(True)
@@ -0,0 +1,77 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+
+from cryptotrade import portfolio
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def setUp(self):
+        super(TestPortfolio, self).setUp()
+        self.portfolio = portfolio.Portfolio.from_balances(
+            {'BTC': 1.0, 'ETH': 10.0}, ['LTC'])
+
+    def test_mapping(self):
+        self.assertEqual(['BTC', 'ETH', 'LTC'], list(self.portfolio))
+        self.assertEqual(3, len(self.portfolio))
+        self.assertEqual(
+            {'BTC': 1.0, 'ETH': 10.0, 'LTC': 0.0}, self.portfolio)
+        self.assertIsInstance(self.portfolio['ETH'], float)
+
+    def test_unknown_currency(self):
+        self.assertEqual(0.0, self.portfolio['XMR'])
+        # reading doesn't allocate a slot
+        self.assertNotIn('XMR', self.portfolio)
+
+        self.portfolio['XMR'] = 5.0
+        self.assertEqual(5.0, self.portfolio['XMR'])
+        self.assertEqual(4, len(self.portfolio.amounts))
+
+    def test_copy(self):
+        other = self.portfolio.copy()
+        other['ETH'] = 20.0
+        other['XMR'] = 1.0
+        self.assertEqual(10.0, self.portfolio['ETH'])
+        self.assertNotIn('XMR', self.portfolio)
+
+    def test_apply_op(self):
+        self.portfolio.apply_op('BTC', 'LTC', 2.0, 0.5)
+        self.portfolio.apply_op('BTC', 'ETH', -4.0, -0.4)
+        self.assertEqual(
+            {'BTC': 0.9, 'ETH': 6.0, 'LTC': 2.0}, self.portfolio)
+
+    def test_apply_ops(self):
+        self.portfolio.apply_ops(
+            'BTC', ['LTC', 'ETH', 'XMR'], [2.0, -4.0, 1.0], [0.5, -0.4, 0.1])
+        self.assertEqual(
+            {'BTC': 0.8, 'ETH': 6.0, 'LTC': 2.0, 'XMR': 1.0}, self.portfolio)
+
+    def test_worth(self):
+        rates = {
+            'BTC': [1.0, 1.0],
+            'ETH': [0.1, 0.2],
+            'LTC': [0.01, 0.02],
+        }
+        self.assertAlmostEqual(2.0, self.portfolio.worth(rates, 0))
+        self.assertAlmostEqual(3.0, self.portfolio.worth(rates, 1))
+        self.portfolio['LTC'] = 100.0
+        self.assertAlmostEqual(5.0, self.portfolio.worth(rates, 1))
@@ -0,0 +1,106 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import unittest
+
+import numpy as np
+
+from cryptotrade import rates
+
+
+class TestResample(unittest.TestCase):
+
+    def test_resample(self):
+        dates = [0, 300, 600, 900, 1200]
+        columns = {
+            'open': [1.0, 2.0, 3.0, 4.0, 5.0],
+            'high': [2.0, 9.0, 4.0, 5.0, 6.0],
+            'low': [0.5, 1.5, 0.1, 3.5, 4.5],
+            'close': [2.0, 3.0, 4.0, 5.0, 6.0],
+            'volume': [1.0, 2.0, 3.0, 4.0, 5.0],
+        }
+        dates, res = rates.resample(dates, columns, 900)
+        self.assertEqual([0, 900], list(dates))
+        self.assertEqual([1.0, 4.0], list(res['open']))
+        self.assertEqual([9.0, 6.0], list(res['high']))
+        self.assertEqual([0.1, 3.5], list(res['low']))
+        self.assertEqual([4.0, 6.0], list(res['close']))
+        self.assertEqual([6.0, 9.0], list(res['volume']))
+
+    def test_resample_gaps(self):
+        dates, res = rates.resample(
+            [300, 1800, 2100], {'close': [1.0, 2.0, 3.0]}, 900)
+        self.assertEqual([0, 1800], list(dates))
+        self.assertEqual([1.0, 3.0], list(res['close']))
+
+    def test_resample_empty(self):
+        dates, res = rates.resample([], {'close': []}, 900)
+        self.assertEqual([], list(dates))
+        self.assertEqual([], list(res['close']))
+
+    def test_resample_unknown_field(self):
+        self.assertRaises(
+            ValueError, rates.resample, [0], {'weightedAverage': [1.0]}, 900)
+
+
+class TestRatesMatrix(unittest.TestCase):
+
+    def setUp(self):
+        super(TestRatesMatrix, self).setUp()
+        self.rates = {
+            'ETH': [0.5, 1.0, 0.5],
+            'LTC': [0.5, 0.25, 1.0],
+            'BTC': [1.0, 1.0, 1.0],
+        }
+
+    def test_from_rates(self):
+        matrix = rates.RatesMatrix.from_rates(self.rates)
+        self.assertEqual(['BTC', 'ETH', 'LTC'], sorted(matrix))
+        self.assertEqual(3, len(matrix))
+        for currency, values in self.rates.items():
+            self.assertEqual(values, list(matrix[currency]))
+        self.assertRaises(KeyError, matrix.__getitem__, 'XMR')
+
+    def test_publish_attach(self):
+        shared = rates.RatesMatrix.from_rates(self.rates).publish()
+        self.addCleanup(rates.unpublish, shared)
+
+        matrix = rates.RatesMatrix.attach(shared)
+        self.assertIsInstance(matrix.matrix, np.memmap)
+        for currency, values in self.rates.items():
+            self.assertEqual(values, list(matrix[currency]))
+        # rows are views into the mapped file, not copies
+        self.assertIs(matrix.matrix, matrix['ETH'].base)
+        self.assertFalse(matrix['ETH'].flags.writeable)
+
+    def test_attach_empty(self):
+        shared = rates.RatesMatrix.from_rates({'BTC': []}).publish()
+        self.addCleanup(rates.unpublish, shared)
+
+        matrix = rates.RatesMatrix.attach(shared)
+        self.assertEqual([], list(matrix['BTC']))
+
+    def test_unpublish(self):
+        shared = rates.RatesMatrix.from_rates(self.rates).publish()
+        rates.unpublish(shared)
+        self.assertFalse(os.path.exists(shared.filename))
+        # second call is harmless
+        rates.unpublish(shared)
@@ -0,0 +1,153 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import os
+import tempfile
+import unittest
+
+import mock
+
+from cryptotrade._exchanges import sim
+from cryptotrade import clock
+from cryptotrade import exchange
+from cryptotrade import recording
+from cryptotrade import scheduler
+
+
+class FakeExchange(object):
+
+    def __init__(self):
+        self.clock = clock.VirtualClock(1000)
+        self.scheduler = scheduler.RequestScheduler(None)
+
+
+def returnTicker():
+    return {'BTC_ETH': {'highestBid': 0.1}}
+
+
+def returnChartData(pair, period, start, end):
+    return [{'date': start, 'close': 0.1}]
+
+
+def cancelOrder(number):
+    raise exchange.CommandError('Invalid order number')
+
+
+class TestRecording(unittest.TestCase):
+
+    def setUp(self):
+        super(TestRecording, self).setUp()
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.filename)
+        self.ex = FakeExchange()
+        recorder = recording.Recorder(self.filename)
+        recorder.call(self.ex, scheduler.MARKET, returnTicker)
+        self.ex.clock.sleep(10)
+        for pair in ('BTC_ETH', 'BTC_XMR'):
+            recorder.call(self.ex, scheduler.MARKET, returnChartData,
+                          pair, 300, start=1000.5, end=1300.5)
+        self.ex.clock.sleep(10)
+        self.assertRaises(
+            exchange.CommandError,
+            recorder.call, self.ex, scheduler.ORDER, cancelOrder, 10)
+
+    def test_record(self):
+        with open(self.filename) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(
+            ['returnTicker', 'returnChartData', 'returnChartData',
+             'cancelOrder'],
+            [entry['m'] for entry in entries])
+        self.assertEqual(returnTicker(), entries[0]['r'])
+        self.assertEqual(['BTC_XMR', 300], entries[2]['a'])
+        self.assertEqual({'start': 1000.5, 'end': 1300.5}, entries[2]['k'])
+        self.assertEqual('Invalid order number', entries[3]['e'])
+        self.assertEqual(1020, entries[3]['t'])
+
+    def test_replay(self):
+        player = recording.Player(self.filename)
+        self.assertEqual(1000, player.clock.time())
+        # concurrent requests may come in different order
+        self.assertEqual(
+            [{'date': 1000.5, 'close': 0.1}],
+            player.call(self.ex, scheduler.MARKET, returnChartData,
+                        'BTC_XMR', 300, start=1000.5, end=1300.5))
+        self.assertEqual(1010, player.clock.time())
+        self.assertEqual(
+            returnTicker(),
+            player.call(self.ex, scheduler.MARKET, returnTicker))
+        self.assertEqual(1010, player.clock.time())
+        self.assertRaises(
+            exchange.CommandError,
+            player.call, self.ex, scheduler.ORDER, cancelOrder, 10)
+        self.assertEqual(1020, player.clock.time())
+        self.assertEqual(1, player.unserved)
+
+    def test_replay_different_numbers(self):
+        player = recording.Player(self.filename)
+        res = player.call(self.ex, scheduler.MARKET, returnChartData,
+                          'BTC_ETH', 300, start=2000, end=2300)
+        self.assertEqual([{'date': 1000.5, 'close': 0.1}], res)
+        self.assertRaises(
+            recording.MissingRecord,
+            player.call, self.ex, scheduler.MARKET, returnChartData,
+            'BTC_LTC', 300, start=1000.5, end=1300.5)
+
+    def test_replay_served_once(self):
+        player = recording.Player(self.filename)
+        player.call(self.ex, scheduler.MARKET, returnTicker)
+        self.assertRaises(
+            recording.MissingRecord,
+            player.call, self.ex, scheduler.MARKET, returnTicker)
+
+    def test_replay_speed(self):
+        player = recording.Player(self.filename, speed=100)
+        with mock.patch('time.sleep') as sleep:
+            self.assertRaises(
+                exchange.CommandError,
+                player.call, self.ex, scheduler.ORDER, cancelOrder, 10)
+        self.assertAlmostEqual(0.2, sleep.call_args[0][0], places=2)
+
+
+class TestExchange(unittest.TestCase):
+
+    def setUp(self):
+        super(TestExchange, self).setUp()
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.filename)
+
+    def _session(self, **options):
+        options.update(start=1500000100, latency=0.5)
+        ex = sim.Simulator({'simulator': options})
+        rate = ex.get_rate('BTC', 'ETH')
+        order = ex.buy('BTC', 'ETH', rate * 0.999, '10')
+        ex.clock.sleep(600)
+        return ex, (ex.get_orders(), ex.get_balances(), rate, order)
+
+    def test_roundtrip(self):
+        ex, recorded = self._session(record=self.filename)
+        self.assertIsInstance(ex.tape, recording.Recorder)
+        ex, replayed = self._session(replay=self.filename)
+        self.assertIsInstance(ex.tape, recording.Player)
+        self.assertEqual(recorded, replayed)
+        self.assertEqual(0, ex.tape.unserved)
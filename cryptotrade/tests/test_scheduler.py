@@ -0,0 +1,79 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import threading
+import time
+import unittest
+
+import mock
+
+from cryptotrade import scheduler
+
+
+class TestTokenBucket(unittest.TestCase):
+    @mock.patch('time.time', return_value=1000)
+    def test_consume(self, time_mock):
+        bucket = scheduler.TokenBucket(2)
+        self.assertEqual(0, bucket.consume())
+        self.assertEqual(0, bucket.consume())
+        self.assertEqual(0.5, bucket.consume())
+        time_mock.return_value = 1000.5
+        self.assertEqual(0, bucket.consume())
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_unlimited(self):
+        sched = scheduler.RequestScheduler(None)
+        self.assertEqual(3, sched.call(scheduler.MARKET, lambda x: x, 3))
+        self.assertEqual(1, sched.stats()['market']['requests'])
+
+    def test_throttles(self):
+        sched = scheduler.RequestScheduler(20, capacity=1)
+        start = time.time()
+        for _ in range(3):
+            sched.call(scheduler.MARKET, lambda: None)
+        self.assertGreaterEqual(time.time() - start, 0.09)
+        stats = sched.stats()
+        self.assertEqual(3, stats['market']['requests'])
+        self.assertGreater(stats['market']['wait_max'], 0)
+
+    def test_priority(self):
+        sched = scheduler.RequestScheduler(10, capacity=1)
+        sched.call(scheduler.MARKET, lambda: None)  # drain the bucket
+
+        calls = []
+        threads = [
+            threading.Thread(
+                target=sched.call, args=(lane, calls.append, lane))
+            for lane in (scheduler.MARKET, scheduler.ACCOUNT,
+                         scheduler.ORDER)
+        ]
+        # make sure all requests are queued before the token is available
+        with sched._cond:
+            for t in threads:
+                t.start()
+            while sched.queue_depth < 3:
+                sched._cond.wait(0.01)
+        for t in threads:
+            t.join()
+
+        self.assertEqual(
+            [scheduler.ORDER, scheduler.ACCOUNT, scheduler.MARKET], calls)
+        self.assertEqual(3, sched.stats()['max_queue_depth'])
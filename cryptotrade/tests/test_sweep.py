@@ -0,0 +1,84 @@
+# Copyright 2017 Ihar Hrachyshka <ihar.hrachyshka@gmail.com>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import collections
+import unittest
+
+from cryptotrade import backtest
+from cryptotrade import rates
+from cryptotrade import sweep
+from cryptotrade import trader
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        super(TestSweep, self).setUp()
+        balances = collections.defaultdict(float)
+        balances.update({'BTC': 1000.0, 'ETH': 0.0, 'LTC': 0.0})
+        self.rates = {
+            'ETH': [0.5,  1.0, 0.5],
+            'LTC': [0.5, 0.25, 1.0],
+            'BTC': [1.0,  1.0, 1.0],
+        }
+        shared = rates.RatesMatrix.from_rates(self.rates).publish()
+        self.addCleanup(rates.unpublish, shared)
+        self.context = sweep.Context(
+            engine='loop', targets=['ETH', 'BTC', 'LTC'], gold='BTC',
+            fee=0.0, balances=balances, rates={300: shared})
+
+    def test_get_jobs(self):
+        jobs = sweep.get_jobs(
+            ['crp', 'hodl'], [(0.5, 0.25, 0.25), None], [300, 900], [None])
+        self.assertEqual(8, len(jobs))
+        self.assertEqual(len(jobs), len(set(jobs)))
+        self.assertIn(sweep.Job('hodl', None, 900, None), jobs)
+
+    def test_run(self):
+        jobs = sweep.get_jobs(
+            ['crp', 'hodl'], [(0.5, 0.25, 0.25)], [300], [1.0])
+        res = {
+            job.strategy: (balances, error)
+            for job, balances, error in sweep.run(
+                jobs, self.context, processes=2)
+        }
+        self.assertEqual(
+            ({'BTC': 515.625, 'ETH': 2062.5, 'LTC': 515.625}, None),
+            res['crp'])
+        self.assertEqual(
+            ({'BTC': 1000.0, 'ETH': 0.0, 'LTC': 0.0}, None), res['hodl'])
+
+    def test_run_matches_engine(self):
+        job = sweep.Job('crp', (0.5, 0.25, 0.25), 300, 1.02)
+        [(_, res, error)] = sweep.run([job], self.context, processes=1)
+
+        strategy = trader.CRPStrategy(adjust_gold=1.02)
+        _, expected = backtest.LoopEngine().trade(
+            strategy, self.context.targets, job.weights, 'BTC', 0.0,
+            self.context.balances, self.rates)
+        self.assertIsNone(error)
+        self.assertEqual(dict(expected), res)
+
+    def test_run_reports_failed_job(self):
+        jobs = [sweep.Job('crp', (0.5, 0.25, 0.5), 300, None)]
+        [(job, balances, error)] = sweep.run(
+            jobs, self.context, processes=1)
+        self.assertIsNone(balances)
+        self.assertIn("weights don't add up to 1", error)
@@ -18,6 +18,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import collections
+import json
 import random
 import unittest
 
@@ -74,6 +76,187 @@ class TestBalanceTrader(unittest.TestCase):
             {'BTC': 515.625, 'ETH': 2062.5, 'LTC': 515.625}, new_balances)
 
 
+class TestOpsLog(unittest.TestCase):
+
+    def setUp(self):
+        super(TestOpsLog, self).setUp()
+        self.args = (
+            ['ETH', 'BTC', 'LTC'], [0.5, 0.25, 0.25], 'BTC', 0.0,
+            {'BTC': 1000.0, 'ETH': 0.0, 'LTC': 0.0},
+            {
+                'ETH': [0.5,  1.0, 0.5],
+                'LTC': [0.5, 0.25, 1.0],
+                'BTC': [1.0,  1.0, 1.0],
+            })
+
+    @staticmethod
+    def _flatten(ops):
+        return [
+            (i, o.op, o.alt, o.gold_amount, o.alt_amount, o.rate)
+            for i, ops_ in ops
+            for o in ops_
+        ]
+
+    def test_trade_op_slotted(self):
+        op = trader.TradeOp(op=trader.BUY_OP, alt='ETH')
+        self.assertFalse(hasattr(op, '__dict__'))
+
+    def test_array(self):
+        strategy = trader.CRPStrategy(adjust_gold=1.0)
+        expected_ops, expected = strategy.trade(*self.args)
+        ops, res = strategy.trade(*self.args, ops_log=trader.OPS_ARRAY)
+
+        self.assertIsInstance(ops, trader.OpLog)
+        self.assertEqual(expected, res)
+        self.assertEqual(6, len(ops))
+        self.assertEqual([0, 0, 1, 1, 2, 2], list(ops.records['i']))
+        self.assertEqual(self._flatten(expected_ops), self._flatten(ops))
+
+    def test_array_grows(self):
+        log = trader.OpLog(['BTC', 'ETH'], capacity=1)
+        ops = [
+            trader.TradeOp(op=trader.BUY_OP, gold_amount=1.0,
+                           alt_amount=2.0, alt='ETH', rate=0.5)
+        ] * 3
+        log.append(0, ops, [1, 1, 1])
+        log.append(1, ops[:1], [1])
+        self.assertEqual(4, len(log))
+        self.assertEqual(
+            [(0, 3), (1, 1)], [(i, len(ops_)) for i, ops_ in log])
+
+    def test_none(self):
+        strategy = trader.CRPStrategy(adjust_gold=1.0)
+        _, expected = strategy.trade(*self.args)
+        ops, res = strategy.trade(*self.args, ops_log=trader.OPS_NONE)
+        self.assertIsNone(ops)
+        self.assertEqual(expected, res)
+
+
+class TestStrategyStream(unittest.TestCase):
+
+    def setUp(self):
+        super(TestStrategyStream, self).setUp()
+        self.balances = collections.defaultdict(float)
+        self.balances.update({'BTC': 5, 'ETH': 10, 'XMR': 20})
+        self.targets = ['BTC', 'ETH', 'XMR']
+        self.rates = {
+            currency: [random.uniform(0.09, 0.11) for i in range(30)]
+            for currency in ('ETH', 'XMR')
+        }
+        self.rates['BTC'] = [1.0] * 30
+
+    def _assert_matches_trade(self, strategy_factory, weights=None):
+        _, expected = strategy_factory().trade(
+            self.targets, weights, 'BTC', 0.0, self.balances, self.rates)
+
+        stream = strategy_factory().stream(
+            self.targets, weights, 'BTC', 0.0, self.balances)
+        for i in range(30):
+            _, res = stream.feed({
+                currency: rates[i] for currency, rates in self.rates.items()
+            })
+        self.assertEqual(30, stream.steps)
+        for currency in set(expected) | set(res):
+            self.assertAlmostEqual(expected[currency], res[currency])
+
+    def test_crp(self):
+        self._assert_matches_trade(trader.CRPStrategy, [0.5, 0.25, 0.25])
+
+    def test_pamr(self):
+        self._assert_matches_trade(trader.PAMRStrategy)
+
+    def test_olmar(self):
+        self._assert_matches_trade(trader.OLMARStrategy)
+
+    def test_keeps_bounded_history(self):
+        strategy = trader.OLMARStrategy(window=5)
+        stream = strategy.stream(
+            self.targets, None, 'BTC', 0.0, self.balances)
+        for i in range(30):
+            stream.feed({'ETH': self.rates['ETH'][i], 'XMR': 0.1})
+        self.assertEqual(self.rates['ETH'][25:], stream.rates['ETH'])
+        self.assertEqual([1] * 5, stream.rates['BTC'])
+
+    def test_new_currency(self):
+        stream = trader.CRPStrategy().stream(
+            self.targets, None, 'BTC', 0.0, self.balances)
+        stream.feed({'ETH': 0.1, 'XMR': 0.1})
+        balances = dict(self.balances, LTC=1.0)
+        stream.feed({'ETH': 0.1, 'XMR': 0.1, 'LTC': 0.5}, balances=balances)
+        self.assertEqual([0.5, 0.5], stream.rates['LTC'])
+
+    def _assert_sold_out(self, strategy):
+        # LTC is held but not among targets, and gets sold out at step 3
+        balances = {'BTC': 1.0, 'LTC': 1.0}
+        stream = strategy.stream(['ETH', 'XMR'], None, 'BTC', 0.0, balances)
+        for i in range(10):
+            rates = {
+                currency: rates[i] for currency, rates in self.rates.items()
+            }
+            if 'LTC' in balances:
+                rates['LTC'] = 0.1
+            _, res = stream.feed(rates, balances=balances)
+            # exchanges don't report currencies not held
+            balances = {
+                currency: res[currency] for currency in res
+                if res[currency] > 0 and (currency != 'LTC' or i < 3)
+            }
+        self.assertEqual(['BTC', 'ETH', 'XMR'], sorted(stream.targets))
+        self.assertEqual(['BTC', 'ETH', 'XMR'], sorted(stream.rates))
+        ops, _ = stream.rebalance(balances)
+        self.assertNotIn('LTC', [o.alt for o in ops])
+        return stream
+
+    def test_sold_out_pamr(self):
+        self._assert_sold_out(trader.PAMRStrategy())
+
+    def test_sold_out_ons(self):
+        stream = self._assert_sold_out(trader.ONSStrategy())
+        # internal state is sized by the new set of currencies
+        self.assertEqual((3, 3), stream.strategy.state.A.shape)
+
+    def test_external_balances(self):
+        stream = trader.CRPStrategy(adjust_gold=1.0).stream(
+            ['BTC', 'ETH'], [0.5, 0.5], 'BTC', 0.0, {'BTC': 1.0})
+        stream.feed({'ETH': 0.5})
+        ops, res = stream.feed({'ETH': 0.5}, balances={'BTC': 2.0})
+        self.assertEqual([(trader.BUY_OP, 'ETH', 1.0)],
+                         [(o.op, o.alt, o.gold_amount) for o in ops])
+        self.assertEqual({'BTC': 1.0, 'ETH': 2.0}, res)
+
+    def test_state(self):
+        def feed(stream, i):
+            return stream.feed({
+                currency: rates[i] for currency, rates in self.rates.items()
+            })
+
+        stream = trader.ONSStrategy().stream(
+            self.targets, None, 'BTC', 0.0, self.balances)
+        for i in range(20):
+            feed(stream, i)
+        state = json.loads(json.dumps(stream.get_state()))
+
+        restored = trader.ONSStrategy().stream(
+            self.targets, None, 'BTC', 0.0, stream.balances)
+        restored.set_state(state)
+        self.assertEqual(20, restored.steps)
+        for i in range(20, 30):
+            _, expected = feed(stream, i)
+            _, res = feed(restored, i)
+        for currency in set(expected) | set(res):
+            self.assertAlmostEqual(expected[currency], res[currency])
+
+    def test_rebalance(self):
+        stream = trader.CRPStrategy(adjust_gold=1.0).stream(
+            ['BTC', 'ETH'], [0.5, 0.5], 'BTC', 0.0, {'BTC': 1.0})
+        stream.feed({'ETH': 0.5})
+        ops, res = stream.rebalance({'BTC': 0.75, 'ETH': 0.5})
+        self.assertEqual([(trader.BUY_OP, 'ETH', 0.25)],
+                         [(o.op, o.alt, o.gold_amount) for o in ops])
+        self.assertEqual({'BTC': 0.5, 'ETH': 1.0}, res)
+        self.assertEqual(1, stream.steps)
+
+
 class TestStrategy(unittest.TestCase):
 
     class FakeStrategy(trader.Strategy):
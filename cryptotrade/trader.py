@@ -19,22 +19,34 @@
 # SOFTWARE.
 
 import abc
+import itertools
 
-from rpy2.robjects.packages import importr
-import rpy2.robjects as robjects
+import numpy as np
 import six
 from stevedore.driver import DriverManager
 from stevedore.extension import ExtensionManager
 
+from cryptotrade import olps
+from cryptotrade import portfolio
+
 
 STRATEGY_NAMESPACE = 'ct.strategies'
 
 SELL_OP = 'sell'
 BUY_OP = 'buy'
 
+# what Strategy.trade should return as ops: list of (i, [TradeOp, ...]),
+# OpLog, or nothing at all
+OPS_LIST = 'list'
+OPS_ARRAY = 'array'
+OPS_NONE = None
+
 
 class TradeOp(object):
 
+    __slots__ = ('op', 'gold_amount', 'alt_amount', 'alt', 'rate',
+                 'scheduled')
+
     def __init__(self, op=None, gold_amount=None, alt_amount=None,
                  alt=None, rate=None, scheduled=False):
         self.op = op
@@ -45,8 +57,75 @@ class TradeOp(object):
         self.scheduled = scheduled
 
 
+class OpLog(object):
+    '''Trade ops of all iterations kept in a single structured array.
+
+    Currencies are stored as slots of the portfolio being traded. Iterating
+    over the log yields (i, [TradeOp, ...]) like the list of ops does.
+    '''
+
+    DTYPE = np.dtype([
+        ('i', np.int64),
+        ('op', np.int8),
+        ('slot', np.int32),
+        ('gold_amount', np.float64),
+        ('alt_amount', np.float64),
+        ('rate', np.float64),
+    ])
+    OPS = (SELL_OP, BUY_OP)
+
+    def __init__(self, currencies, capacity=1024):
+        # list is shared with portfolio, so that new slots show up here
+        self.currencies = currencies
+        self._data = np.zeros(capacity, dtype=self.DTYPE)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def records(self):
+        return self._data[:self._size]
+
+    def append(self, i, ops, slots):
+        end = self._size + len(ops)
+        if end > len(self._data):
+            data = np.zeros(max(end, 2 * len(self._data)), dtype=self.DTYPE)
+            data[:self._size] = self.records
+            self._data = data
+        new = self._data[self._size:end]
+        new['i'] = i
+        new['op'] = [self.OPS.index(op.op) for op in ops]
+        new['slot'] = slots
+        new['gold_amount'] = [op.gold_amount for op in ops]
+        new['alt_amount'] = [op.alt_amount for op in ops]
+        new['rate'] = [op.rate for op in ops]
+        self._size = end
+
+    def _to_op(self, record):
+        return TradeOp(
+            op=self.OPS[record['op']],
+            gold_amount=float(record['gold_amount']),
+            alt_amount=float(record['alt_amount']),
+            alt=self.currencies[record['slot']],
+            rate=float(record['rate']),
+            scheduled=False)
+
+    def __iter__(self):
+        for i, records in itertools.groupby(
+                self.records, key=lambda record: record['i']):
+            yield int(i), [self._to_op(record) for record in records]
+
+
+_STRATEGY_NAMES = None
+
+
 def list_strategy_names():
-    return ExtensionManager(STRATEGY_NAMESPACE).entry_points_names()
+    global _STRATEGY_NAMES
+    if _STRATEGY_NAMES is None:
+        _STRATEGY_NAMES = ExtensionManager(
+            STRATEGY_NAMESPACE).entry_points_names()
+    return _STRATEGY_NAMES
 
 
 def get_strategy(name):
@@ -56,30 +135,65 @@ def get_strategy(name):
 @six.add_metaclass(abc.ABCMeta)
 class Strategy(object):
 
+    # number of most recent rates (including the current one) that
+    # strategy looks at, kept by StrategyStream; with at least two, index 0
+    # means first step only
+    history = 2
+
     def __init__(self, adjust_gold=1.02):
         self.adjust_gold = adjust_gold
 
+    def get_state(self):
+        # json serializable internal state to restore with set_state()
+        return {}
+
+    def set_state(self, state):
+        pass
+
     @abc.abstractmethod
     def get_targets(self, targets, weights, gold, balances, rates, i):
         pass
 
+    def get_weights_vector(self, index, targets, weights, gold, worth, rates,
+                           i):
+        # vectorized counterpart of get_targets() used by numpy backtest
+        # engine; index maps currency names to columns of the rates matrix
+        # and of the worth vector; return target weights per column (nan
+        # for currencies that should not be traded) or None to skip trading
+        raise NotImplementedError(
+            '%s does not support vectorized trading' %
+            self.__class__.__name__)
+
+    @staticmethod
+    def _to_weights_vector(index, targets, weights):
+        res = np.full(len(index), np.nan)
+        for currency, weight in zip(targets, weights):
+            res[index[currency]] = weight
+        return res
+
     @staticmethod
     def get_gold_total(balances, rates, i):
+        if isinstance(balances, portfolio.Portfolio):
+            return balances.worth(rates, i)
         return sum(
             balances[currency] * rates[currency][i]
             for currency in balances)
 
     def get_ops(self, targets, weights, gold, fee, balances, rates, i):
         ops = []
-        balances = balances.copy()
 
         gold_total = self.get_gold_total(balances, rates, i)
-        for currency, target in zip(targets, weights):
+        if isinstance(balances, portfolio.Portfolio):
+            slots = balances.slots(targets)
+            amounts = balances.amounts[slots].tolist()
+        else:
+            amounts = [balances[currency] for currency in targets]
+        for currency, target, amount in zip(targets, weights, amounts):
             if currency == gold:
                 continue
 
             rate = rates[currency][i]
-            gold_worth = balances[currency] * rate
+            gold_worth = amount * rate
             gold_target = gold_total * target
             gold_diff = abs(gold_target - gold_worth)
             alt_diff = gold_diff / rate
@@ -101,7 +215,8 @@ class Strategy(object):
                         scheduled=False))
             elif gold_worth > gold_target:
                 gold_bought = gold_diff
-                alt_sold = alt_diff
+                # sell whole balance without rounding errors if asked to
+                alt_sold = alt_diff if gold_target else amount
                 ops.append(
                     TradeOp(
                         op=SELL_OP,
@@ -112,46 +227,159 @@ class Strategy(object):
                         scheduled=False))
         return ops
 
+    @staticmethod
+    def _apply_ops(gold, balances, ops):
+        # modifies portfolio in place
+        signs = [-1.0 if op.op == SELL_OP else 1.0 for op in ops]
+        balances.apply_ops(
+            gold,
+            [op.alt for op in ops],
+            [sign * op.alt_amount for sign, op in zip(signs, ops)],
+            [sign * op.gold_amount for sign, op in zip(signs, ops)])
+
     def apply_ops(self, gold, balances, ops):
-        balances = balances.copy()
-        for op in ops:
-            if op.op == SELL_OP:
-                balances[op.alt] -= op.alt_amount
-                balances[gold] += op.gold_amount
-            else:
-                balances[op.alt] += op.alt_amount
-                balances[gold] -= op.gold_amount
+        balances = portfolio.Portfolio.from_balances(balances)
+        self._apply_ops(gold, balances, ops)
         return balances
 
     # todo: consider making trade() receive exchange object to extract fees
     # and balances (if not passed) and maybe rates
-    def trade(self, targets, weights, gold, fee, balances, rates):
-        ops = []
-        balances = balances.copy()
+    def trade(self, targets, weights, gold, fee, balances, rates,
+              ops_log=OPS_LIST):
+        balances = portfolio.Portfolio.from_balances(
+            balances, list(targets or []) + [gold])
+        if ops_log == OPS_LIST:
+            ops = []
+        elif ops_log == OPS_ARRAY:
+            ops = OpLog(balances.currencies)
+        else:
+            ops = None
         for i in range(len(rates[gold])):
-            # calculate new targets
-            targets, weights = self.get_targets(
-                targets, weights, gold, balances, rates, i)
-            # todo: revisit the rounding workaround
-            assert \
-                round(sum(weights), 5) == round(1.0, 5), \
-                "new targets don't add up to 1.0"
-
-            # produce buy/sell operations based on current balance and targets
-            ops_ = self.get_ops(
+            targets, weights, ops_ = self.trade_step(
                 targets, weights, gold, fee, balances, rates, i)
+            if ops_log == OPS_LIST:
+                ops.append((i, ops_))
+            elif ops_log == OPS_ARRAY:
+                ops.append(i, ops_, balances.slots([o.alt for o in ops_]))
+        return ops, balances
 
-            # make sure we buy all the needed gold first before trading it for
-            # other coins, otherwise we risk getting into negative territory
-            ops_ = sorted(ops_, key=lambda o: o.op != SELL_OP)
-            ops.append((i, ops_))
+    def trade_step(self, targets, weights, gold, fee, balances, rates, i):
+        # single trading iteration, balances portfolio is updated in place
+        targets, weights = self.get_targets(
+            targets, weights, gold, balances, rates, i)
+        # todo: revisit the rounding workaround
+        assert \
+            round(sum(weights), 5) == round(1.0, 5), \
+            "new targets don't add up to 1.0"
 
-            # adjust balances for next iteration
-            balances = self.apply_ops(gold, balances, ops_)
-            assert \
-                all([v >= 0.0 for v in balances.values()]), \
-                "negative balance! %s" % balances
-        return ops, balances
+        ops = self.rebalance(targets, weights, gold, fee, balances, rates, i)
+        return targets, weights, ops
+
+    def rebalance(self, targets, weights, gold, fee, balances, rates, i):
+        # produce buy/sell operations based on current balance and targets
+        ops = self.get_ops(targets, weights, gold, fee, balances, rates, i)
+
+        # make sure we buy all the needed gold first before trading it for
+        # other coins, otherwise we risk getting into negative territory
+        ops = sorted(ops, key=lambda o: o.op != SELL_OP)
+
+        # adjust balances for next iteration
+        self._apply_ops(gold, balances, ops)
+        assert \
+            balances.amounts.min() >= 0.0, \
+            "negative balance! %s" % balances
+        return ops
+
+    def stream(self, targets, weights, gold, fee, balances):
+        return StrategyStream(self, targets, weights, gold, fee, balances)
+
+
+class StrategyStream(object):
+    '''Trading with a strategy one candle at a time.
+
+    Keeps balances, targets and the last strategy.history rates between
+    steps, so that each step costs the same no matter how many candles
+    were fed before. Balances and rates cover requested targets and
+    currencies actually held; strategy decides on those each step, so
+    that currencies sold out are dropped.
+    '''
+
+    def __init__(self, strategy, targets, weights, gold, fee, balances):
+        self.strategy = strategy
+        # as requested by user
+        self.requested = targets
+        self.requested_weights = weights
+        # as worked out by strategy on the last step, e.g. all currencies
+        # for OLPS strategies
+        self.targets = targets
+        self.weights = weights
+        self.gold = gold
+        self.fee = fee
+        self.rates = {}
+        self.steps = 0
+        self._set_balances(balances)
+
+    def _set_balances(self, balances, currencies=()):
+        self.balances = portfolio.Portfolio.from_balances(
+            balances,
+            list(self.requested or []) + [self.gold] + list(currencies))
+
+    def _push(self, rates):
+        history = self.strategy.history
+        length = len(self.rates.get(self.gold, ()))
+        res = {self.gold: [1] * min(length + 1, history)}
+        for currency, rate in rates.items():
+            if currency not in self.balances:
+                # neither requested nor held anymore
+                continue
+            past = self.rates.get(currency)
+            if past is None:
+                # assume flat history for currencies that show up late
+                past = [rate] * length
+            res[currency] = (past + [rate])[-history:]
+        # new dict for each step, since rates may be cached by identity
+        self.rates = res
+
+    def feed(self, rates, balances=None):
+        # rates map currencies to their rate at new candle; if balances are
+        # passed, they replace balances expected after previous steps
+        if balances is not None:
+            self._set_balances(balances)
+        self._push(rates)
+        self.targets, self.weights, ops = self.strategy.trade_step(
+            self.requested, self.requested_weights, self.gold, self.fee,
+            self.balances, self.rates, len(self.rates[self.gold]) - 1)
+        self.steps += 1
+        return ops, self.balances
+
+    def get_state(self):
+        # everything but balances, that are expected to be passed on feed
+        return {
+            'strategy': self.strategy.get_state(),
+            'targets': list(self.targets or []),
+            'weights': [float(w) for w in self.weights or []],
+            'rates': {
+                currency: [float(rate) for rate in rates]
+                for currency, rates in self.rates.items()
+            },
+            'steps': self.steps,
+        }
+
+    def set_state(self, state):
+        self.strategy.set_state(state['strategy'])
+        self.targets = state['targets'] or None
+        self.weights = state['weights'] or None
+        self.rates = state['rates']
+        self.steps = state['steps']
+
+    def rebalance(self, balances):
+        # recalculate ops of the last step for new balances, without
+        # advancing strategy; currencies it decided on have rates already
+        self._set_balances(balances, self.targets or [])
+        ops = self.strategy.rebalance(
+            self.targets, self.weights, self.gold, self.fee, self.balances,
+            self.rates, len(self.rates[self.gold]) - 1)
+        return ops, self.balances
 
 
 class CRPStrategy(Strategy):
@@ -168,6 +396,16 @@ class CRPStrategy(Strategy):
             weights = [1.0/len(targets)] * len(targets)
         return targets, weights
 
+    def get_weights_vector(self, index, targets, weights, gold, worth, rates,
+                           i):
+        # weights are constant, so calculate them once per trade
+        if i == 0:
+            targets, weights = self.get_targets(
+                targets, weights, gold, None, None, i)
+            self._weights_vector = self._to_weights_vector(
+                index, targets, weights)
+        return self._weights_vector
+
 
 class NoopStrategy(Strategy):
     def get_targets(self, targets, weights, gold, balances, rates, i):
@@ -176,16 +414,141 @@ class NoopStrategy(Strategy):
     def get_ops(self, targets, weights, gold, fee, balances, rates, i):
         return []
 
+    def get_weights_vector(self, index, targets, weights, gold, worth, rates,
+                           i):
+        return None
+
+
+@six.add_metaclass(abc.ABCMeta)
+class OLPSStrategy(Strategy):
+
+    # weights ignored since we calculate our own weights on each iteration
+
+    # number of price points (including the current one) needed by update()
+    window = 2
+
+    # currencies of the last step, in order of update() vectors
+    currencies = None
+
+    @property
+    def history(self):
+        return max(self.window, 2)
+
+    def reset(self, n):
+        pass
+
+    @abc.abstractmethod
+    def update(self, b, prices):
+        # prices is a (window x currency) matrix of past rates
+        pass
+
+    def get_targets(self, targets, weights, gold, balances, rates, i):
+        gold_total = self.get_gold_total(balances, rates, i)
+        currencies = sorted(set(balances.keys()) | set(targets or []))
+
+        bi = np.array([
+            balances[cur] * rates[cur][i] / gold_total
+            for cur in currencies
+        ])
+
+        if i == 0:
+            self.reset(len(currencies))
+            self.currencies = currencies
+            return currencies, list(bi)
+        if currencies != self.currencies:
+            # some currency was sold out or showed up, internal state sized
+            # by currencies is of no use anymore
+            self.reset(len(currencies))
+            self.currencies = currencies
+
+        start = max(0, i - self.window + 1)
+        prices = np.array([
+            rates[cur][start:i + 1]
+            for cur in currencies
+        ]).T
+        weights = self.update(bi, prices)
+
+        assert \
+            all([w >= 0.0 for w in weights]), \
+            "negative weights! %s" % weights
+
+        return currencies, list(weights)
+
+    def get_weights_vector(self, index, targets, weights, gold, worth, rates,
+                           i):
+        if i == 0:
+            self.reset(len(index))
+            return None
+        start = max(0, i - self.window + 1)
+        return self.update(worth / worth.sum(), rates[start:i + 1])
+
 
-class PAMRStrategy(Strategy):
+class PAMRStrategy(OLPSStrategy):
+
+    def __init__(self, adjust_gold=1.02, eps=0.5):
+        super(PAMRStrategy, self).__init__(adjust_gold=adjust_gold)
+        self.eps = eps
+
+    def update(self, b, prices):
+        return olps.pamr(b, prices[-1] / prices[-2], eps=self.eps)
+
+
+class OLMARStrategy(OLPSStrategy):
+
+    def __init__(self, adjust_gold=1.02, eps=10, window=5):
+        super(OLMARStrategy, self).__init__(adjust_gold=adjust_gold)
+        self.eps = eps
+        self.window = window
+
+    def update(self, b, prices):
+        return olps.olmar(b, prices, eps=self.eps)
+
+
+class EGStrategy(OLPSStrategy):
+
+    def __init__(self, adjust_gold=1.02, eta=0.05):
+        super(EGStrategy, self).__init__(adjust_gold=adjust_gold)
+        self.eta = eta
+
+    def update(self, b, prices):
+        return olps.eg(b, prices[-1] / prices[-2], eta=self.eta)
+
+
+class ONSStrategy(OLPSStrategy):
+
+    def reset(self, n):
+        self.state = olps.ONSState(n)
+
+    def get_state(self):
+        state = getattr(self, 'state', None)
+        if state is None:
+            return {}
+        return {'ons': state.to_dict(), 'currencies': self.currencies}
+
+    def set_state(self, state):
+        if 'ons' in state:
+            self.state = olps.ONSState.from_dict(state['ons'])
+            self.currencies = state.get('currencies')
+
+    def update(self, b, prices):
+        return olps.ons(b, prices[-1] / prices[-2], self.state)
+
+
+class OlpsRPAMRStrategy(Strategy):
 
     # this assumes https://github.com/booxter/olpsR variant of olpsR installed
 
+    _olpsR = None
+
     def get_targets(self, targets, weights, gold, balances, rates, i):
         # weights ignored since we calculate our own weights on each iteration
 
+        # rpy2 is imported on first use since starting R is expensive
+        import rpy2.robjects as robjects
+        from rpy2.robjects.packages import importr
+
         gold_total = self.get_gold_total(balances, rates, i)
-        currencies = sorted(set(balances.keys()) | set(targets))
+        currencies = sorted(set(balances.keys()) | set(targets or []))
 
         # prepare arguments
         returns = [
@@ -204,8 +567,9 @@ class PAMRStrategy(Strategy):
 
         biv = robjects.FloatVector(bi)
 
-        olpsR = importr("olpsR")
-        weights = [float(w) for w in olpsR.alg_PAMR(biv, rets)]
+        if self._olpsR is None:
+            self._olpsR = importr("olpsR")
+        weights = [float(w) for w in self._olpsR.alg_PAMR(biv, rets)]
 
         assert \
             all([w >= 0.0 for w in weights]), \